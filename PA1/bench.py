@@ -0,0 +1,368 @@
+#!/usr/bin/env python3
+"""
+Benchmark harness for NTU_sort.
+
+Runs every algorithm x input x repetition with bounded parallelism, pins
+each run to its own CPU, enforces a per-run timeout and parses the CPU time
+and peak memory that NTU_sort prints through lib/tm_usage.  While a run is
+alive its RSS and CPU time are sampled from /proc/<pid> every
+--sample-interval seconds (Linux; 0 disables sampling).
+
+Usage:
+    python3 bench.py --bin bin/NTU_sort --inputs 'inputs/*.case*.in' \
+        --algs IS MS BMS QS RQS HS --reps 3 --jobs 4 --timeout 600 \
+        --out-dir bench
+
+Writes into --out-dir:
+    runs.csv                           every run (one row per repetition)
+    traces.csv                         /proc samples (time, RSS, CPU) per run
+    algorithm_results.csv              long format, ms (median of runs)
+    algorithm_results_converted.csv    wide format, seconds (read by plot.py)
+
+and appends the session (commit, host, timestamp) and every run to the
+SQLite store --db (default <out-dir>/results.sqlite), see results_store.py.
+"""
+
+from __future__ import annotations
+
+import argparse
+import csv
+import glob
+import os
+import queue
+import re
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+import results_store
+
+ALGORITHMS = ["IS", "MS", "BMS", "QS", "RQS", "HS"]
+
+INPUT_RE = re.compile(r"(\d+)\.(case\d+)\.in$")
+TIME_RE = re.compile(r"The total CPU time:\s*([-+\d.eE]+)\s*ms")
+MEM_RE = re.compile(r"memory:\s*(\d+)\s*KB")
+
+TRACE_FIELDS = ["Algorithm", "N", "Case", "Rep", "t (s)", "RSS (KB)", "CPU (s)"]
+RUN_FIELDS = [
+    "Algorithm", "N", "Case", "Rep", "CPU Time (ms)", "Memory (KB)", "Wall (s)", "Status",
+]
+LONG_FIELDS = ["Algorithm", "N", "Case", "CPU Time (ms)", "Memory (KB)"]
+
+
+@dataclass
+class Job:
+    alg: str
+    n: int
+    case: str
+    rep: int
+    path: Path
+
+
+@dataclass
+class Result:
+    job: Job
+    cpu_ms: Optional[float]
+    mem_kb: Optional[int]
+    wall_s: float
+    status: str
+    samples: List[Tuple[float, int, float]] = field(default_factory=list)
+
+
+def discover_inputs(patterns: List[str]) -> List[Tuple[int, str, Path]]:
+    """Return ``(N, case, path)`` for every ``<N>.<case>.in`` file matched."""
+    found = {}
+    for pattern in patterns:
+        for name in glob.glob(pattern):
+            match = INPUT_RE.search(os.path.basename(name))
+            if match:
+                found[Path(name)] = (int(match.group(1)), match.group(2))
+    return sorted(((n, case, path) for path, (n, case) in found.items()))
+
+
+def parse_tm_usage(stdout: str) -> Tuple[Optional[float], Optional[int]]:
+    time_match = TIME_RE.search(stdout)
+    mem_match = MEM_RE.search(stdout)
+    return (
+        float(time_match.group(1)) if time_match else None,
+        int(mem_match.group(1)) if mem_match else None,
+    )
+
+
+CLOCK_TICKS = os.sysconf("SC_CLK_TCK") if hasattr(os, "sysconf") else 100
+
+
+def read_proc(pid: int) -> Optional[Tuple[int, float]]:
+    """Current (RSS in KB, user+system CPU seconds) of ``pid`` from /proc."""
+    try:
+        with open(f"/proc/{pid}/stat") as fin:
+            # Fields after the parenthesised command name; utime/stime are 14/15.
+            fields = fin.read().rsplit(")", 1)[1].split()
+        with open(f"/proc/{pid}/status") as fin:
+            rss = next((int(line.split()[1]) for line in fin if line.startswith("VmRSS:")), 0)
+    except (OSError, IndexError, ValueError):
+        return None
+    return rss, (int(fields[11]) + int(fields[12])) / CLOCK_TICKS
+
+
+def sample_process(proc: subprocess.Popen, interval: float, samples: list, start: float) -> None:
+    while proc.poll() is None:
+        reading = read_proc(proc.pid)
+        if reading is not None:
+            samples.append((time.perf_counter() - start, *reading))
+        time.sleep(interval)
+
+
+def run_one(
+    binary: Path, job: Job, cpu: Optional[int], timeout: float, scratch: Path,
+    sample_interval: float = 0.0,
+) -> Result:
+    """Run NTU_sort once, pinned to ``cpu`` (Linux), and parse its report."""
+    out_path = scratch / f"{job.alg}.{job.n}.{job.case}.{job.rep}.out"
+
+    start = time.perf_counter()
+    try:
+        proc = subprocess.Popen(
+            [str(binary), f"-{job.alg}", str(job.path), str(out_path)],
+            stdout=subprocess.PIPE,
+            stderr=subprocess.STDOUT,
+            text=True,
+        )
+    except OSError as exc:
+        # e.g. a binary built for another platform; fail this run, not the matrix
+        return Result(job, None, None, time.perf_counter() - start, f"error: {exc.strerror or exc}")
+    if cpu is not None:
+        # Pinned from the parent: preexec_fn is not safe with the worker threads
+        try:
+            os.sched_setaffinity(proc.pid, {cpu})
+        except ProcessLookupError:
+            pass
+    samples: List[Tuple[float, int, float]] = []
+    sampler = None
+    if sample_interval > 0 and os.path.isdir("/proc"):
+        sampler = threading.Thread(
+            target=sample_process, args=(proc, sample_interval, samples, start), daemon=True
+        )
+        sampler.start()
+    try:
+        stdout, _ = proc.communicate(timeout=timeout)
+        status = "ok" if proc.returncode == 0 else f"exit {proc.returncode}"
+    except subprocess.TimeoutExpired:
+        proc.kill()
+        stdout, _ = proc.communicate()
+        status = "timeout"
+    wall = time.perf_counter() - start
+    if sampler is not None:
+        sampler.join()
+    out_path.unlink(missing_ok=True)
+
+    cpu_ms, mem_kb = parse_tm_usage(stdout) if status == "ok" else (None, None)
+    if status == "ok" and cpu_ms is None:
+        status = "no report"
+    return Result(job, cpu_ms, mem_kb, wall, status, samples)
+
+
+def available_cpus(jobs: int) -> List[Optional[int]]:
+    if hasattr(os, "sched_getaffinity"):
+        cpus = sorted(os.sched_getaffinity(0))
+        return cpus[: max(1, jobs)]
+    return [None] * max(1, jobs)
+
+
+def run_matrix(
+    binary: Path, jobs: List[Job], workers: int, timeout: float, progress: bool = True,
+    sample_interval: float = 0.0,
+) -> List[Result]:
+    """Run ``jobs`` on a pool of ``workers`` CPU slots, largest inputs first.
+
+    Each slot owns one CPU; a run borrows a slot for its whole lifetime so
+    concurrent runs never share a core.
+    """
+    slots: "queue.Queue[Optional[int]]" = queue.Queue()
+    for cpu in available_cpus(workers):
+        slots.put(cpu)
+
+    def task(job: Job, scratch: Path) -> Result:
+        cpu = slots.get()
+        try:
+            return run_one(binary, job, cpu, timeout, scratch, sample_interval)
+        finally:
+            slots.put(cpu)
+
+    ordered = sorted(jobs, key=lambda j: j.n, reverse=True)
+    results = []
+    with tempfile.TemporaryDirectory(prefix="ntu_sort_") as tmp, ThreadPoolExecutor(
+        max_workers=slots.qsize()
+    ) as pool:
+        futures = [pool.submit(task, job, Path(tmp)) for job in ordered]
+        for done, future in enumerate(as_completed(futures), 1):
+            result = future.result()
+            results.append(result)
+            if progress:
+                job = result.job
+                cpu = "-" if result.cpu_ms is None else f"{result.cpu_ms:.3f} ms"
+                print(
+                    f"[{done}/{len(futures)}] {job.alg:>3} {job.n}.{job.case} "
+                    f"rep {job.rep}: {cpu} ({result.status})",
+                    file=sys.stderr,
+                )
+    return results
+
+
+def summarize(results: List[Result]) -> Dict[Tuple[str, int, str], Tuple[float, int]]:
+    """Median CPU time and median peak memory of the successful repetitions."""
+    grouped: Dict[Tuple[str, int, str], List[Result]] = {}
+    for result in results:
+        if result.status == "ok":
+            job = result.job
+            grouped.setdefault((job.alg, job.n, job.case), []).append(result)
+    return {
+        key: (
+            statistics.median(r.cpu_ms for r in runs),
+            int(statistics.median(r.mem_kb or 0 for r in runs)),
+        )
+        for key, runs in grouped.items()
+    }
+
+
+def write_runs(path: Path, results: List[Result]) -> None:
+    with path.open("w", newline="") as fout:
+        writer = csv.writer(fout)
+        writer.writerow(RUN_FIELDS)
+        for r in sorted(results, key=lambda r: (r.job.alg, r.job.n, r.job.case, r.job.rep)):
+            writer.writerow([
+                r.job.alg, r.job.n, r.job.case, r.job.rep,
+                "" if r.cpu_ms is None else r.cpu_ms,
+                "" if r.mem_kb is None else r.mem_kb,
+                f"{r.wall_s:.6f}", r.status,
+            ])
+
+
+def write_traces(path: Path, results: List[Result]) -> None:
+    with path.open("w", newline="") as fout:
+        writer = csv.writer(fout)
+        writer.writerow(TRACE_FIELDS)
+        for r in sorted(results, key=lambda r: (r.job.alg, r.job.n, r.job.case, r.job.rep)):
+            for t, rss, cpu in r.samples:
+                writer.writerow([r.job.alg, r.job.n, r.job.case, r.job.rep, f"{t:.4f}", rss, cpu])
+
+
+def write_long(path: Path, summary, algs: List[str]) -> None:
+    with path.open("w", newline="") as fout:
+        writer = csv.writer(fout)
+        writer.writerow(LONG_FIELDS)
+        for alg in algs:
+            for (a, n, case), (cpu_ms, mem_kb) in sorted(summary.items()):
+                if a == alg:
+                    writer.writerow([alg, n, case, cpu_ms, mem_kb])
+
+
+def write_wide(path: Path, summary, algs: List[str]) -> None:
+    """Same layout as algorithm_results_converted.csv (seconds, KB)."""
+    inputs = sorted({(n, case) for _, n, case in summary})
+    with path.open("w", newline="") as fout:
+        writer = csv.writer(fout)
+        header = ["Input size"]
+        for alg in algs:
+            header += [f"{alg} CPU time (s)", f"{alg} Mem (KB)"]
+        writer.writerow(header)
+        for n, case in inputs:
+            row = [f"{n}.{case}"]
+            for alg in algs:
+                cpu_ms, mem_kb = summary.get((alg, n, case), (None, None))
+                row += ["" if cpu_ms is None else cpu_ms / 1000.0, "" if mem_kb is None else mem_kb]
+            writer.writerow(row)
+
+
+def store_results(db: Path, results: List[Result]) -> int:
+    conn = results_store.connect(db)
+    try:
+        return results_store.record_session(
+            conn,
+            (
+                {
+                    "algorithm": r.job.alg, "n": r.job.n, "case_name": r.job.case,
+                    "rep": r.job.rep, "cpu_ms": r.cpu_ms, "mem_kb": r.mem_kb,
+                    "wall_s": r.wall_s, "status": r.status, "samples": r.samples,
+                }
+                for r in results
+            ),
+            commit=results_store.current_commit(Path(__file__).resolve().parent),
+            command=" ".join(sys.argv),
+        )
+    finally:
+        conn.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark NTU_sort over the input matrix.")
+    parser.add_argument("--bin", type=Path, default=Path("bin/NTU_sort"), help="NTU_sort binary.")
+    parser.add_argument(
+        "--inputs",
+        nargs="+",
+        default=["inputs/*.case*.in"],
+        help="Glob(s) of <N>.<case>.in input files.",
+    )
+    parser.add_argument("--algs", nargs="+", default=ALGORITHMS, choices=ALGORITHMS)
+    parser.add_argument("--reps", type=int, default=3, help="Repetitions per configuration.")
+    parser.add_argument(
+        "--jobs",
+        type=int,
+        default=max(1, (os.cpu_count() or 2) // 2),
+        help="Concurrent runs (one CPU each).",
+    )
+    parser.add_argument("--timeout", type=float, default=600.0, help="Per-run timeout (s).")
+    parser.add_argument(
+        "--sample-interval", type=float, default=0.01,
+        help="Seconds between /proc RSS/CPU samples of each run (0 disables).",
+    )
+    parser.add_argument("--out-dir", type=Path, default=Path("bench"), help="Output directory.")
+    parser.add_argument(
+        "--db", type=Path, default=None,
+        help="SQLite results store to append to (default <out-dir>/results.sqlite).",
+    )
+    args = parser.parse_args()
+
+    if not args.bin.exists():
+        parser.error(f"binary not found: {args.bin} (run make first)")
+    inputs = discover_inputs(args.inputs)
+    if not inputs:
+        parser.error(f"no <N>.<case>.in files match {args.inputs}")
+
+    jobs = [
+        Job(alg, n, case, rep, path)
+        for n, case, path in inputs
+        for alg in args.algs
+        for rep in range(args.reps)
+    ]
+    print(
+        f"Running {len(jobs)} jobs ({len(args.algs)} algorithms x {len(inputs)} inputs x "
+        f"{args.reps} reps) on {len(available_cpus(args.jobs))} CPU(s)",
+        file=sys.stderr,
+    )
+    results = run_matrix(
+        args.bin, jobs, args.jobs, args.timeout, sample_interval=args.sample_interval
+    )
+
+    args.out_dir.mkdir(parents=True, exist_ok=True)
+    summary = summarize(results)
+    write_runs(args.out_dir / "runs.csv", results)
+    write_traces(args.out_dir / "traces.csv", results)
+    write_long(args.out_dir / "algorithm_results.csv", summary, args.algs)
+    write_wide(args.out_dir / "algorithm_results_converted.csv", summary, args.algs)
+    session = store_results(args.db or args.out_dir / "results.sqlite", results)
+
+    failed = [r for r in results if r.status != "ok"]
+    print(f"Wrote results to {args.out_dir}, session {session} ({len(failed)} failed run(s))")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,202 @@
+#!/usr/bin/env python3
+"""
+Streaming result checker for NTU_sort.
+
+Verifies that an output file is sorted (non-decreasing) and is a
+permutation of the input, in one pass over both files with memory bounded
+by the chunk size.  Chunks are parsed by a process pool with NumPy.
+
+Usage:
+    python3 check_result.py inputs/1000.case1.in outputs/1000.case1.out
+    python3 check_result.py --jobs 8 --chunk-mb 64 <input_file> <output_file>
+
+The multiset check compares order-independent fingerprints of the values:
+count, wrapping 64-bit sum, and the wrapping sum and xor of a splitmix64
+hash of every value.
+"""
+
+from __future__ import annotations
+
+import argparse
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Iterator, List, Optional, Tuple
+
+import numpy as np
+
+HEADER_LINES = 2
+MASK64 = (1 << 64) - 1
+
+
+@dataclass
+class Summary:
+    """Per-chunk (and, once combined, per-file) check results."""
+
+    count: int = 0
+    first: Optional[int] = None
+    last: Optional[int] = None
+    first_index: Optional[int] = None
+    violation: Optional[int] = None  # offset i with value[i] > value[i + 1]
+    bad_index: Optional[int] = None  # offset whose index column is wrong
+    total: int = 0
+    hash_sum: int = 0
+    hash_xor: int = 0
+    malformed: bool = False
+
+
+def splitmix64(values: np.ndarray) -> np.ndarray:
+    z = values.astype(np.uint64) + np.uint64(0x9E3779B97F4A7C15)
+    z = (z ^ (z >> np.uint64(30))) * np.uint64(0xBF58476D1CE4E5B9)
+    z = (z ^ (z >> np.uint64(27))) * np.uint64(0x94D049BB133111EB)
+    return z ^ (z >> np.uint64(31))
+
+
+def read_header(path: Path) -> Tuple[int, Optional[int]]:
+    """Return (byte offset of the first data line, declared element count)."""
+    declared = None
+    with path.open("rb") as fin:
+        for _ in range(HEADER_LINES):
+            line = fin.readline()
+            parts = line.split()
+            if len(parts) >= 2 and parts[0] == b"#" and parts[1].isdigit():
+                declared = int(parts[1])
+        return fin.tell(), declared
+
+
+def chunk_ranges(path: Path, start: int, chunk_bytes: int) -> Iterator[Tuple[int, int]]:
+    """Split [start, EOF) into ranges that end on line boundaries."""
+    size = path.stat().st_size
+    with path.open("rb") as fin:
+        pos = start
+        while pos < size:
+            end = min(pos + chunk_bytes, size)
+            if end < size:
+                fin.seek(end)
+                end += len(fin.readline())
+            yield pos, end
+            pos = end
+
+
+def scan_chunk(task: Tuple[str, int, int, bool]) -> Summary:
+    path, start, end, check_order = task
+    with open(path, "rb") as fin:
+        fin.seek(start)
+        data = fin.read(end - start)
+    try:
+        numbers = np.fromstring(data, dtype=np.int64, sep=" ")
+    except ValueError:
+        # NumPy 2 raises on a non-numeric token instead of stopping short
+        return Summary(malformed=True)
+    lines = data.count(b"\n") + (1 if data and not data.endswith(b"\n") else 0)
+    if numbers.size != 2 * lines:
+        # Blank lines are skipped, as NTU_sort's own reader skips them
+        lines = sum(1 for line in data.splitlines() if line.strip())
+    summary = Summary(malformed=numbers.size != 2 * lines)
+    if numbers.size < 2:
+        return summary
+    pairs = numbers[: numbers.size // 2 * 2].reshape(-1, 2)
+    index, values = pairs[:, 0], pairs[:, 1]
+
+    summary.count = len(values)
+    summary.first, summary.last = int(values[0]), int(values[-1])
+    summary.total = int(values.astype(np.uint64).sum(dtype=np.uint64))
+    hashed = splitmix64(values)
+    summary.hash_sum = int(hashed.sum(dtype=np.uint64))
+    summary.hash_xor = int(np.bitwise_xor.reduce(hashed))
+    if check_order:
+        summary.first_index = int(index[0])
+        drops = np.flatnonzero(values[1:] < values[:-1])
+        if drops.size:
+            summary.violation = int(drops[0])
+        wrong = np.flatnonzero(index != index[0] + np.arange(len(index)))
+        if wrong.size:
+            summary.bad_index = int(wrong[0])
+    return summary
+
+
+def scan_file(pool, path: Path, check_order: bool, chunk_bytes: int) -> Tuple[Summary, Optional[int]]:
+    """Combine chunk summaries in file order (constant memory)."""
+    start, declared = read_header(path)
+    tasks = ((str(path), s, e, check_order) for s, e in chunk_ranges(path, start, chunk_bytes))
+    total = Summary()
+    for part in pool.map(scan_chunk, tasks):
+        if part.malformed:
+            total.malformed = True
+        if part.count == 0:
+            continue
+        offset = total.count
+        if check_order:
+            if total.violation is None:
+                if total.last is not None and part.first < total.last:
+                    total.violation = offset - 1
+                elif part.violation is not None:
+                    total.violation = offset + part.violation
+            if total.bad_index is None:
+                if part.first_index != offset:
+                    total.bad_index = offset
+                elif part.bad_index is not None:
+                    total.bad_index = offset + part.bad_index
+        if total.first is None:
+            total.first = part.first
+        total.last = part.last
+        total.count += part.count
+        total.total = (total.total + part.total) & MASK64
+        total.hash_sum = (total.hash_sum + part.hash_sum) & MASK64
+        total.hash_xor ^= part.hash_xor
+    return total, declared
+
+
+def check(input_path: Path, output_path: Path, jobs: int, chunk_bytes: int) -> List[str]:
+    """Return a list of problems (empty when the output is correct)."""
+    problems = []
+    with ProcessPoolExecutor(max_workers=jobs) as pool:
+        out_sum, out_declared = scan_file(pool, output_path, True, chunk_bytes)
+        in_sum, in_declared = scan_file(pool, input_path, False, chunk_bytes)
+
+    for name, summ, declared in (("input", in_sum, in_declared), ("output", out_sum, out_declared)):
+        if summ.malformed:
+            problems.append(f"{name}: malformed data line(s)")
+        if declared is not None and declared != summ.count:
+            problems.append(f"{name}: header declares {declared} values, found {summ.count}")
+    if out_sum.violation is not None:
+        problems.append(
+            f"output not sorted: value at index {out_sum.violation} is greater "
+            f"than value at index {out_sum.violation + 1}"
+        )
+    if out_sum.bad_index is not None:
+        problems.append(f"output index column wrong at line {out_sum.bad_index}")
+    if in_sum.count != out_sum.count:
+        problems.append(f"count mismatch: input {in_sum.count}, output {out_sum.count}")
+    elif (in_sum.total, in_sum.hash_sum, in_sum.hash_xor) != (
+        out_sum.total, out_sum.hash_sum, out_sum.hash_xor
+    ):
+        problems.append("output is not a permutation of the input (fingerprint mismatch)")
+    return problems
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Check NTU_sort output against its input.")
+    parser.add_argument("input", type=Path)
+    parser.add_argument("output", type=Path)
+    parser.add_argument("--jobs", type=int, default=os.cpu_count() or 1, help="Worker processes.")
+    parser.add_argument("--chunk-mb", type=float, default=32.0, help="Chunk size in MB.")
+    args = parser.parse_args()
+
+    for path in (args.input, args.output):
+        if not path.exists():
+            parser.error(f"file not found: {path}")
+
+    problems = check(args.input, args.output, args.jobs, int(args.chunk_mb * (1 << 20)))
+    if problems:
+        for problem in problems:
+            print(f"FAIL: {problem}")
+        return 1
+    print("PASS: output is sorted and is a permutation of the input")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
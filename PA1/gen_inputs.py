@@ -0,0 +1,164 @@
+#!/usr/bin/env python3
+"""
+Seeded input generator for NTU_sort.
+
+Writes the PA1 input format
+
+    # <N> data points
+    # index number
+    0 <value>
+    1 <value>
+    ...
+
+chunk by chunk, so memory stays bounded by --chunk regardless of N.
+
+Usage:
+    python3 gen_inputs.py --sizes 1000000 100000000 --dists case1 case2 case3 \
+        --seed 1 --out-dir inputs
+    python3 gen_inputs.py --sizes 10000000 --dists dup organ med3 --out-dir inputs
+
+Distributions (file name <N>.<dist>.in):
+    case1    uniform random values (average case)
+    case2    sorted ascending (best case for IS)
+    case3    sorted descending (worst case for IS)
+    dup      uniform over only --distinct values (many duplicates)
+    nearly   ascending with --swap-frac of elements swapped locally
+    organ    organ pipe: ascending first half, descending second half
+    med3     Musser's median-of-three killer permutation
+"""
+
+from __future__ import annotations
+
+import argparse
+import sys
+import time
+from pathlib import Path
+from typing import Iterator
+
+import numpy as np
+
+DISTRIBUTIONS = ["case1", "case2", "case3", "dup", "nearly", "organ", "med3"]
+
+
+def sorted_uniform(rng: np.random.Generator, n: int, chunk: int, descending: bool) -> Iterator[np.ndarray]:
+    """Stream n sorted U(0, 1) order statistics without materializing them.
+
+    Uses the sequential method of Bentley and Saxe: the largest of i
+    uniforms is the previous maximum times U ** (1 / i), so the descending
+    sequence is exp(cumsum(log(U_i) / i)) for i = n .. 1.  Ascending order is
+    the complement 1 - D of a descending stream D.
+    """
+    log_max = 0.0
+    for start in range(0, n, chunk):
+        count = min(chunk, n - start)
+        i = np.arange(n - start, n - start - count, -1, dtype=np.float64)
+        steps = np.log(rng.random(count)) / i
+        logs = log_max + np.cumsum(steps)
+        log_max = logs[-1]
+        desc = np.exp(logs)
+        yield desc if descending else 1.0 - desc
+
+
+def scale(u: np.ndarray, max_value: int) -> np.ndarray:
+    return np.minimum((u * max_value).astype(np.int64), max_value - 1)
+
+
+def med3_killer(start: int, count: int, n: int) -> np.ndarray:
+    """Musser's median-of-3 killer sequence (1-based values), positions [start, start+count).
+
+    With m the largest multiple of 4 <= n and k = m / 2: a[i] = i for odd
+    i <= k, a[i] = k + i - 1 for even i <= k and a[k + i] = 2 * i.  The
+    remaining n - m values follow in order.
+    """
+    pos = np.arange(start + 1, start + count + 1, dtype=np.int64)
+    k = (n - n % 4) // 2
+    out = np.where(pos % 2 == 1, pos, k + pos - 1)
+    second = pos > k
+    out[second] = 2 * (pos[second] - k)
+    tail = pos > 2 * k
+    out[tail] = pos[tail]
+    return out
+
+
+def generate(dist: str, n: int, rng: np.random.Generator, chunk: int, args) -> Iterator[np.ndarray]:
+    max_value = args.max_value
+    if dist == "case1":
+        for start in range(0, n, chunk):
+            yield rng.integers(0, max_value, min(chunk, n - start), dtype=np.int64)
+    elif dist in ("case2", "case3"):
+        for u in sorted_uniform(rng, n, chunk, descending=dist == "case3"):
+            yield scale(u, max_value)
+    elif dist == "dup":
+        values = rng.integers(0, max_value, max(1, args.distinct), dtype=np.int64)
+        for start in range(0, n, chunk):
+            yield values[rng.integers(0, len(values), min(chunk, n - start))]
+    elif dist == "nearly":
+        window = max(2, args.swap_window)
+        for u in sorted_uniform(rng, n, chunk, descending=False):
+            block = scale(u, max_value)
+            swaps = int(len(block) * args.swap_frac / 2)
+            if swaps and len(block) > 1:
+                a = rng.integers(0, len(block), swaps)
+                b = np.clip(a + rng.integers(1, window, swaps), 0, len(block) - 1)
+                block[a], block[b] = block[b], block[a].copy()
+            yield block
+    elif dist == "organ":
+        half = n // 2
+        for u in sorted_uniform(rng, half, chunk, descending=False):
+            yield scale(u, max_value)
+        for u in sorted_uniform(rng, n - half, chunk, descending=True):
+            yield scale(u, max_value)
+    elif dist == "med3":
+        for start in range(0, n, chunk):
+            yield med3_killer(start, min(chunk, n - start), n)
+    else:
+        raise ValueError(f"unknown distribution '{dist}'")
+
+
+def write_input(path: Path, n: int, blocks: Iterator[np.ndarray]) -> None:
+    with path.open("w") as fout:
+        fout.write(f"# {n} data points\n# index number\n")
+        index = 0
+        for block in blocks:
+            count = len(block)
+            pairs = np.empty(2 * count, dtype=np.int64)
+            pairs[0::2] = np.arange(index, index + count)
+            pairs[1::2] = block
+            fout.write(("%d %d\n" * count) % tuple(pairs.tolist()))
+            index += count
+    if index != n:
+        raise RuntimeError(f"{path}: wrote {index} values, expected {n}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate NTU_sort input files.")
+    parser.add_argument("--sizes", nargs="+", type=int, required=True, help="Element counts.")
+    parser.add_argument("--dists", nargs="+", default=["case1", "case2", "case3"],
+                        choices=DISTRIBUTIONS)
+    parser.add_argument("--seed", type=int, default=0, help="Base RNG seed.")
+    parser.add_argument("--max-value", type=int, default=1_000_000,
+                        help="Values are drawn from [0, max-value).")
+    parser.add_argument("--distinct", type=int, default=100, help="Distinct values for 'dup'.")
+    parser.add_argument("--swap-frac", type=float, default=0.01,
+                        help="Fraction of elements displaced for 'nearly'.")
+    parser.add_argument("--swap-window", type=int, default=16,
+                        help="Maximum displacement for 'nearly'.")
+    parser.add_argument("--chunk", type=int, default=1 << 20, help="Elements per write.")
+    parser.add_argument("--out-dir", type=Path, default=Path("inputs"))
+    args = parser.parse_args()
+
+    if args.max_value > 2**31 - 1:
+        parser.error("--max-value must fit in a C++ int")
+    args.out_dir.mkdir(parents=True, exist_ok=True)
+    for n in args.sizes:
+        for dist in args.dists:
+            # Independent, reproducible stream per (seed, size, distribution).
+            rng = np.random.default_rng([args.seed, n, DISTRIBUTIONS.index(dist)])
+            path = args.out_dir / f"{n}.{dist}.in"
+            start = time.perf_counter()
+            write_input(path, n, generate(dist, n, rng, args.chunk, args))
+            print(f"Wrote {path} ({time.perf_counter() - start:.1f}s)", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
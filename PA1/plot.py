@@ -1,40 +1,394 @@
+import argparse
+import os
+from itertools import combinations
+
 import pandas as pd
 import numpy as np
+import matplotlib
+matplotlib.use("Agg")  # render to files only; never opens a window
 import matplotlib.pyplot as plt
 
-csv_path = "./algorithm_results_converted.csv"
-df = pd.read_csv(csv_path)
+import results_store
+
+ALG_ORDER = ["IS", "MS", "BMS", "QS", "RQS", "HS"]
+CASE_TITLES = {
+    "case1": "Average Case (Case1)",
+    "case2": "Best Case (Case2)",
+    "case3": "Worst Case (Case3)",
+}
+# Candidate complexity models, t(n) = a * f(n)
+MODELS = {
+    "n": lambda n: n,
+    "n log n": lambda n: n * np.log2(n),
+    "n^2": lambda n: n ** 2,
+}
+EXTRAPOLATE_N = 1e8
+
+
+def load_wide(csv_path):
+    """Wide algorithm_results_converted.csv -> long (Algorithm, N, Case, Rep, Time)."""
+    df = pd.read_csv(csv_path)
+    sizes = df["Input size"].str.split(".", expand=True)
+    df["N"] = sizes[0].astype(int)
+    df["Case"] = sizes[1]
+    cols = [c for c in df.columns if c.endswith(" CPU time (s)")]
+    long_df = df.melt(id_vars=["N", "Case"], value_vars=cols,
+                      var_name="Algorithm", value_name="Time")
+    long_df["Algorithm"] = long_df["Algorithm"].str.replace(" CPU time (s)", "", regex=False)
+    long_df["Rep"] = 0
+    return long_df.dropna(subset=["Time"])
+
+
+def load_runs(csv_path):
+    """runs.csv written by bench.py (one row per repetition, ms)."""
+    df = pd.read_csv(csv_path)
+    if "Status" in df.columns:
+        df = df[df["Status"] == "ok"]
+    df = df.assign(Time=df["CPU Time (ms)"] / 1000.0)
+    return df[["Algorithm", "N", "Case", "Rep", "Time"]].dropna(subset=["Time"])
+
+
+def load_store(db_path, mode="latest", commit=None, host=None):
+    """Runs from the SQLite results store as (Algorithm, N, Case, Rep, Time)."""
+    conn = results_store.connect(db_path)
+    try:
+        rows = results_store.select_runs(conn, mode=mode, commit=commit, host=host)
+    finally:
+        conn.close()
+    if not rows:
+        raise SystemExit(f"No runs in {db_path} for mode={mode} commit={commit} host={host}")
+    df = pd.DataFrame([dict(r) for r in rows])
+    return pd.DataFrame({
+        "Algorithm": df["algorithm"],
+        "N": df["n"].astype(int),
+        "Case": df["case_name"],
+        "Rep": df["rep"],
+        "Time": df["cpu_ms"] / 1000.0,
+    }).dropna(subset=["Time"])
+
+
+def load_traces(db_path=None, csv_path=None, n=None, case=None):
+    """/proc samples as (Algorithm, N, Case, Rep, t, RSS_KB, CPU_s)."""
+    if db_path:
+        conn = results_store.connect(db_path)
+        try:
+            rows = results_store.select_samples(conn, n=n, case=case)
+        finally:
+            conn.close()
+        df = pd.DataFrame([dict(r) for r in rows],
+                          columns=["algorithm", "n", "case_name", "rep", "t_s", "rss_kb", "cpu_s"])
+        df = df.rename(columns={"algorithm": "Algorithm", "n": "N", "case_name": "Case",
+                                "rep": "Rep", "t_s": "t", "rss_kb": "RSS_KB", "cpu_s": "CPU_s"})
+    else:
+        df = pd.read_csv(csv_path).rename(columns={"t (s)": "t", "RSS (KB)": "RSS_KB",
+                                                   "CPU (s)": "CPU_s"})
+        if n is not None:
+            df = df[df["N"] == n]
+        if case is not None:
+            df = df[df["Case"] == case]
+    return df
+
+
+def plot_traces(traces, out_dir, n=None):
+    """Memory- and CPU-over-time curves, one figure per (N, case), first repetition."""
+    if traces.empty:
+        print("No /proc samples found (run bench.py with --sample-interval > 0)")
+        return
+    sizes = [n] if n is not None else [traces["N"].max()]
+    for size in sizes:
+        for case_name in sorted(traces.loc[traces["N"] == size, "Case"].unique()):
+            sub = traces[(traces["N"] == size) & (traces["Case"] == case_name)]
+            fig, (ax_mem, ax_cpu) = plt.subplots(2, 1, sharex=True, figsize=(6.4, 6.4))
+            for alg in [a for a in ALG_ORDER if a in set(sub["Algorithm"])]:
+                run = sub[(sub["Algorithm"] == alg) & (sub["Rep"] == sub["Rep"].min())]
+                run = run.sort_values("t")
+                line, = ax_mem.plot(run["t"], run["RSS_KB"] / 1024.0, label=alg)
+                ax_cpu.plot(run["t"], run["CPU_s"], color=line.get_color())
+            ax_mem.set_ylabel("RSS (MB)")
+            ax_mem.set_title(f"Memory over time ({size}.{case_name})")
+            ax_mem.legend(fontsize="small")
+            ax_mem.grid(True, linestyle='--', linewidth=0.5)
+            ax_cpu.set_xlabel("Wall time (s)")
+            ax_cpu.set_ylabel("CPU time (s)")
+            ax_cpu.grid(True, linestyle='--', linewidth=0.5)
+            fig.tight_layout()
+            fig.savefig(f"{out_dir}/memory_{size}_{case_name}.png", dpi=180)
+            plt.close(fig)
+
+
+MIN_SIZES = 2
+
+
+def series_matrix(df):
+    """Pivot to a (sizes x series) matrix of median log10 times.
+
+    Series are (Algorithm, Case) pairs.  A size missing from one series (a
+    timeout, say) is NaN in that column only; series measured at fewer than
+    MIN_SIZES sizes cannot be fitted and are left out.
+    """
+    df = df[df["Time"] > 0]
+    med = df.groupby(["N", "Algorithm", "Case"])["Time"].median().unstack(["Algorithm", "Case"])
+    med = med.loc[:, med.notna().sum(axis=0) >= MIN_SIZES]
+    med = med.dropna(axis=0, how="all").sort_index()
+    return med.index.values.astype(float), np.log10(med.values), list(med.columns)
+
+
+def fit_loglog(log_n, Y):
+    """Fit log t = slope * log n + intercept for every column of Y at once.
+
+    Each column is fitted on its own non-NaN rows (ordinary least squares).
+    """
+    mask = ~np.isnan(Y)
+    X = np.where(mask, log_n[:, None], 0.0)
+    count = mask.sum(axis=0)
+    x_mean = X.sum(axis=0) / count
+    y_mean = np.where(mask, Y, 0.0).sum(axis=0) / count
+    dx = np.where(mask, log_n[:, None] - x_mean, 0.0)
+    dy = np.where(mask, Y - y_mean, 0.0)
+    slope = (dx * dy).sum(axis=0) / (dx * dx).sum(axis=0)
+    return slope, y_mean - slope * x_mean
+
 
-sizes = df["Input size"].str.split(".", expand=True)
-df["N"] = sizes[0].astype(int)
-df["Case"] = sizes[1]
+def bootstrap_slopes(df, sizes, columns, n_boot=1000, seed=0):
+    """Bootstrap slope samples, shape (n_boot, len(columns)).
 
-algs = ["IS", "MS", "BMS", "QS", "RQS"]
+    With repeated runs every resample redraws the repetitions of each size
+    (with replacement); with a single run per size the fit residuals are
+    resampled instead.  All resamples are solved as one multi-RHS lstsq.
+    """
+    rng = np.random.default_rng(seed)
+    log_n = np.log10(sizes)
+    df = df[df["Time"] > 0]
+    groups = {key: g["Time"].values for key, g in df.groupby(["N", "Algorithm", "Case"])}
+    reps = max(len(v) for v in groups.values())
 
-slope_records = []
+    # Column b * len(columns) + j is resample b of series j; sizes a series
+    # lacks stay NaN
+    Y = np.full((len(sizes), n_boot * len(columns)), np.nan)
+    if reps > 1:
+        for i, n in enumerate(sizes):
+            for j, (alg, case) in enumerate(columns):
+                samples = groups.get((int(n), alg, case))
+                if samples is None:
+                    continue
+                draws = rng.choice(samples, size=(n_boot, len(samples)), replace=True)
+                Y[i, j::len(columns)] = np.log10(np.median(draws, axis=1))
+    else:
+        Y0 = np.log10(np.array([
+            [groups[(int(n), alg, case)][0] if (int(n), alg, case) in groups else np.nan
+             for alg, case in columns] for n in sizes
+        ]))
+        slope, intercept = fit_loglog(log_n, Y0)
+        fitted = np.outer(log_n, slope) + intercept
+        resid = Y0 - fitted
+        for j in range(len(columns)):
+            rows = np.flatnonzero(~np.isnan(Y0[:, j]))
+            idx = rng.integers(0, len(rows), size=(len(rows), n_boot))
+            Y[rows, j::len(columns)] = fitted[rows, j][:, None] + resid[rows[idx], j]
+    slopes, _ = fit_loglog(log_n, Y)
+    return slopes.reshape(n_boot, len(columns))
+
+
+def fit_models(sizes, times):
+    """Least-relative-error fit of t = a * f(n) for each model; best first."""
+    fits = []
+    for name, f in MODELS.items():
+        fn = f(sizes)
+        a = np.sum(fn / times) / np.sum((fn / times) ** 2)
+        rel_rms = np.sqrt(np.mean((a * fn / times - 1.0) ** 2))
+        fits.append((rel_rms, name, a))
+    return sorted(fits)
+
+
+def crossovers(slope, intercept, columns, case, n_min=1.0, n_max=EXTRAPOLATE_N):
+    """Sizes in [n_min, n_max] where the power-law fits of two algorithms intersect."""
+    idx = {alg: j for j, (alg, c) in enumerate(columns) if c == case}
+    rows = []
+    for a, b in combinations(idx, 2):
+        ds = slope[idx[a]] - slope[idx[b]]
+        if abs(ds) < 1e-9:
+            continue
+        n_star = 10 ** ((intercept[idx[b]] - intercept[idx[a]]) / ds)
+        if not n_min <= n_star <= n_max:
+            continue
+        faster_after = b if ds > 0 else a
+        rows.append({"Case": case, "Pair": f"{a}/{b}", "Crossover N": n_star,
+                     "Faster beyond": faster_after})
+    return rows
+
+
+def analyze(df, n_boot=1000):
+    """Slopes with bootstrap CIs, best complexity model and extrapolation."""
+    sizes, Y, columns = series_matrix(df)
+    slope, intercept = fit_loglog(np.log10(sizes), Y)
+    boot = bootstrap_slopes(df, sizes, columns, n_boot=n_boot)
+    lo, hi = np.percentile(boot, [2.5, 97.5], axis=0)
+
+    log_big = np.log10(EXTRAPOLATE_N)
+    rows = []
+    for j, (alg, case) in enumerate(columns):
+        measured = ~np.isnan(Y[:, j])
+        (rms, model, a), *_ = fit_models(sizes[measured], 10 ** Y[measured, j])
+        rows.append({
+            "Case": case,
+            "Algorithm": alg,
+            "Slope(log-log)": slope[j],
+            "Intercept": intercept[j],
+            "Slope CI low": lo[j],
+            "Slope CI high": hi[j],
+            "Best model": model,
+            "Model rel. RMS": rms,
+            f"Power-law t({EXTRAPOLATE_N:.0e}) (s)": 10 ** (intercept[j] + slope[j] * log_big),
+            f"Model t({EXTRAPOLATE_N:.0e}) (s)": a * MODELS[model](EXTRAPOLATE_N),
+        })
+    summary = pd.DataFrame(rows)
+    cross = pd.DataFrame([r for case in sorted({c for _, c in columns})
+                          for r in crossovers(slope, intercept, columns, case,
+                                              n_min=sizes.min() / 10)])
+    return summary, cross, (sizes, Y, columns, slope, intercept)
+
+
+def plot_case(df, case_name, title, outfile, summary=None):
+    case_df = df[(df["Case"] == case_name) & (df["Time"] > 0)]
+    med = case_df.groupby(["Algorithm", "N"])["Time"].median()
 
-def plot_case(case_name, title, outfile):
-    case_df = df[df["Case"] == case_name].copy().sort_values("N")
-    x = np.log10(case_df["N"].values.astype(float))
-    
     plt.figure()
-    for alg in algs:
-        y = np.log10(case_df[f"{alg} CPU time (s)"].values.astype(float))
-        # Linear regression in log-log
-        A = np.vstack([x, np.ones_like(x)]).T
-        slope, intercept = np.linalg.lstsq(A, y, rcond=None)[0]
-        slope_records.append({"Case": case_name, "Algorithm": alg, "Slope(log-log)": slope})
-        # plt.plot(x, y, marker='o', label=f"{alg}  slope={slope:.2f}")
-        plt.plot(x, y, marker='o', label=f"{alg}")
+    for alg in [a for a in ALG_ORDER if a in med.index.get_level_values(0)]:
+        series = med[alg].sort_index()
+        x = np.log10(series.index.values.astype(float))
+        y = np.log10(series.values)
+        label = f"{alg}"
+        if summary is not None:
+            row = summary[(summary["Case"] == case_name) & (summary["Algorithm"] == alg)]
+            if not row.empty:
+                r = row.iloc[0]
+                label = (f"{alg}  slope={r['Slope(log-log)']:.2f} "
+                         f"[{r['Slope CI low']:.2f}, {r['Slope CI high']:.2f}] ~ {r['Best model']}")
+        line, = plt.plot(x, y, marker='o', label=label)
+        if summary is not None and not row.empty:
+            plt.plot(x, r["Intercept"] + r["Slope(log-log)"] * x, linestyle='--',
+                     linewidth=0.8, color=line.get_color())
     plt.xlabel("Input Size (Log scale)")
     plt.ylabel("Time (Log scale)")
     plt.title(f"{title}")
-    plt.legend()
+    plt.legend(fontsize="small")
     plt.grid(True, which='both', linestyle='--', linewidth=0.5)
     plt.tight_layout()
     plt.savefig(outfile, dpi=180)
-    plt.show()
+    plt.close()
+
+
+def plot_compare(df_a, df_b, label_a, label_b, case_name, title, outfile):
+    """Median times of two commits (solid vs dashed) plus B/A speed ratio."""
+    def medians(df):
+        df = df[(df["Case"] == case_name) & (df["Time"] > 0)]
+        return df.groupby(["Algorithm", "N"])["Time"].median()
+
+    med_a, med_b = medians(df_a), medians(df_b)
+    ratio = (med_b / med_a).dropna()
+
+    fig, (ax, ax_ratio) = plt.subplots(2, 1, sharex=True, figsize=(6.4, 7.2),
+                                       gridspec_kw={"height_ratios": [3, 1]})
+    algs = set(med_a.index.get_level_values(0)) | set(med_b.index.get_level_values(0))
+    for alg in [a for a in ALG_ORDER if a in algs]:
+        color = None
+        for med, style, label in ((med_a, '-', label_a), (med_b, '--', label_b)):
+            if alg not in med.index.get_level_values(0):
+                continue
+            series = med[alg].sort_index()
+            line, = ax.plot(np.log10(series.index.values.astype(float)), np.log10(series.values),
+                            linestyle=style, marker='o', color=color, label=f"{alg} ({label})")
+            color = line.get_color()
+        if alg in ratio.index.get_level_values(0):
+            r = ratio[alg].sort_index()
+            ax_ratio.plot(np.log10(r.index.values.astype(float)), r.values, marker='o',
+                          color=color, label=alg)
+    ax.set_ylabel("Time (Log scale)")
+    ax.set_title(f"{title}: {label_a} vs {label_b}")
+    ax.legend(fontsize="x-small", ncol=2)
+    ax.grid(True, which='both', linestyle='--', linewidth=0.5)
+    ax_ratio.axhline(1.0, color="gray", linewidth=0.8)
+    ax_ratio.set_xlabel("Input Size (Log scale)")
+    ax_ratio.set_ylabel(f"{label_b} / {label_a}")
+    ax_ratio.grid(True, which='both', linestyle='--', linewidth=0.5)
+    fig.tight_layout()
+    fig.savefig(outfile, dpi=180)
+    plt.close(fig)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Plot and analyze NTU_sort scaling.")
+    parser.add_argument("--csv", default="./algorithm_results_converted.csv",
+                        help="Wide results CSV (one sample per size).")
+    parser.add_argument("--runs", default=None,
+                        help="runs.csv from bench.py (repeated samples); overrides --csv.")
+    parser.add_argument("--db", default=None,
+                        help="SQLite results store from bench.py; overrides --csv/--runs.")
+    parser.add_argument("--select", choices=("latest", "median"), default="latest",
+                        help="Store query: newest session per config, or median of all runs.")
+    parser.add_argument("--commit", default=None, help="Restrict store query to a commit.")
+    parser.add_argument("--host", default=None, help="Restrict store query to a host.")
+    parser.add_argument("--compare", nargs=2, metavar=("COMMIT_A", "COMMIT_B"), default=None,
+                        help="Plot two commits from the store against each other.")
+    parser.add_argument("--traces", action="store_true",
+                        help="Plot /proc memory/CPU traces (from --db, or --traces-csv).")
+    parser.add_argument("--traces-csv", default=None, help="traces.csv from bench.py.")
+    parser.add_argument("--trace-size", type=int, default=None,
+                        help="Input size to plot traces for (default: largest sampled).")
+    parser.add_argument("--analyze", action="store_true",
+                        help="Fit slopes with bootstrap CIs, models and crossovers.")
+    parser.add_argument("--boot", type=int, default=1000, help="Bootstrap resamples.")
+    parser.add_argument("--out-dir", default="./figs", help="Figure/table directory.")
+    args = parser.parse_args()
+
+    os.makedirs(args.out_dir, exist_ok=True)
+    mode = "all" if args.select == "median" else "latest"
+    if args.traces:
+        if not (args.db or args.traces_csv):
+            parser.error("--traces needs --db or --traces-csv")
+        traces = load_traces(args.db, args.traces_csv, n=args.trace_size)
+        plot_traces(traces, args.out_dir, n=args.trace_size)
+        return
+
+    if args.compare:
+        if not args.db:
+            parser.error("--compare needs --db")
+        commit_a, commit_b = args.compare
+        df_a = load_store(args.db, mode, commit_a, args.host)
+        df_b = load_store(args.db, mode, commit_b, args.host)
+        for case_name in sorted(set(df_a["Case"]) & set(df_b["Case"])):
+            title = CASE_TITLES.get(case_name, case_name)
+            plot_compare(df_a, df_b, commit_a, commit_b, case_name, title,
+                         f"{args.out_dir}/compare_{commit_a}_{commit_b}_{case_name}.png")
+        return
+
+    if args.db:
+        df = load_store(args.db, mode, args.commit, args.host)
+    elif args.runs:
+        df = load_runs(args.runs)
+    else:
+        df = load_wide(args.csv)
+
+    summary = None
+    if args.analyze:
+        summary, cross, _ = analyze(df, n_boot=args.boot)
+        pd.set_option("display.width", 200)
+        print(summary.to_string(index=False, float_format=lambda v: f"{v:.4g}"))
+        fitted = set(zip(summary["Algorithm"], summary["Case"])) if not summary.empty else set()
+        skipped = sorted(set(zip(df["Algorithm"], df["Case"])) - fitted)
+        if skipped:
+            print(f"Not fitted (fewer than {MIN_SIZES} sizes): "
+                  + ", ".join(f"{alg}/{case}" for alg, case in skipped))
+        if not cross.empty:
+            print()
+            print(cross.to_string(index=False, float_format=lambda v: f"{v:.4g}"))
+        summary.to_csv(f"{args.out_dir}/scaling_summary.csv", index=False)
+        cross.to_csv(f"{args.out_dir}/crossovers.csv", index=False)
+
+    for case_name in sorted(df["Case"].unique()):
+        title = CASE_TITLES.get(case_name, case_name)
+        plot_case(df, case_name, title, f"{args.out_dir}/trend_{case_name}.png", summary)
+
 
-plot_case("case1", "Average Case (Case1)", "./figs/trend_case1.png")
-plot_case("case2", "Best Case (Case2)", "./figs/trend_case2.png")
-plot_case("case3", "Worst Case (Case3)", "./figs/trend_case3.png")
+if __name__ == "__main__":
+    main()
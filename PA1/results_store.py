@@ -0,0 +1,239 @@
+#!/usr/bin/env python3
+"""
+SQLite store for NTU_sort benchmark results.
+
+Every bench.py invocation appends one session (commit, host, timestamp,
+command line) and all of its runs, so results from different runs and
+machines accumulate instead of overwriting each other.
+
+Usage:
+    python3 results_store.py import bench/results.sqlite algorithm_results.csv
+    python3 results_store.py sessions bench/results.sqlite
+
+Python:
+    conn = connect("bench/results.sqlite")
+    rows = select_runs(conn, mode="latest")            # newest session per config
+    rows = select_runs(conn, mode="all", commit="abc")  # every repetition of a commit
+"""
+
+from __future__ import annotations
+
+import argparse
+import csv
+import socket
+import sqlite3
+import subprocess
+import sys
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS sessions (
+    session_id INTEGER PRIMARY KEY AUTOINCREMENT,
+    commit_sha TEXT,
+    host TEXT,
+    timestamp TEXT NOT NULL,
+    command TEXT
+);
+CREATE TABLE IF NOT EXISTS runs (
+    session_id INTEGER NOT NULL REFERENCES sessions(session_id),
+    algorithm TEXT NOT NULL,
+    n INTEGER NOT NULL,
+    case_name TEXT NOT NULL,
+    rep INTEGER NOT NULL,
+    cpu_ms REAL,
+    mem_kb INTEGER,
+    wall_s REAL,
+    status TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS runs_config ON runs(algorithm, n, case_name);
+CREATE TABLE IF NOT EXISTS samples (
+    session_id INTEGER NOT NULL REFERENCES sessions(session_id),
+    algorithm TEXT NOT NULL,
+    n INTEGER NOT NULL,
+    case_name TEXT NOT NULL,
+    rep INTEGER NOT NULL,
+    t_s REAL NOT NULL,
+    rss_kb INTEGER,
+    cpu_s REAL
+);
+CREATE INDEX IF NOT EXISTS samples_run ON samples(session_id, algorithm, n, case_name, rep);
+"""
+
+RUN_COLUMNS = ["algorithm", "n", "case_name", "rep", "cpu_ms", "mem_kb", "wall_s", "status"]
+
+
+def connect(path) -> sqlite3.Connection:
+    Path(path).parent.mkdir(parents=True, exist_ok=True)
+    conn = sqlite3.connect(str(path))
+    conn.row_factory = sqlite3.Row
+    conn.executescript(SCHEMA)
+    return conn
+
+
+def current_commit(cwd: Optional[Path] = None) -> Optional[str]:
+    try:
+        out = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=cwd, capture_output=True, text=True, check=True,
+        )
+    except (OSError, subprocess.CalledProcessError):
+        return None
+    return out.stdout.strip() or None
+
+
+def record_session(
+    conn: sqlite3.Connection,
+    runs: Iterable[Dict],
+    commit: Optional[str] = None,
+    host: Optional[str] = None,
+    command: Optional[str] = None,
+) -> int:
+    """Append a session and its runs; returns the new session id.
+
+    ``runs`` holds dicts keyed by RUN_COLUMNS, optionally with a
+    ``samples`` list of ``(t_s, rss_kb, cpu_s)`` tuples from /proc.
+    """
+    runs = list(runs)
+    with conn:
+        cur = conn.execute(
+            "INSERT INTO sessions (commit_sha, host, timestamp, command) VALUES (?, ?, ?, ?)",
+            (
+                commit if commit is not None else current_commit(),
+                host or socket.gethostname(),
+                datetime.now(timezone.utc).isoformat(timespec="seconds"),
+                command,
+            ),
+        )
+        session_id = cur.lastrowid
+        conn.executemany(
+            f"INSERT INTO runs (session_id, {', '.join(RUN_COLUMNS)}) "
+            f"VALUES (?, {', '.join('?' for _ in RUN_COLUMNS)})",
+            ([session_id] + [run.get(col) for col in RUN_COLUMNS] for run in runs),
+        )
+        conn.executemany(
+            "INSERT INTO samples (session_id, algorithm, n, case_name, rep, t_s, rss_kb, cpu_s) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+            (
+                (session_id, run["algorithm"], run["n"], run["case_name"], run["rep"], *sample)
+                for run in runs
+                for sample in run.get("samples") or ()
+            ),
+        )
+    return session_id
+
+
+def select_runs(
+    conn: sqlite3.Connection,
+    mode: str = "latest",
+    commit: Optional[str] = None,
+    host: Optional[str] = None,
+) -> List[sqlite3.Row]:
+    """Successful runs joined with their session metadata.
+
+    mode "latest": for each (algorithm, n, case) only the newest session that
+    measured it; mode "all": every repetition of every matching session
+    (aggregate with a median downstream).  ``commit`` is a prefix match.
+    """
+    where = ["r.status = 'ok'"]
+    params: List = []
+    if commit:
+        where.append("s.commit_sha LIKE ?")
+        params.append(commit + "%")
+    if host:
+        where.append("s.host = ?")
+        params.append(host)
+    base = (
+        "SELECT r.*, s.commit_sha, s.host, s.timestamp FROM runs r "
+        "JOIN sessions s USING (session_id) WHERE " + " AND ".join(where)
+    )
+    if mode == "all":
+        return conn.execute(base, params).fetchall()
+    if mode == "latest":
+        query = (
+            f"WITH sel AS ({base}) SELECT * FROM sel WHERE session_id = ("
+            "SELECT MAX(session_id) FROM sel AS o WHERE o.algorithm = sel.algorithm "
+            "AND o.n = sel.n AND o.case_name = sel.case_name)"
+        )
+        return conn.execute(query, params).fetchall()
+    raise ValueError(f"unknown mode '{mode}'")
+
+
+def select_samples(
+    conn: sqlite3.Connection,
+    session_id: Optional[int] = None,
+    n: Optional[int] = None,
+    case: Optional[str] = None,
+) -> List[sqlite3.Row]:
+    """Memory/CPU samples of one session (default: the newest one with samples)."""
+    if session_id is None:
+        row = conn.execute("SELECT MAX(session_id) FROM samples").fetchone()
+        session_id = row[0]
+        if session_id is None:
+            return []
+    where = ["session_id = ?"]
+    params: List = [session_id]
+    if n is not None:
+        where.append("n = ?")
+        params.append(n)
+    if case is not None:
+        where.append("case_name = ?")
+        params.append(case)
+    return conn.execute(
+        "SELECT * FROM samples WHERE " + " AND ".join(where)
+        + " ORDER BY algorithm, n, case_name, rep, t_s",
+        params,
+    ).fetchall()
+
+
+def import_long_csv(conn: sqlite3.Connection, path: Path, commit: Optional[str] = None) -> int:
+    """Import a legacy long-format CSV (Algorithm,N,Case,CPU Time (ms),Memory (KB))."""
+    with path.open(newline="") as fin:
+        runs = [
+            {
+                "algorithm": row["Algorithm"],
+                "n": int(row["N"]),
+                "case_name": row["Case"],
+                "rep": int(row.get("Rep") or 0),
+                "cpu_ms": float(row["CPU Time (ms)"]),
+                "mem_kb": int(float(row["Memory (KB)"])),
+                "wall_s": None,
+                "status": row.get("Status") or "ok",
+            }
+            for row in csv.DictReader(fin)
+            if row.get("CPU Time (ms)")
+        ]
+    return record_session(conn, runs, commit=commit or "imported", command=f"import {path}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Manage the NTU_sort results store.")
+    sub = parser.add_subparsers(dest="cmd", required=True)
+    imp = sub.add_parser("import", help="Import a long-format results CSV.")
+    imp.add_argument("db", type=Path)
+    imp.add_argument("csv", type=Path)
+    imp.add_argument("--commit", default=None, help="Commit to attribute the rows to.")
+    ses = sub.add_parser("sessions", help="List recorded sessions.")
+    ses.add_argument("db", type=Path)
+    args = parser.parse_args()
+
+    conn = connect(args.db)
+    if args.cmd == "import":
+        session = import_long_csv(conn, args.csv, args.commit)
+        print(f"Imported {args.csv} as session {session}")
+    else:
+        rows = conn.execute(
+            "SELECT s.*, COUNT(r.rowid) AS runs FROM sessions s "
+            "LEFT JOIN runs r USING (session_id) GROUP BY s.session_id ORDER BY s.session_id"
+        ).fetchall()
+        for row in rows:
+            print(
+                f"{row['session_id']:>4}  {row['timestamp']}  {row['commit_sha'] or '-':<10} "
+                f"{row['host']:<20} {row['runs']:>6} runs  {row['command'] or ''}"
+            )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
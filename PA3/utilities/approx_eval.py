@@ -0,0 +1,392 @@
+#!/usr/bin/env python3
+"""
+Approximate route evaluation from a stratified sample of nets.
+
+Nets are grouped into strata by the half-perimeter of their routed bounding
+box and only a sample of each stratum is evaluated with evaluate_net:
+
+    wirelength, vias, cost   stratified estimate of the total with a normal
+                             confidence interval (finite-population corrected)
+
+Overflow is a max() of demand, so it cannot be scaled up from a sample of
+nets: weighting sampled nets up to their stratum puts lumps of demand where
+few real nets go and overstates overflow several times over.  It is
+estimated over GCell lines (the rows of H layers and columns of V layers)
+instead:
+
+    overflow                 every net's GCell runs are gathered with NumPy
+                             (tiled_eval's records) and give each line's
+                             overflow without the per-net dedup, a cheap
+                             proxy known for every line; a stratified sample
+                             of lines is scored exactly (with the dedup) and
+                             the proxy's error is estimated from it
+                             (difference estimator, interval as above)
+
+The proxy is only off where a net overlaps itself (or where runs are
+clipped at the grid border), so the sampled error is small and the
+estimate unbiased.
+
+Usage:
+    python3 approx_eval.py <cap_file> <route_file> [--fraction 0.1] [--exact]
+    python3 approx_eval.py --validate [--inputs ../inputs] [--routes DIR]
+
+--validate runs every bundled case, estimated versus exact.  A case without
+a <case>.route in --routes is routed with pattern_route.py first.
+"""
+
+from __future__ import annotations
+
+import argparse
+import math
+import sys
+import time
+from itertools import chain
+from pathlib import Path
+from statistics import NormalDist
+from typing import Dict, List, Optional
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+import pa3_evaluator  # noqa: E402
+import tiled_eval  # noqa: E402
+
+PA3_ROOT = Path(__file__).resolve().parent.parent
+LINEAR_METRICS = ("wirelength", "num_vias", "total_cost")
+METRICS = ("overflow",) + LINEAR_METRICS
+
+
+# ============================================================================
+# Sampling
+# ============================================================================
+
+def flat_segments(route_data):
+    """(segment count per net, (n, 6) array of every (x1, y1, z1, x2, y2, z2) segment)."""
+    counts = np.fromiter((len(net['segments']) for net in route_data), dtype=np.int64, count=len(route_data))
+    flat = np.fromiter(chain.from_iterable(chain.from_iterable(net['segments'] for net in route_data)),
+                       dtype=np.int64, count=6 * int(counts.sum())).reshape(-1, 6)
+    return counts, flat
+
+
+def bbox_sizes(counts: np.ndarray, flat: np.ndarray) -> np.ndarray:
+    """Half-perimeter (in GCells) of the bounding box of each net's segments."""
+    sizes = np.zeros(len(counts), dtype=np.int64)
+    routed = counts > 0
+    if routed.any():
+        starts = (np.cumsum(counts) - counts)[routed]
+        xs = np.concatenate([flat[:, 0], flat[:, 3]]).reshape(2, -1)
+        ys = np.concatenate([flat[:, 1], flat[:, 4]]).reshape(2, -1)
+        width = np.maximum.reduceat(xs.max(axis=0), starts) - np.minimum.reduceat(xs.min(axis=0), starts)
+        height = np.maximum.reduceat(ys.max(axis=0), starts) - np.minimum.reduceat(ys.min(axis=0), starts)
+        sizes[routed] = width + height
+    return sizes
+
+
+def stratify(sizes: np.ndarray, strata: int) -> np.ndarray:
+    """Stratum id per net from quantiles of log(1 + bbox size)."""
+    if not len(sizes):
+        return np.zeros(0, dtype=np.int64)
+    keys = np.log1p(sizes)
+    edges = np.unique(np.quantile(keys, np.linspace(0, 1, strata + 1)[1:-1]))
+    return np.searchsorted(edges, keys, side='right')
+
+
+def allocate(sizes: np.ndarray, strata: np.ndarray, n: int) -> np.ndarray:
+    """
+    Sample size per stratum
+
+    Neyman-style: proportional to N_h times the spread of ``sizes`` in the
+    stratum, at least 2 per stratum so every stratum has a variance estimate,
+    at most N_h.  What rounding or the N_h caps leave over goes to the
+    strata that still have room, so the total is n (or every net).
+    """
+    ids = np.arange(strata.max() + 1 if len(strata) else 0)
+    counts = np.bincount(strata, minlength=len(ids))
+    spread = np.array([sizes[strata == h].std() + 1.0 if counts[h] else 0.0 for h in ids])
+    weight = counts * spread
+    alloc = np.floor(n * weight / max(weight.sum(), 1e-12)).astype(np.int64)
+    alloc = np.minimum(np.maximum(alloc, np.minimum(2, counts)), counts)
+    while True:
+        left = n - int(alloc.sum())
+        room = alloc < counts
+        if left <= 0 or not room.any():
+            return alloc
+        share = left * np.where(room, weight, 0.0) / weight[room].sum()
+        add = np.minimum(np.floor(share).astype(np.int64), counts - alloc)
+        if not add.any():
+            # Each share is below one net: largest remainders first
+            add = np.zeros_like(alloc)
+            add[np.argsort(-share, kind='stable')[:left]] = 1
+            add[~room] = 0
+        alloc += add
+
+
+def draw_sample(strata: np.ndarray, alloc: np.ndarray, rng: np.random.Generator) -> List[np.ndarray]:
+    """Net indices sampled without replacement, one array per stratum."""
+    sample = []
+    for h, n_h in enumerate(alloc):
+        members = np.flatnonzero(strata == h)
+        sample.append(np.sort(rng.choice(members, size=int(n_h), replace=False)))
+    return sample
+
+
+# ============================================================================
+# Estimation
+# ============================================================================
+
+def interval(estimate: float, variance: float, z: float) -> Dict[str, float]:
+    stderr = math.sqrt(max(variance, 0.0))
+    return {'estimate': estimate, 'low': estimate - z * stderr, 'high': estimate + z * stderr, 'stderr': stderr}
+
+
+def stratified_total(per_stratum: List[np.ndarray], population: np.ndarray):
+    """Total and its variance, Var = sum N_h^2 (1 - n_h/N_h) s_h^2 / n_h."""
+    total = 0.0
+    variance = 0.0
+    for h, values in enumerate(per_stratum):
+        n_h, N_h = len(values), population[h]
+        if not n_h:
+            continue
+        total += N_h * values.mean()
+        if n_h > 1:
+            variance += N_h * N_h * (1 - n_h / N_h) * values.var(ddof=1) / n_h
+    return total, variance
+
+
+def approx_evaluate(cap_data, route_data, fraction: float = 0.1, strata: int = 8,
+                    confidence: float = 0.95, seed: int = 0, min_sample: int = 200) -> Dict:
+    """
+    Estimate evaluate_route from a stratified sample of nets and GCell lines
+
+    Args:
+        cap_data: capacity data from parse_cap_file
+        route_data: route data from parse_route_file
+        fraction: share of nets, and of GCell lines, to evaluate (at least
+            min_sample of each)
+        strata: number of bbox-size strata (and of proxy strata per layer)
+        confidence: two-sided confidence level of the intervals
+        seed: sampling seed
+
+    Returns:
+        dict with one {'estimate', 'low', 'high', 'stderr'} dict per metric
+        (overflow, wirelength, num_vias, total_cost), plus 'nets', 'sampled',
+        'lines' and 'sampled_lines'
+    """
+    shape = (cap_data['nLayers'], cap_data['ySize'], cap_data['xSize'])
+    unit_via_cost = cap_data['unit_via_cost']
+    z = NormalDist().inv_cdf(0.5 + confidence / 2)
+    rng = np.random.default_rng(seed)
+
+    n_nets = len(route_data)
+    counts, flat = flat_segments(route_data)
+    sizes = bbox_sizes(counts, flat)
+    groups = stratify(sizes, strata)
+    target = min(n_nets, max(int(math.ceil(fraction * n_nets)), min_sample))
+    alloc = allocate(sizes, groups, target)
+    sample = draw_sample(groups, alloc, rng)
+    population = np.bincount(groups, minlength=len(alloc))
+
+    # Evaluate the sampled nets
+    result = {}
+    per_stratum = {metric: [] for metric in LINEAR_METRICS}
+    for h, members in enumerate(sample):
+        values = np.zeros((len(members), 2), dtype=np.int64)
+        for j, i in enumerate(members):
+            _, wirelength, vias = pa3_evaluator.evaluate_net(cap_data, route_data[i]['segments'])
+            values[j] = wirelength, vias
+        per_stratum['wirelength'].append(values[:, 0])
+        per_stratum['num_vias'].append(values[:, 1])
+        per_stratum['total_cost'].append(values[:, 0] + values[:, 1] * unit_via_cost)
+
+    for metric in LINEAR_METRICS:
+        result[metric] = interval(*stratified_total(per_stratum[metric], population), z)
+
+    overflow, variance, lines, sampled_lines = estimate_overflow(
+        cap_data, shape, counts, flat, fraction, strata, min_sample, rng)
+    result['overflow'] = interval(overflow, variance, z)
+    result['overflow']['low'] = max(result['overflow']['low'], 0.0)
+    result['nets'] = n_nets
+    result['sampled'] = sum(len(members) for members in sample)
+    result['lines'] = lines
+    result['sampled_lines'] = sampled_lines
+    return result
+
+
+def run_demand(records: np.ndarray, shape) -> np.ndarray:
+    """Demand from GCell runs without the per-net dedup (every run counts)."""
+    n_layers, y_size, x_size = shape
+    layer = records[:, 1] % n_layers
+    y = records[:, 2] % y_size
+    x = records[:, 3] % x_size
+    length = records[:, 4]
+    h = records[:, 5] == 1
+    diff_h = np.zeros(n_layers * y_size * (x_size + 1), dtype=np.int64)
+    diff_v = np.zeros(n_layers * (y_size + 1) * x_size, dtype=np.int64)
+    index_h = (layer[h] * y_size + y[h]) * (x_size + 1)
+    diff_h += np.bincount(index_h + x[h], minlength=diff_h.size)
+    diff_h -= np.bincount(index_h + x[h] + length[h], minlength=diff_h.size)
+    index_v = layer[~h] * (y_size + 1)
+    diff_v += np.bincount((index_v + y[~h]) * x_size + x[~h], minlength=diff_v.size)
+    diff_v -= np.bincount((index_v + y[~h] + length[~h]) * x_size + x[~h], minlength=diff_v.size)
+    return (np.cumsum(diff_h.reshape(n_layers, y_size, x_size + 1), axis=2)[:, :, :x_size]
+            + np.cumsum(diff_v.reshape(n_layers, y_size + 1, x_size), axis=1)[:, :y_size, :])
+
+
+def estimate_overflow(cap_data, shape, counts, flat, fraction, strata, min_sample, rng):
+    """
+    Overflow from every line's proxy and a stratified sample of exact lines
+
+    The proxy is each line's overflow from demand without the per-net dedup.
+    Lines whose proxy lies far above the rest of their layer (typically the
+    grid border, where clipped runs pile up) are all scored exactly; the
+    others are stratified by layer and proxy quantile and allocated by the
+    spread of the proxy.  The proxy's total error is estimated from the
+    sampled lines.
+
+    Returns:
+        tuple (estimate, variance, number of lines, lines sampled)
+    """
+    n_layers, y_size, x_size = shape
+    directions = [layer['direction'] for layer in cap_data['layers']]
+    capacity = np.array([layer['capacities'] for layer in cap_data['layers']], dtype=np.int64)
+
+    # Line (layer, position): rows of H layers, columns of V layers
+    def line_totals(grid):
+        over = np.maximum(grid - capacity, 0)
+        return np.concatenate([over[l].sum(axis=1) if directions[l] == 'H' else over[l].sum(axis=0)
+                               for l in range(n_layers)])
+
+    header = {'nLayers': n_layers, 'ySize': y_size, 'xSize': x_size, 'directions': directions}
+    prefixes = tuple(np.array(p, dtype=np.int64) for p in pa3_evaluator.edge_length_prefix(cap_data))
+    _, _, records = tiled_eval.chunk_records(header, prefixes, 0, counts, flat[:, [2, 0, 1, 5, 3, 4]])
+    proxy = line_totals(run_demand(records, shape))
+
+    line_size = np.array([y_size if d == 'H' else x_size for d in directions], dtype=np.int64)
+    line_start = np.cumsum(line_size) - line_size
+    n_lines = int(line_size.sum())
+    line_layer = np.repeat(np.arange(n_layers), line_size)
+    low, high = (np.array([np.quantile(proxy[line_layer == l], q) for l in range(n_layers)]) for q in (0.1, 0.9))
+    certain = proxy > (high + 2 * (high - low))[line_layer]
+
+    target = min(n_lines, max(int(math.ceil(fraction * n_lines)), min_sample))
+    rest = np.flatnonzero(~certain)
+    bins = stratify(proxy[rest], strata)
+    line_strata = line_layer[rest] * (bins.max(initial=0) + 1) + bins
+    line_alloc = allocate(proxy[rest], line_strata, max(target - int(certain.sum()), 0))
+    line_sample = [rest[members] for members in draw_sample(line_strata, line_alloc, rng)]
+    picked = certain.copy()
+    picked[np.concatenate(line_sample)] = True
+
+    # Exact (deduplicated) demand on the sampled lines
+    layer = records[:, 1] % n_layers
+    position = np.where(records[:, 5] == 1, records[:, 2] % y_size, records[:, 3] % x_size)
+    exact = line_totals(tiled_eval.tile_demand(records[picked[line_start[layer] + position]], shape, shape, 0, 0))
+
+    population = np.bincount(line_strata, minlength=len(line_alloc))
+    error, variance = stratified_total([(exact - proxy)[members].astype(np.float64) for members in line_sample],
+                                       population)
+    error += float((exact - proxy)[certain].sum())
+    return float(proxy.sum()) + error, variance, n_lines, int(picked.sum())
+
+
+def print_estimate(result: Dict, exact: Optional[Dict] = None) -> None:
+    print(f"Sampled {result['sampled']} of {result['nets']} nets, "
+          f"{result['sampled_lines']} of {result['lines']} GCell lines")
+    header = f"{'metric':<12} {'estimate':>16} {'low':>16} {'high':>16}"
+    if exact is not None:
+        header += f" {'exact':>14} {'rel.err':>8}  in CI"
+    print(header)
+    for metric in METRICS:
+        est = result[metric]
+        line = f"{metric:<12} {est['estimate']:>16.1f} {est['low']:>16.1f} {est['high']:>16.1f}"
+        if exact is not None:
+            value = exact[metric]
+            rel = abs(est['estimate'] - value) / value if value else abs(est['estimate'])
+            covered = "yes" if est['low'] <= value <= est['high'] else "no"
+            line += f" {value:>14} {rel:>8.2%}  {covered}"
+        print(line)
+
+
+# ============================================================================
+# Validation over the bundled cases
+# ============================================================================
+
+def load_or_route(cap_data, net_file: Path, route_file: Path):
+    """Routes from route_file, or from pattern_route when it does not exist."""
+    if route_file.exists():
+        return pa3_evaluator.parse_route_file(str(route_file)), "file"
+    import pattern_route
+    net_data = pa3_evaluator.parse_net_file(str(net_file))
+    names, pts, count = pattern_route.route_patterns(cap_data, net_data)
+    return pattern_route.to_route_data(names, pts, count), "pattern_route"
+
+
+def validate(inputs: Path, routes: Optional[Path], **kwargs) -> int:
+    cases = sorted(inputs.glob("*.cap"))
+    if not cases:
+        print(f"No .cap files in {inputs}")
+        return 1
+    for cap_file in cases:
+        name = cap_file.stem
+        cap_data = pa3_evaluator.parse_cap_file(str(cap_file))
+        route_file = (routes or inputs) / f"{name}.route"
+        route_data, source = load_or_route(cap_data, cap_file.with_suffix(".net"), route_file)
+
+        t0 = time.perf_counter()
+        exact = pa3_evaluator.evaluate_route(cap_data, route_data)
+        t1 = time.perf_counter()
+        result = approx_evaluate(cap_data, route_data, **kwargs)
+        t2 = time.perf_counter()
+        print(f"\n=== {name} (routes from {source}) ===")
+        print(f"exact {t1 - t0:.3f}s, approximate {t2 - t1:.3f}s")
+        print_estimate(result, exact)
+    return 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Sampling-based approximate route evaluation.")
+    parser.add_argument("cap_file", type=Path, nargs="?")
+    parser.add_argument("route_file", type=Path, nargs="?")
+    parser.add_argument("--fraction", type=float, default=0.1, help="Share of nets to evaluate.")
+    parser.add_argument("--min-sample", type=int, default=200, help="Evaluate at least this many nets and lines.")
+    parser.add_argument("--strata", type=int, default=8, help="Bounding-box size strata.")
+    parser.add_argument("--confidence", type=float, default=0.95)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--exact", action="store_true", help="Also run evaluate_route and compare.")
+    parser.add_argument("--validate", action="store_true", help="Estimated vs exact on the bundled cases.")
+    parser.add_argument("--inputs", type=Path, default=PA3_ROOT / "inputs")
+    parser.add_argument("--routes", type=Path, default=None,
+                        help="Directory with <case>.route files for --validate (default: --inputs).")
+    args = parser.parse_args()
+
+    if not 0 < args.fraction <= 1:
+        parser.error("--fraction must be in (0, 1]")
+    if not 0 < args.confidence < 1:
+        parser.error("--confidence must be in (0, 1)")
+    kwargs = dict(fraction=args.fraction, strata=args.strata, confidence=args.confidence,
+                  seed=args.seed, min_sample=args.min_sample)
+
+    if args.validate:
+        return validate(args.inputs, args.routes, **kwargs)
+    if args.cap_file is None or args.route_file is None:
+        parser.error("cap_file and route_file are required unless --validate is given")
+    for path in (args.cap_file, args.route_file):
+        if not path.exists():
+            parser.error(f"file not found: {path}")
+
+    cap_data = pa3_evaluator.parse_cap_file(str(args.cap_file))
+    route_data = pa3_evaluator.parse_route_file(str(args.route_file))
+    t0 = time.perf_counter()
+    result = approx_evaluate(cap_data, route_data, **kwargs)
+    t1 = time.perf_counter()
+    exact = None
+    if args.exact:
+        exact = pa3_evaluator.evaluate_route(cap_data, route_data)
+    t2 = time.perf_counter()
+    print_estimate(result, exact)
+    print(f"approximate {t1 - t0:.3f}s" + (f", exact {t2 - t1:.3f}s" if args.exact else ""))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
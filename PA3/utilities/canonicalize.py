@@ -0,0 +1,258 @@
+#!/usr/bin/env python3
+"""
+Canonicalize a PA3 .route file: fewer segments, same routing.
+
+Default (metric-preserving) rewrites, applied along each net's segment chain:
+
+    - zero-length segments are dropped;
+    - consecutive wires on the same layer and line that continue in the same
+      direction through a shared end point are merged into one wire.
+
+Both keep evaluate_route's overflow, wirelength and via count exactly (the
+evaluator counts wirelength per segment, so only abutting, never
+overlapping, wires are merged).
+
+--aggressive also:
+
+    - drops repeated segments (either orientation) after their first use;
+    - collapses consecutive vias at the same (x, y) into one via between the
+      outer layers, and drops a via that goes straight back.
+
+These change the metrics (fewer vias, no demand on the skipped layers,
+no double-counted wirelength); the change is reported.
+
+Segments are only merged through a point no other segment of the net uses
+and that is not a pin, so the evaluator's chain connectivity check still
+passes.  Pins come from --net; without it the end points of each net's first
+and last segment are kept.
+
+Usage:
+    python3 canonicalize.py <cap_file> <route_file> [-o out.route] [--net case.net]
+    python3 canonicalize.py case.cap case.route --aggressive -o out.route --binary
+    python3 canonicalize.py case.cap case.route --check       # evaluate both and compare
+"""
+
+from __future__ import annotations
+
+import argparse
+import sys
+import time
+from collections import Counter
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence, Set, Tuple
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+import pa3_evaluator  # noqa: E402
+import route_bin  # noqa: E402
+
+Segment = Tuple[int, int, int, int, int, int]
+Point = Tuple[int, int, int]
+STAT_KEYS = ("zero_length", "duplicates", "merged_wires", "merged_vias", "cancelled_vias")
+
+
+def endpoints(seg: Segment) -> Tuple[Point, Point]:
+    return seg[:3], seg[3:]
+
+
+def join(seg_a: Segment, seg_b: Segment, counts: Counter, protected: Set[Point]):
+    """(outer end of seg_a, shared point, outer end of seg_b) if they may be joined, else None."""
+    a0, a1 = endpoints(seg_a)
+    b0, b1 = endpoints(seg_b)
+    for shared, a, c in ((a1, a0, None), (a0, a1, None)):
+        if shared == b0:
+            c = b1
+        elif shared == b1:
+            c = b0
+        else:
+            continue
+        if shared not in protected and counts[shared] == 2:
+            return a, shared, c
+    return None
+
+
+def merge_wires(a: Point, b: Point, c: Point, horizontal: bool) -> bool:
+    """True if a-b and b-c are one straight wire along the layer's direction."""
+    if not (a[2] == b[2] == c[2]):
+        return False
+    if horizontal:
+        return a[1] == b[1] == c[1] and (a[0] < b[0] < c[0] or a[0] > b[0] > c[0])
+    return a[0] == b[0] == c[0] and (a[1] < b[1] < c[1] or a[1] > b[1] > c[1])
+
+
+def canonicalize_net(segments: Sequence[Segment], directions: Sequence[str], protected: Set[Point],
+                     aggressive: bool = False, stats: Optional[Counter] = None) -> List[Segment]:
+    """
+    Canonical segment chain of one net
+
+    Args:
+        segments: (x1, y1, z1, x2, y2, z2) segments in route order
+        directions: layer directions ('H' or 'V') from the cap file
+        protected: points that must stay segment end points (the pins)
+        aggressive: also drop duplicates and collapse via stacks
+        stats: Counter updated with STAT_KEYS counts
+
+    Returns:
+        the new segment list
+    """
+    stats = Counter() if stats is None else stats
+    segs = [s for s in segments if s[:3] != s[3:]]
+    if not segs:
+        # Keep an all zero-length net as is rather than leave it empty
+        return list(segments)
+    stats['zero_length'] += len(segments) - len(segs)
+
+    segs = merge_chain(segs, directions, protected, aggressive, stats)
+    if aggressive:
+        # Bounces are cancelled first so that they do not leave a stub via
+        # behind; dropping duplicates may then open up more merges
+        seen = set()
+        unique = []
+        for s in segs:
+            key = min(s[:3], s[3:]) + max(s[:3], s[3:])
+            if key not in seen:
+                seen.add(key)
+                unique.append(s)
+        if len(unique) < len(segs):
+            stats['duplicates'] += len(segs) - len(unique)
+            segs = merge_chain(unique, directions, protected, aggressive, stats)
+    return segs
+
+
+def merge_chain(segs: Sequence[Segment], directions: Sequence[str], protected: Set[Point],
+                aggressive: bool, stats: Counter) -> List[Segment]:
+    """One pass of wire merging (and, if aggressive, via collapsing) along the chain."""
+    counts = Counter(p for s in segs for p in endpoints(s))
+    out: List[Segment] = []
+    for seg in segs:
+        while out:
+            joined = join(out[-1], seg, counts, protected)
+            if joined is None:
+                break
+            a, b, c = joined
+            prev_via = a[2] != b[2]
+            if not prev_via and seg[2] == seg[5] and 0 <= a[2] < len(directions) \
+                    and merge_wires(a, b, c, directions[a[2]] == 'H'):
+                stats['merged_wires'] += 1
+            elif aggressive and prev_via and seg[2] != seg[5] and a[:2] == b[:2] == c[:2]:
+                if a == c:
+                    # Straight back down: both vias go, the chain continues from a
+                    stats['cancelled_vias'] += 2
+                    counts[a] -= 2
+                    counts[b] -= 2
+                    out.pop()
+                    seg = None
+                    break
+                stats['merged_vias'] += 1
+            else:
+                break
+            counts[b] -= 2
+            out.pop()
+            seg = a + c
+        if seg is not None:
+            out.append(seg)
+    return out
+
+
+def canonicalize_route(cap_data, route_data, net_data=None, aggressive: bool = False):
+    """
+    Canonicalize every net
+
+    Returns:
+        tuple (new route_data, stats Counter)
+    """
+    directions = [layer['direction'] for layer in cap_data['layers']]
+    pins: Dict[str, Set[Point]] = {}
+    for net in net_data or ():
+        pins[net['name']] = {(x, y, z) for z, x, y in net['pins']}
+    stats = Counter()
+    result = []
+    for net in route_data:
+        segments = net['segments']
+        if net_data is not None:
+            protected = pins.get(net['name'], set())
+        elif segments:
+            protected = set(endpoints(segments[0]) + endpoints(segments[-1]))
+        else:
+            protected = set()
+        result.append({
+            'name': net['name'],
+            'segments': canonicalize_net(segments, directions, protected, aggressive, stats),
+        })
+    return result, stats
+
+
+def to_binary_route(route_data) -> route_bin.BinaryRoute:
+    counts = [len(net['segments']) for net in route_data]
+    seg_index = np.zeros(len(route_data) + 1, dtype=np.int64)
+    np.cumsum(counts, out=seg_index[1:])
+    segments = np.array([s for net in route_data for s in net['segments']], dtype=np.int64).reshape(-1, 6)
+    return route_bin.BinaryRoute(
+        [net['name'] for net in route_data], seg_index,
+        route_bin.to_int32(segments[:, [2, 0, 1, 5, 3, 4]]),
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Merge collinear wires and drop redundant segments.")
+    parser.add_argument("cap_file", type=Path)
+    parser.add_argument("route_file", type=Path)
+    parser.add_argument("-o", "--output", type=Path, default=None, help="Write the canonical route here.")
+    parser.add_argument("--binary", action="store_true", help="Write the output in route_bin's format.")
+    parser.add_argument("--net", type=Path, default=None,
+                        help="Net file: protect pins and report connectivity before and after.")
+    parser.add_argument("--aggressive", action="store_true",
+                        help="Also drop duplicates and collapse via stacks (changes the metrics).")
+    parser.add_argument("--check", action="store_true",
+                        help="Evaluate both routes (always done with --aggressive).")
+    args = parser.parse_args()
+
+    for path in (args.cap_file, args.route_file, args.net):
+        if path is not None and not path.exists():
+            parser.error(f"file not found: {path}")
+
+    cap_data = pa3_evaluator.parse_cap_file(str(args.cap_file))
+    route_data = pa3_evaluator.parse_route_file(str(args.route_file))
+    net_data = pa3_evaluator.parse_net_file(str(args.net)) if args.net else None
+
+    t0 = time.perf_counter()
+    canonical, stats = canonicalize_route(cap_data, route_data, net_data, args.aggressive)
+    t1 = time.perf_counter()
+
+    before = sum(len(net['segments']) for net in route_data)
+    after = sum(len(net['segments']) for net in canonical)
+    print("=== Canonicalization ===")
+    print(f"Segments: {before} -> {after} ({before - after} fewer, "
+          f"{(before - after) / before if before else 0:.1%}) in {t1 - t0:.2f}s")
+    for key in STAT_KEYS:
+        if stats[key]:
+            print(f"  {key}: {stats[key]}")
+
+    status = 0
+    if args.check or args.aggressive:
+        old = pa3_evaluator.evaluate_route(cap_data, route_data)
+        new = pa3_evaluator.evaluate_route(cap_data, canonical)
+        print(f"{'':<12} {'before':>14} {'after':>14} {'delta':>14}")
+        for key in ('overflow', 'total_cost', 'wirelength', 'num_vias'):
+            print(f"{key:<12} {old[key]:>14} {new[key]:>14} {new[key] - old[key]:>+14}")
+        if not args.aggressive and old != new:
+            print("Metric-preserving canonicalization changed the metrics")
+            status = 1
+    if net_data is not None:
+        for label, route in (("before", route_data), ("after", canonical)):
+            connectivity = pa3_evaluator.check_connectivity(net_data, route)
+            print(f"Disconnected nets {label}: {len(connectivity['disconnected_nets'])}")
+
+    if args.output:
+        binary = to_binary_route(canonical)
+        if args.binary:
+            route_bin.write_route_bin(args.output, binary)
+        else:
+            route_bin.write_route_text(args.output, binary)
+        print(f"Wrote {args.output}")
+    return status
+
+
+if __name__ == "__main__":
+    sys.exit(main())
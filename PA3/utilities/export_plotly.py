@@ -8,14 +8,31 @@ Usage:
         --route outputs/toy1.route \
         --net inputs/toy1.net \
         --out outputs/toy1_plot.html
+
+Region-of-interest extraction (all filters can be combined):
+    --bbox 10,10,40,30       only segments touching gcells x0..x1, y0..y1
+    --nets 'clk.*'           nets whose name fully matches the regex
+    --nets net1,net7         or an explicit comma-separated list
+    --top-congested 20       nets using the 20 most congested gcells
+
+Route evolution over router iterations (one frame per snapshot):
+    --snapshots outputs/iter0.route outputs/iter1.route ...
+
+Per-layer 2D view (WebGL) with an optional congestion heatmap:
+    --mode 2d [--underlay demand|overflow]
 """
 
 from __future__ import annotations
 
 import argparse
+import json
+import mmap
+import re
 import sys
+from collections import Counter
+from itertools import islice
 from pathlib import Path
-from typing import Dict, List, Tuple
+from typing import Dict, Iterable, List, Set, Tuple
 
 try:
     import plotly.graph_objects as go
@@ -31,112 +48,141 @@ except ImportError:  # pragma: no cover - dependency hint
 Coord = Tuple[int, int, int]
 
 
-def parse_cap(path: Path):
-    tokens: List[str] = []
-    with path.open() as fin:
-        for raw in fin:
-            line = raw.strip()
-            if not line or line.startswith("#"):
-                continue
-            tokens.extend(line.split())
+# A layer header is "<name> <H|V>"; capacity rows only hold numbers, so the
+# headers can be located with one regex scan instead of tokenizing the grid.
+LAYER_HEADER = re.compile(rb"^[ \t]*([A-Za-z_][^\s]*)[ \t]+([HVhv])[ \t]*\r?$", re.M)
 
-    it = iter(tokens)
-    try:
-        num_layers = int(next(it))
-        if num_layers != 2:
-            raise ValueError("Only 2-layer designs are supported.")
-        x_size = int(next(it))
-        y_size = int(next(it))
-        via_cost = int(next(it))
-
-        horizontal = [float(next(it)) for _ in range(max(0, x_size - 1))]
-        vertical = [float(next(it)) for _ in range(max(0, y_size - 1))]
-
-        layers = []
-        for _ in range(num_layers):
-            name = next(it)
-            direction = next(it)
-            layers.append((name, direction))
-            for _ in range(x_size * y_size):
-                next(it)  # skip capacities
-
-    except StopIteration as exc:
-        raise ValueError(f"Malformed .cap file: {path}") from exc
 
-    return {
+def parse_cap(path: Path, with_capacity: bool = False):
+    """Parse the .cap header and locate each layer's capacity block.
+
+    Capacity values are not tokenized here: only the byte span of every
+    layer's block is recorded, and ``load_capacities`` parses them on demand.
+    """
+    with path.open("rb") as fin, mmap.mmap(fin.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        header: List[List[bytes]] = []
+        pos = 0
+        while len(header) < 4 and pos < len(mm):
+            end = mm.find(b"\n", pos)
+            if end < 0:
+                end = len(mm)
+            line = mm[pos:end].strip()
+            pos = end + 1
+            if line and not line.startswith(b"#"):
+                header.append(line.split())
+
+        try:
+            num_layers, x_size, y_size = (int(tok) for tok in header[0][:3])
+            via_cost = int(header[1][0])
+            horizontal = [float(tok) for tok in header[2]]
+            vertical = [float(tok) for tok in header[3]]
+        except (IndexError, ValueError) as exc:
+            raise ValueError(f"Malformed .cap file: {path}") from exc
+
+        matches = list(islice(LAYER_HEADER.finditer(mm, pos), num_layers))
+        if len(matches) != num_layers:
+            raise ValueError(
+                f"Malformed .cap file: {path} (expected {num_layers} layers, "
+                f"found {len(matches)})"
+            )
+        layers = [(m.group(1).decode(), m.group(2).decode().upper()) for m in matches]
+        ends = [m.start() for m in matches[1:]] + [len(mm)]
+        spans = [(m.end(), end) for m, end in zip(matches, ends)]
+
+    cap_info = {
+        "path": path,
+        "num_layers": num_layers,
         "x_size": x_size,
         "y_size": y_size,
-        "horizontal": horizontal,
-        "vertical": vertical,
+        "horizontal": horizontal[: max(0, x_size - 1)],
+        "vertical": vertical[: max(0, y_size - 1)],
         "layers": layers,
         "via_cost": via_cost,
+        "capacity_spans": spans,
+        "capacities": None,
     }
+    if with_capacity:
+        load_capacities(cap_info)
+    return cap_info
 
 
-def parse_route(path: Path):
-    nets = []
+def load_capacities(cap_info) -> List[List[int]]:
+    """Parse (once) and return per-layer capacities, flattened row-major.
+
+    Like the evaluator, each layer holds ``y_size`` rows of ``x_size`` values.
+    """
+    if cap_info["capacities"] is not None:
+        return cap_info["capacities"]
+    count = cap_info["x_size"] * cap_info["y_size"]
+    capacities = []
+    with cap_info["path"].open("rb") as fin, mmap.mmap(
+        fin.fileno(), 0, access=mmap.ACCESS_READ
+    ) as mm:
+        for (name, _), (start, end) in zip(cap_info["layers"], cap_info["capacity_spans"]):
+            values = mm[start:end].split()
+            if len(values) < count:
+                raise ValueError(
+                    f"Malformed .cap file: {cap_info['path']} (layer {name} has "
+                    f"{len(values)} capacities, expected {count})"
+                )
+            capacities.append([int(v) for v in values[:count]])
+    cap_info["capacities"] = capacities
+    return capacities
+
+
+def iter_blocks(path: Path, kind: str = ""):
+    """Yield ``(name, body_lines)`` for each ``name ( ... )`` block, streaming."""
     with path.open() as fin:
-        lines = fin.readlines()
+        lines = (raw.strip() for raw in fin)
+        for name in lines:
+            if not name:
+                continue
+            line = next(lines, None)
+            while line == "":
+                line = next(lines, None)
+            if line is None or not line.startswith("("):
+                raise ValueError(f"Expected '(' after net '{name}'{kind}")
+
+            body = []
+            for line in lines:
+                if not line:
+                    continue
+                if line.startswith(")"):
+                    break
+                body.append(line)
+            yield name, body
 
-    idx = 0
-    while idx < len(lines):
-        name = lines[idx].strip()
-        idx += 1
-        if not name:
-            continue
 
-        while idx < len(lines) and lines[idx].strip() == "":
-            idx += 1
-        if idx >= len(lines) or not lines[idx].strip().startswith("("):
-            raise ValueError(f"Expected '(' after net '{name}'")
-        idx += 1
+def iter_route(path: Path):
+    """Yield route nets one at a time without holding the whole file.
 
+    Binary route files (route_bin.py) are memory-mapped and decoded in chunks.
+    """
+    import route_bin
+
+    if route_bin.is_route_bin(path):
+        yield from route_bin.iter_plotly_nets(route_bin.read_route_bin(path))
+        return
+    for name, body in iter_blocks(path):
         segments = []
-        while idx < len(lines):
-            line = lines[idx].strip()
-            idx += 1
-            if not line:
-                continue
-            if line.startswith(")"):
-                break
+        for line in body:
             parts = line.replace(",", " ").split()
             if len(parts) != 6:
                 raise ValueError(f"Bad segment line '{line}' in net '{name}'")
             vals = list(map(int, parts))
             segments.append(((vals[0], vals[1], vals[2]), (vals[3], vals[4], vals[5])))
-        nets.append({"name": name, "segments": segments})
+        yield {"name": name, "segments": segments}
 
-    return nets
 
+def parse_route(path: Path):
+    return list(iter_route(path))
 
-def parse_net(path: Path | None) -> Dict[str, List[Coord]]:
-    pins: Dict[str, List[Coord]] = {}
-    if path is None:
-        return pins
-
-    with path.open() as fin:
-        lines = fin.readlines()
-
-    idx = 0
-    while idx < len(lines):
-        name = lines[idx].strip()
-        idx += 1
-        if not name:
-            continue
-        while idx < len(lines) and lines[idx].strip() == "":
-            idx += 1
-        if idx >= len(lines) or not lines[idx].strip().startswith("("):
-            raise ValueError(f"Expected '(' after net '{name}' in .net file")
-        idx += 1
 
+def iter_net_pins(path: Path):
+    """Yield ``(name, [first_pin, last_pin])`` for nets with at least two pins."""
+    for name, body in iter_blocks(path, " in .net file"):
         coords = []
-        while idx < len(lines):
-            line = lines[idx].strip()
-            idx += 1
-            if not line:
-                continue
-            if line.startswith(")"):
-                break
+        for line in body:
             parts = (
                 line.replace("(", "")
                 .replace(")", "")
@@ -148,9 +194,164 @@ def parse_net(path: Path | None) -> Dict[str, List[Coord]]:
             coord = tuple(map(int, parts))
             coords.append(coord)
         if len(coords) >= 2:
-            pins[name] = [coords[0], coords[-1]]
+            yield name, [coords[0], coords[-1]]
+
+
+def parse_net(path: Path | None) -> Dict[str, List[Coord]]:
+    if path is None:
+        return {}
+    return dict(iter_net_pins(path))
+
+
+def parse_bbox(text: str) -> Tuple[int, int, int, int]:
+    parts = text.replace(" ", "").split(",")
+    if len(parts) != 4:
+        raise argparse.ArgumentTypeError(f"Expected x0,y0,x1,y1, got '{text}'")
+    try:
+        x0, y0, x1, y1 = map(int, parts)
+    except ValueError as exc:
+        raise argparse.ArgumentTypeError(f"Non-integer bbox '{text}'") from exc
+    return min(x0, x1), min(y0, y1), max(x0, x1), max(y0, y1)
+
+
+def segments_in_bbox(segments, bbox):
+    """Segments whose gcell span touches ``bbox`` (x0, y0, x1, y1, inclusive)."""
+    x0, y0, x1, y1 = bbox
+    return [
+        seg
+        for seg in segments
+        if max(seg[0][1], seg[1][1]) >= x0
+        and min(seg[0][1], seg[1][1]) <= x1
+        and max(seg[0][2], seg[1][2]) >= y0
+        and min(seg[0][2], seg[1][2]) <= y1
+    ]
+
+
+def match_nets(nets, spec: str) -> Set[int]:
+    """Net indices selected by a comma-separated list or a full-match regex."""
+    if "," in spec:
+        wanted = {name.strip() for name in spec.split(",") if name.strip()}
+        return {idx for idx, net in enumerate(nets) if net["name"] in wanted}
+    pattern = re.compile(spec)
+    return {idx for idx, net in enumerate(nets) if pattern.fullmatch(net["name"])}
+
 
-    return pins
+def segment_gcells(segment, cap_info) -> Iterable[Coord]:
+    """Yield the (layer, row, col) gcells a segment occupies.
+
+    Mirrors ``evaluate_route`` in pa3_evaluator.py: a via occupies its gcell on
+    both layers, a wire occupies ``[min, max)`` along the layer direction.
+    """
+    (l1, x1, y1), (l2, x2, y2) = segment
+    if l1 != l2:
+        yield l1, y1, x1
+        yield l2, y1, x1
+        return
+    direction = cap_info["layers"][l1][1]
+    if direction == "H" and y1 == y2 and 0 <= y1 < cap_info["y_size"]:
+        for x in range(max(0, min(x1, x2)), min(max(x1, x2), cap_info["x_size"])):
+            yield l1, y1, x
+    elif direction == "V" and x1 == x2 and 0 <= x1 < cap_info["x_size"]:
+        for y in range(max(0, min(y1, y2)), min(max(y1, y2), cap_info["y_size"])):
+            yield l1, y, x1
+
+
+def net_gcells(net, cap_info) -> Set[Coord]:
+    gcells: Set[Coord] = set()
+    for segment in net["segments"]:
+        gcells.update(segment_gcells(segment, cap_info))
+    return gcells
+
+
+def gcell_usage(nets, cap_info) -> Counter:
+    """Demand per gcell: the number of distinct nets occupying it."""
+    usage: Counter = Counter()
+    for net in nets:
+        usage.update(net_gcells(net, cap_info))
+    return usage
+
+
+def underlay_grids(usage: Counter, cap_info, kind: str) -> List[List[List[int]]]:
+    """Per-layer ``[row][col]`` grids of demand or overflow for the 2D view.
+
+    ``usage`` is ``gcell_usage`` of the whole route, so the grids show the
+    true congestion even when only some nets are drawn.
+    """
+    x_size, y_size = cap_info["x_size"], cap_info["y_size"]
+    grids = [[[0] * x_size for _ in range(y_size)] for _ in cap_info["layers"]]
+    for (layer, row, col), demand in usage.items():
+        if 0 <= layer < len(grids) and 0 <= row < y_size and 0 <= col < x_size:
+            grids[layer][row][col] = demand
+    if kind == "overflow":
+        capacities = load_capacities(cap_info)
+        for layer, grid in enumerate(grids):
+            for row, values in enumerate(grid):
+                base = row * x_size
+                grid[row] = [
+                    max(d - c, 0)
+                    for d, c in zip(values, capacities[layer][base:base + x_size])
+                ]
+    return grids
+
+
+def find_hotspots(nets, cap_info, k: int, usage=None):
+    """Pick the ``k`` most congested gcells and the nets that use them.
+
+    Gcells are ranked by overflow (demand - capacity), then by utilization.
+    ``usage`` is ``gcell_usage(nets, cap_info)`` if already computed.
+    Returns ``(hotspots, net_indices)`` where each hotspot is
+    ``((layer, row, col), demand, capacity)``.
+    """
+    if usage is None:
+        usage = gcell_usage(nets, cap_info)
+    x_size = cap_info["x_size"]
+    capacities = load_capacities(cap_info)
+
+    def capacity(gcell: Coord) -> int:
+        layer, row, col = gcell
+        return capacities[layer][row * x_size + col]
+
+    ranked = sorted(
+        usage.items(),
+        key=lambda item: (
+            item[1] - capacity(item[0]),
+            item[1] / max(capacity(item[0]), 1),
+        ),
+        reverse=True,
+    )[:k]
+    hot = {gcell for gcell, _ in ranked}
+    hotspots = [(gcell, demand, capacity(gcell)) for gcell, demand in ranked]
+    net_indices = {
+        idx for idx, net in enumerate(nets) if not hot.isdisjoint(net_gcells(net, cap_info))
+    }
+    return hotspots, net_indices
+
+
+def extract_region(nets, cap_info, bbox=None, net_filter=None, top_congested=0, usage=None):
+    """Apply the ROI filters and return ``(nets, hotspots)``.
+
+    Filters intersect: a net survives only if it passes every given filter.
+    With ``bbox`` set, surviving nets keep only the segments touching the box.
+    ``usage`` is passed on to ``find_hotspots``.
+    """
+    keep = set(range(len(nets)))
+    hotspots = []
+    if net_filter:
+        keep &= match_nets(nets, net_filter)
+    if top_congested > 0:
+        hotspots, hot_nets = find_hotspots(nets, cap_info, top_congested, usage)
+        keep &= hot_nets
+
+    selected = []
+    for idx in sorted(keep):
+        net = nets[idx]
+        if bbox is not None:
+            segments = segments_in_bbox(net["segments"], bbox)
+            if not segments:
+                continue
+            net = {"name": net["name"], "segments": segments}
+        selected.append(net)
+    return selected, hotspots
 
 
 def cumulative_positions(distances: List[float], count: int) -> List[float]:
@@ -163,20 +364,23 @@ def cumulative_positions(distances: List[float], count: int) -> List[float]:
     return coords
 
 
+NET_COLORS = [
+    "#267bb8",
+    "#ff7f0e",
+    "#2ca02c",
+    "#d62728",
+    "#9467bd",
+    "#8c564b",
+    "#e377c2",
+    "#7f7f7f",
+    "#bcbd22",
+    "#17becf",
+]
+
+
 def build_segment_lines(nets, xs, ys, zs):
     traces = []
-    colors = [
-        "#267bb8",
-        "#ff7f0e",
-        "#2ca02c",
-        "#d62728",
-        "#9467bd",
-        "#8c564b",
-        "#e377c2",
-        "#7f7f7f",
-        "#bcbd22",
-        "#17becf",
-    ]
+    colors = NET_COLORS
     for idx, net in enumerate(nets):
         x_vals: List[float] = []
         y_vals: List[float] = []
@@ -226,7 +430,25 @@ def build_pin_trace(pin_map, xs, ys, zs):
     )
 
 
-def generate_plot(cap_info, nets, pin_map):
+def build_hotspot_trace(hotspots, xs, ys, zs):
+    if not hotspots:
+        return None
+    return go.Scatter3d(
+        x=[xs[col] for (_, _, col), _, _ in hotspots],
+        y=[ys[row] for (_, row, _), _, _ in hotspots],
+        z=[zs[layer] for (layer, _, _), _, _ in hotspots],
+        mode="markers",
+        marker=dict(size=8, color="red", symbol="diamond"),
+        name="Congested gcells",
+        text=[
+            f"({layer}, {col}, {row}) demand={demand} cap={cap}"
+            for (layer, row, col), demand, cap in hotspots
+        ],
+        hoverinfo="text",
+    )
+
+
+def grid_positions(cap_info):
     xs = cumulative_positions(cap_info["horizontal"], cap_info["x_size"])
     ys = cumulative_positions(cap_info["vertical"], cap_info["y_size"])
     spacing = max(
@@ -236,12 +458,20 @@ def generate_plot(cap_info, nets, pin_map):
             ys[-1] if len(ys) > 1 else 1.0,
         ),
     )
-    zs = [0.0, spacing]
+    zs = [idx * spacing for idx in range(cap_info["num_layers"])]
+    return xs, ys, zs
+
+
+def generate_plot(cap_info, nets, pin_map, hotspots=None):
+    xs, ys, zs = grid_positions(cap_info)
 
     traces = build_segment_lines(nets, xs, ys, zs)
     pin_trace = build_pin_trace(pin_map, xs, ys, zs)
     if pin_trace:
         traces.append(pin_trace)
+    hotspot_trace = build_hotspot_trace(hotspots, xs, ys, zs)
+    if hotspot_trace:
+        traces.append(hotspot_trace)
 
     fig = go.Figure(data=traces)
     fig.update_layout(
@@ -257,10 +487,413 @@ def generate_plot(cap_info, nets, pin_map):
     return fig
 
 
+def generate_plot_2d(cap_info, nets, pin_map, hotspots=None, underlay=None, usage=None):
+    """One ``Scattergl`` panel per layer with linked zoom.
+
+    Wires are drawn on their own layer, vias as markers on both layers they
+    join, and ``underlay`` ("demand" or "overflow") adds a heatmap beneath,
+    computed from ``usage`` (``gcell_usage`` of the whole route; defaults to
+    the drawn nets' usage).
+    """
+    from plotly.subplots import make_subplots
+
+    xs, ys, _ = grid_positions(cap_info)
+    layers = cap_info["layers"]
+    cols = min(len(layers), 3)
+    rows = -(-len(layers) // cols)
+    fig = make_subplots(
+        rows=rows,
+        cols=cols,
+        subplot_titles=[f"Layer {idx}: {name} ({direction})"
+                        for idx, (name, direction) in enumerate(layers)],
+        horizontal_spacing=0.04,
+        vertical_spacing=0.08,
+    )
+
+    def cell(layer):
+        return layer // cols + 1, layer % cols + 1
+
+    if underlay:
+        if usage is None:
+            usage = gcell_usage(nets, cap_info)
+        for layer, grid in enumerate(underlay_grids(usage, cap_info, underlay)):
+            fig.add_trace(
+                go.Heatmap(
+                    x=xs, y=ys, z=grid, colorscale="YlOrRd", zmin=0,
+                    showscale=layer == 0, colorbar=dict(title=underlay),
+                    hovertemplate=f"{underlay}=%{{z}}<extra>layer {layer}</extra>",
+                ),
+                *cell(layer),
+            )
+
+    num_layers = len(layers)
+    wires = [[([], [], []) for _ in NET_COLORS] for _ in range(num_layers)]
+    vias = [([], [], []) for _ in range(num_layers)]
+    for idx, net in enumerate(nets):
+        name = net["name"]
+        for (l1, j1, i1), (l2, j2, i2) in net["segments"]:
+            if l1 != l2:
+                for layer in (l1, l2):
+                    vx, vy, vt = vias[layer]
+                    vx.append(xs[j1])
+                    vy.append(ys[i1])
+                    vt.append(name)
+                continue
+            wx, wy, wt = wires[l1][idx % len(NET_COLORS)]
+            wx.extend((xs[j1], xs[j2], None))
+            wy.extend((ys[i1], ys[i2], None))
+            wt.extend((name, name, None))
+
+    for layer in range(num_layers):
+        for color, (wx, wy, wt) in zip(NET_COLORS, wires[layer]):
+            if wx:
+                fig.add_trace(
+                    go.Scattergl(
+                        x=wx, y=wy, text=wt, mode="lines", hoverinfo="text",
+                        line=dict(width=2, color=color), showlegend=False,
+                    ),
+                    *cell(layer),
+                )
+        vx, vy, vt = vias[layer]
+        if vx:
+            fig.add_trace(
+                go.Scattergl(
+                    x=vx, y=vy, text=vt, mode="markers", hoverinfo="text",
+                    marker=dict(size=6, color="gray", line=dict(width=1, color="black")),
+                    name="Vias", legendgroup="vias", showlegend=layer == 0,
+                ),
+                *cell(layer),
+            )
+
+    pins = [([], [], []) for _ in range(num_layers)]
+    for name, pin_list in pin_map.items():
+        for layer, col, row in pin_list:
+            if 0 <= layer < num_layers:
+                px, py, pt = pins[layer]
+                px.append(xs[col])
+                py.append(ys[row])
+                pt.append(f"{name} pin")
+    for layer in range(num_layers):
+        px, py, pt = pins[layer]
+        if px:
+            fig.add_trace(
+                go.Scattergl(
+                    x=px, y=py, text=pt, mode="markers", hoverinfo="text",
+                    marker=dict(size=8, color="black", symbol="square"),
+                    name="Pins", legendgroup="pins", showlegend=layer == 0,
+                ),
+                *cell(layer),
+            )
+
+    for (layer, row, col), demand, cap in hotspots or ():
+        fig.add_trace(
+            go.Scattergl(
+                x=[xs[col]], y=[ys[row]], mode="markers", hoverinfo="text",
+                text=[f"({layer}, {col}, {row}) demand={demand} cap={cap}"],
+                marker=dict(size=12, color="red", symbol="diamond"),
+                name="Congested gcells", legendgroup="hot", showlegend=False,
+            ),
+            *cell(layer),
+        )
+
+    # Linked zoom: every panel follows the first panel's axes.
+    fig.update_xaxes(matches="x", title_text="Column")
+    fig.update_yaxes(matches="y", autorange="reversed", title_text="Row")
+    fig.update_layout(
+        title="Routing Visualization (Plotly WebGL, per layer)",
+        height=max(500, 450 * rows),
+        legend=dict(itemsizing="constant"),
+    )
+    return fig
+
+
+STREAM_HEAD = """<!DOCTYPE html>
+<html>
+<head>
+<meta charset="utf-8">
+<title>{title}</title>
+<script src="{plotlyjs}"></script>
+</head>
+<body style="margin:0">
+<div id="plot" style="width:100%;height:100vh"></div>
+<script>
+"""
+
+# Nets are grouped into one trace per color so the browser handles a handful
+# of large traces instead of one trace per net.
+STREAM_TAIL = """];
+const COLORS = {colors};
+const groups = COLORS.map(() => ({{x: [], y: [], z: [], text: []}}));
+NETS.forEach(([name, c], i) => {{
+  const g = groups[i % COLORS.length];
+  for (let k = 0; k < c.length; k += 6) {{
+    g.x.push(c[k], c[k + 3], null);
+    g.y.push(c[k + 1], c[k + 4], null);
+    g.z.push(c[k + 2], c[k + 5], null);
+    g.text.push(name, name, null);
+  }}
+}});
+const traces = groups.map((g, i) => ({{
+  type: "scatter3d", mode: "lines", x: g.x, y: g.y, z: g.z, text: g.text,
+  hoverinfo: "text", line: {{width: 5, color: COLORS[i]}}, showlegend: false
+}}));
+if (PINS.length) {{
+  const p = {{x: [], y: [], z: [], text: []}};
+  PINS.forEach(([name, c]) => {{
+    for (let k = 0; k < c.length; k += 3) {{
+      p.x.push(c[k]); p.y.push(c[k + 1]); p.z.push(c[k + 2]); p.text.push(name + " pin");
+    }}
+  }});
+  traces.push({{type: "scatter3d", mode: "markers", name: "Pins", x: p.x, y: p.y,
+    z: p.z, text: p.text, hoverinfo: "text",
+    marker: {{size: 6, color: "black", symbol: "circle"}}}});
+}}
+Plotly.newPlot("plot", traces, {{
+  title: {title},
+  scene: {{xaxis: {{title: "Column"}}, yaxis: {{title: "Row"}},
+    zaxis: {{title: "Layer"}}, aspectmode: "data"}}
+}});
+</script>
+</body>
+</html>
+"""
+
+
+def plotlyjs_cdn_url() -> str:
+    from plotly.offline import get_plotlyjs_version
+
+    return f"https://cdn.plot.ly/plotly-{get_plotlyjs_version()}.min.js"
+
+
+def filter_stream(nets, bbox=None, net_filter=None):
+    """Streaming counterpart of ``extract_region`` for the name/bbox filters."""
+    pattern = None
+    wanted = None
+    if net_filter and "," in net_filter:
+        wanted = {name.strip() for name in net_filter.split(",") if name.strip()}
+    elif net_filter:
+        pattern = re.compile(net_filter)
+    for net in nets:
+        if wanted is not None and net["name"] not in wanted:
+            continue
+        if pattern is not None and not pattern.fullmatch(net["name"]):
+            continue
+        if bbox is not None:
+            segments = segments_in_bbox(net["segments"], bbox)
+            if not segments:
+                continue
+            net = {"name": net["name"], "segments": segments}
+        yield net
+
+
+def _fmt(value: float) -> str:
+    return str(int(value)) if float(value).is_integer() else repr(value)
+
+
+def write_streaming_html(
+    out: Path, cap_info, nets, pins=(), chunk_nets: int = 4096,
+    title: str = "Routing Visualization (Plotly WebGL)",
+) -> int:
+    """Write a viewer while reading ``nets`` lazily; returns the net count.
+
+    The payload is emitted as a JS array literal, ``chunk_nets`` nets per
+    write, so neither the route, a figure object nor the JSON string is ever
+    held in memory as a whole.  ``pins`` yields ``(name, [pin, ...])``.
+    """
+    xs, ys, zs = grid_positions(cap_info)
+    count = 0
+    with out.open("w") as fout:
+        fout.write(STREAM_HEAD.format(title=title, plotlyjs=plotlyjs_cdn_url()))
+        fout.write("const NETS = [\n")
+        chunk: List[str] = []
+        for net in nets:
+            coords = []
+            for (l1, j1, i1), (l2, j2, i2) in net["segments"]:
+                coords.extend((xs[j1], ys[i1], zs[l1], xs[j2], ys[i2], zs[l2]))
+            chunk.append(f"[{json.dumps(net['name'])},[{','.join(map(_fmt, coords))}]],\n")
+            count += 1
+            if len(chunk) >= chunk_nets:
+                fout.writelines(chunk)
+                chunk.clear()
+        fout.writelines(chunk)
+        chunk.clear()
+
+        fout.write("];\nconst PINS = [\n")
+        for name, pin_list in pins:
+            coords = []
+            for layer, col, row in pin_list:
+                coords.extend((xs[col], ys[row], zs[layer]))
+            chunk.append(f"[{json.dumps(name)},[{','.join(map(_fmt, coords))}]],\n")
+            if len(chunk) >= chunk_nets:
+                fout.writelines(chunk)
+                chunk.clear()
+        fout.writelines(chunk)
+        fout.write(STREAM_TAIL.format(colors=json.dumps(NET_COLORS), title=json.dumps(title)))
+    return count
+
+
+ANIMATION_TAIL = """];
+const NAMES = {names};
+const LABELS = {labels};
+const XS = {xs}, YS = {ys}, ZS = {zs};
+const COLORS = {colors};
+const state = new Map();
+let current = -1;
+
+function key(s) {{ return s.join(","); }}
+
+function apply(frame, forward) {{
+  for (const [id, added, removed] of FRAMES[frame]) {{
+    let segs = state.get(id);
+    if (!segs) {{ segs = new Map(); state.set(id, segs); }}
+    const put = forward ? added : removed, drop = forward ? removed : added;
+    for (let k = 0; k < drop.length; k += 6) segs.delete(key(drop.slice(k, k + 6)));
+    for (let k = 0; k < put.length; k += 6) {{
+      const s = put.slice(k, k + 6);
+      segs.set(key(s), s);
+    }}
+  }}
+}}
+
+function push(g, s, name) {{
+  g.x.push(XS[s[1]], XS[s[4]], null);
+  g.y.push(YS[s[2]], YS[s[5]], null);
+  g.z.push(ZS[s[0]], ZS[s[3]], null);
+  g.text.push(name, name, null);
+}}
+
+function line(g, color, width, name, dash) {{
+  return {{type: "scatter3d", mode: "lines", x: g.x, y: g.y, z: g.z, text: g.text,
+    hoverinfo: "text", name: name, showlegend: !!name,
+    line: {{width: width, color: color, dash: dash || "solid"}}}};
+}}
+
+function render(frame) {{
+  while (current < frame) apply(++current, true);
+  while (current > frame) apply(current--, false);
+  const groups = COLORS.map(() => ({{x: [], y: [], z: [], text: []}}));
+  for (const [id, segs] of state) {{
+    for (const s of segs.values()) push(groups[id % COLORS.length], s, NAMES[id]);
+  }}
+  const traces = groups.map((g, i) => line(g, COLORS[i], 4));
+  if (frame > 0) {{
+    const added = {{x: [], y: [], z: [], text: []}}, removed = {{x: [], y: [], z: [], text: []}};
+    for (const [id, add, rem] of FRAMES[frame]) {{
+      for (let k = 0; k < add.length; k += 6) push(added, add.slice(k, k + 6), NAMES[id]);
+      for (let k = 0; k < rem.length; k += 6) push(removed, rem.slice(k, k + 6), NAMES[id]);
+    }}
+    traces.push(line(added, "#00c853", 8, "Added"));
+    traces.push(line(removed, "#d50000", 3, "Removed", "dash"));
+  }}
+  layout.sliders[0].active = frame;
+  Plotly.react("plot", traces, layout);
+}}
+
+const layout = {{
+  title: {title}, uirevision: "keep",
+  scene: {{xaxis: {{title: "Column"}}, yaxis: {{title: "Row"}},
+    zaxis: {{title: "Layer"}}, aspectmode: "data"}},
+  sliders: [{{active: 0, pad: {{t: 30}},
+    steps: LABELS.map((label, i) => ({{label: label, value: String(i), method: "skip"}}))}}],
+  updatemenus: [{{type: "buttons", direction: "left", x: 0, y: 0, xanchor: "right",
+    buttons: [{{label: "Play", method: "skip"}}, {{label: "Pause", method: "skip"}}]}}]
+}};
+
+let timer = null;
+render(0);
+const plot = document.getElementById("plot");
+plot.on("plotly_sliderchange", (e) => render(+e.step.value));
+plot.on("plotly_buttonclicked", (e) => {{
+  clearInterval(timer);
+  timer = null;
+  if (e.button.label !== "Play") return;
+  if (current === FRAMES.length - 1) render(0);
+  timer = setInterval(() => {{
+    if (current >= FRAMES.length - 1) {{ clearInterval(timer); timer = null; return; }}
+    render(current + 1);
+  }}, 800);
+}});
+</script>
+</body>
+</html>
+"""
+
+
+def route_segment_sets(path: Path) -> Dict[str, Set[Tuple[int, ...]]]:
+    """Map net name -> set of direction-normalized ``(z, x, y, z, x, y)`` tuples."""
+    return {
+        net["name"]: {tuple(min(a, b) + max(a, b)) for a, b in net["segments"]}
+        for net in iter_route(path)
+    }
+
+
+def write_animation_html(
+    out: Path, cap_info, snapshots: List[Path],
+    title: str = "Routing Evolution (Plotly WebGL)",
+) -> int:
+    """Write a viewer that replays ``snapshots`` as delta-encoded frames.
+
+    Frame 0 holds the first route; every later frame stores, per changed
+    net, only the segments added and removed since the previous snapshot.
+    Only two snapshots are held in memory at a time.  Returns the number of
+    changed segments over all frames.
+    """
+    xs, ys, zs = grid_positions(cap_info)
+    net_ids: Dict[str, int] = {}
+    changes = 0
+    previous: Dict[str, Set[Tuple[int, ...]]] = {}
+
+    def flat(segments) -> str:
+        return ",".join(str(v) for seg in sorted(segments) for v in seg)
+
+    with out.open("w") as fout:
+        fout.write(STREAM_HEAD.format(title=title, plotlyjs=plotlyjs_cdn_url()))
+        fout.write("const FRAMES = [\n")
+        for path in snapshots:
+            current = route_segment_sets(path)
+            fout.write("[\n")
+            chunk: List[str] = []
+            for name in list(current) + [n for n in previous if n not in current]:
+                segs = current.get(name, set())
+                old = previous.get(name, set())
+                added, removed = segs - old, old - segs
+                if not added and not removed:
+                    continue
+                net_id = net_ids.setdefault(name, len(net_ids))
+                changes += len(added) + len(removed)
+                chunk.append(f"[{net_id},[{flat(added)}],[{flat(removed)}]],\n")
+                if len(chunk) >= 4096:
+                    fout.writelines(chunk)
+                    chunk.clear()
+            fout.writelines(chunk)
+            fout.write("],\n")
+            previous = current
+
+        fout.write(
+            ANIMATION_TAIL.format(
+                names=json.dumps(list(net_ids)),
+                labels=json.dumps([path.stem for path in snapshots]),
+                xs=json.dumps([float(v) for v in xs]),
+                ys=json.dumps([float(v) for v in ys]),
+                zs=json.dumps([float(v) for v in zs]),
+                colors=json.dumps(NET_COLORS),
+                title=json.dumps(title),
+            )
+        )
+    return changes
+
+
 def main():
     parser = argparse.ArgumentParser(description="Export routing to Plotly HTML.")
     parser.add_argument("--cap", required=True, type=Path, help="Path to .cap file.")
-    parser.add_argument("--route", required=True, type=Path, help="Path to .route file.")
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument("--route", type=Path, help="Path to .route file.")
+    source.add_argument(
+        "--snapshots",
+        nargs="+",
+        type=Path,
+        help="Successive .route snapshots to replay as an animation.",
+    )
     parser.add_argument(
         "--net",
         type=Path,
@@ -273,13 +906,123 @@ def main():
         type=Path,
         help="Destination HTML file (interactive WebGL viewer).",
     )
+    parser.add_argument(
+        "--bbox",
+        type=parse_bbox,
+        default=None,
+        help="Only export segments touching gcells x0,y0,x1,y1 (inclusive).",
+    )
+    parser.add_argument(
+        "--nets",
+        default=None,
+        help="Net names to export: a full-match regex or a comma-separated list.",
+    )
+    parser.add_argument(
+        "--top-congested",
+        type=int,
+        default=0,
+        metavar="K",
+        help="Only export nets using the K most congested gcells.",
+    )
+    parser.add_argument(
+        "--mode",
+        choices=("3d", "2d"),
+        default="3d",
+        help="3d: one Scatter3d scene; 2d: one Scattergl panel per layer.",
+    )
+    parser.add_argument(
+        "--underlay",
+        choices=("demand", "overflow"),
+        default=None,
+        help="Heatmap drawn under the wires in --mode 2d.",
+    )
+    parser.add_argument(
+        "--stream",
+        action="store_true",
+        help="Stream nets straight into the HTML file (flat memory, large routes).",
+    )
     args = parser.parse_args()
 
-    cap_info = parse_cap(args.cap)
-    nets = parse_route(args.route)
+    if args.underlay and args.mode != "2d":
+        parser.error("--underlay requires --mode 2d")
+    if args.snapshots:
+        if args.mode != "3d" or args.bbox or args.nets or args.top_congested or args.stream:
+            parser.error("--snapshots cannot be combined with filters, --mode or --stream")
+        changes = write_animation_html(args.out, parse_cap(args.cap), args.snapshots)
+        print(
+            f"Wrote {len(args.snapshots)}-frame animation ({changes} segment changes) "
+            f"to {args.out}"
+        )
+        return
+    if args.stream:
+        if args.mode != "3d":
+            parser.error("--stream only supports --mode 3d")
+        if args.top_congested > 0:
+            parser.error("--top-congested needs the whole route and cannot be streamed")
+        cap_info = parse_cap(args.cap)
+        nets = filter_stream(iter_route(args.route), args.bbox, args.nets)
+        if args.bbox is None and not args.nets:
+            pins = iter_net_pins(args.net) if args.net else ()
+            count = write_streaming_html(args.out, cap_info, nets, pins)
+        else:
+            kept: Set[str] = set()
+
+            def remember(stream):
+                for net in stream:
+                    kept.add(net["name"])
+                    yield net
+
+            # Pins follow the nets in the payload, so the kept names are known.
+            pins = (
+                (name, pin_list)
+                for name, pin_list in (iter_net_pins(args.net) if args.net else ())
+                if name in kept
+            )
+            count = write_streaming_html(args.out, cap_info, remember(nets), pins)
+        print(f"Streamed {count} nets to Plotly viewer {args.out}")
+        return
+
+    cap_info = parse_cap(
+        args.cap,
+        with_capacity=args.top_congested > 0 or args.underlay == "overflow",
+    )
     pin_map = parse_net(args.net)
+    usage = None
+    hotspots = []
+    filtered = args.bbox is not None or args.nets or args.top_congested > 0
+    if args.underlay or args.top_congested > 0:
+        nets = parse_route(args.route)
+        # Demand of the whole route: the underlay shows it even when only some
+        # nets are drawn, and the congestion filter ranks gcells by it.
+        usage = gcell_usage(nets, cap_info)
+        total = len(nets)
+        if filtered:
+            nets, hotspots = extract_region(
+                nets, cap_info, args.bbox, args.nets, args.top_congested, usage
+            )
+    elif filtered:
+        # Only the selection is needed: filter while reading the route.
+        total = 0
+
+        def count(stream):
+            nonlocal total
+            for net in stream:
+                total += 1
+                yield net
+
+        nets = list(filter_stream(count(iter_route(args.route)), args.bbox, args.nets))
+    else:
+        nets = parse_route(args.route)
+
+    if filtered:
+        kept = {net["name"] for net in nets}
+        pin_map = {name: pins for name, pins in pin_map.items() if name in kept}
+        print(f"Selected {len(nets)} of {total} nets")
 
-    fig = generate_plot(cap_info, nets, pin_map)
+    if args.mode == "2d":
+        fig = generate_plot_2d(cap_info, nets, pin_map, hotspots, args.underlay, usage)
+    else:
+        fig = generate_plot(cap_info, nets, pin_map, hotspots)
     fig.write_html(str(args.out), include_plotlyjs="cdn")
     print(f"Wrote Plotly viewer to {args.out}")
 
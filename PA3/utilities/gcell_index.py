@@ -0,0 +1,263 @@
+#!/usr/bin/env python3
+"""
+GCell -> nets index for congestion debugging.
+
+Built from the per-net GCell sets that evaluate_route returns with
+keep_net_gcells=True, and stored as two CSR structures:
+
+    cell_keys / cell_ptr / cell_nets   occupied GCells sorted by linear key
+                                       (layer * ySize + y) * xSize + x, and the
+                                       nets on each
+    net_ptr / net_cells                sorted GCell keys of each net
+
+so "nets on this GCell" is one binary search, "nets crossing this window"
+is two binary searches per layer and row of the window, and "GCells of this
+net" is a slice.
+
+Usage:
+    python3 gcell_index.py <cap_file> <route_file> -gcell 0,10,12 -window 5,5,20,20
+    python3 gcell_index.py <cap_file> <route_file> -net net12 -save index.npz
+
+Python:
+    result = evaluate_route(cap_data, route_data, keep_net_gcells=True)
+    index = GCellIndex.build(cap_data, result['net_gcells'], [n['name'] for n in route_data])
+    index.net_names(index.nets_on(0, 10, 12))
+"""
+
+from __future__ import annotations
+
+import argparse
+import sys
+from itertools import chain
+from pathlib import Path
+from typing import Iterable, List, Optional, Sequence, Set, Tuple
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+import pa3_evaluator  # noqa: E402
+
+
+class GCellIndex:
+    """CSR GCell <-> net index over an (nLayers, ySize, xSize) grid."""
+
+    def __init__(self, shape: Tuple[int, int, int], names: Sequence[str],
+                 cell_keys: np.ndarray, cell_ptr: np.ndarray, cell_nets: np.ndarray,
+                 net_ptr: np.ndarray, net_cells: np.ndarray):
+        self.shape = tuple(int(v) for v in shape)
+        self.names = list(names)
+        self.cell_keys = cell_keys
+        self.cell_ptr = cell_ptr
+        self.cell_nets = cell_nets
+        self.net_ptr = net_ptr
+        self.net_cells = net_cells
+        self._ids = None
+
+    @classmethod
+    def build(cls, cap_data, net_gcells: Sequence[Set[Tuple[int, int, int]]],
+              names: Sequence[str]) -> "GCellIndex":
+        """Index ``net_gcells[i]`` (sets of (layer, y, x)) as the GCells of net i."""
+        shape = (cap_data['nLayers'], cap_data['ySize'], cap_data['xSize'])
+        counts = np.fromiter((len(cells) for cells in net_gcells), dtype=np.int64, count=len(net_gcells))
+        total = int(counts.sum())
+        coords = np.fromiter(chain.from_iterable(net_gcells), dtype=np.dtype((np.int64, 3)), count=total)
+        coords = coords.reshape(-1, 3)
+        # The evaluator indexes its demand lists directly, so negative via
+        # coordinates wrap around; mirror that.
+        coords = np.where(coords < 0, coords + np.array(shape), coords)
+        keys = (coords[:, 0] * shape[1] + coords[:, 1]) * shape[2] + coords[:, 2]
+        nets = np.repeat(np.arange(len(net_gcells), dtype=np.int32), counts)
+
+        net_ptr = np.zeros(len(net_gcells) + 1, dtype=np.int64)
+        np.cumsum(counts, out=net_ptr[1:])
+        # Sort keys within each net (stable on net, then key)
+        net_cells = keys[np.lexsort((keys, nets))]
+
+        order = np.argsort(keys, kind='stable')
+        sorted_keys = keys[order]
+        cell_keys, starts = np.unique(sorted_keys, return_index=True)
+        cell_ptr = np.append(starts, len(sorted_keys)).astype(np.int64)
+        return cls(shape, names, cell_keys, cell_ptr, nets[order], net_ptr, net_cells)
+
+    # ------------------------------------------------------------------
+    # Keys and names
+    # ------------------------------------------------------------------
+
+    def key(self, layer: int, y: int, x: int) -> int:
+        check_gcell(self.shape, layer, y, x)
+        _, y_size, x_size = self.shape
+        return (layer * y_size + y) * x_size + x
+
+    def unkey(self, keys: np.ndarray) -> np.ndarray:
+        """(K, 3) array of (layer, y, x) for linear keys."""
+        _, y_size, x_size = self.shape
+        keys = np.asarray(keys, dtype=np.int64)
+        return np.stack([keys // (y_size * x_size), keys // x_size % y_size, keys % x_size], axis=-1)
+
+    def net_id(self, net) -> int:
+        """Net id from an id or a name."""
+        if isinstance(net, (int, np.integer)):
+            return int(net)
+        if self._ids is None:
+            self._ids = {name: i for i, name in reversed(list(enumerate(self.names)))}
+        if net not in self._ids:
+            raise KeyError(f"unknown net '{net}'")
+        return self._ids[net]
+
+    def net_names(self, ids: Iterable[int]) -> List[str]:
+        return [self.names[i] for i in ids]
+
+    # ------------------------------------------------------------------
+    # Queries
+    # ------------------------------------------------------------------
+
+    def nets_on(self, layer: int, y: int, x: int) -> np.ndarray:
+        """Ids of the nets using GCell (layer, y, x)."""
+        k = self.key(layer, y, x)
+        i = int(np.searchsorted(self.cell_keys, k))
+        if i == len(self.cell_keys) or self.cell_keys[i] != k:
+            return np.zeros(0, dtype=self.cell_nets.dtype)
+        return self.cell_nets[self.cell_ptr[i]:self.cell_ptr[i + 1]]
+
+    def nets_in_window(self, x0: int, y0: int, x1: int, y1: int,
+                       layers: Optional[Iterable[int]] = None) -> np.ndarray:
+        """Sorted ids of the nets using any GCell with x0 <= x <= x1, y0 <= y <= y1."""
+        n_layers, y_size, x_size = self.shape
+        x0, x1 = max(min(x0, x1), 0), min(max(x0, x1), x_size - 1)
+        y0, y1 = max(min(y0, y1), 0), min(max(y0, y1), y_size - 1)
+        if x0 > x1 or y0 > y1:
+            return np.zeros(0, dtype=self.cell_nets.dtype)
+        layers = np.arange(n_layers) if layers is None else np.asarray(list(layers))
+        rows = (layers[:, None] * y_size + np.arange(y0, y1 + 1)[None, :]).ravel() * x_size
+        lo = np.searchsorted(self.cell_keys, rows + x0, side='left')
+        hi = np.searchsorted(self.cell_keys, rows + x1, side='right')
+        keep = hi > lo
+        lo, hi = self.cell_ptr[lo[keep]], self.cell_ptr[hi[keep]]
+        if not len(lo):
+            return np.zeros(0, dtype=self.cell_nets.dtype)
+        # Concatenate the cell_nets slices [lo, hi) without a Python loop
+        lengths = hi - lo
+        offsets = np.repeat(lo - np.cumsum(lengths) + lengths, lengths)
+        picks = np.arange(int(lengths.sum())) + offsets
+        return np.unique(self.cell_nets[picks])
+
+    def gcells_of(self, net) -> np.ndarray:
+        """(K, 3) array of the (layer, y, x) GCells of a net (id or name)."""
+        i = self.net_id(net)
+        return self.unkey(self.net_cells[self.net_ptr[i]:self.net_ptr[i + 1]])
+
+    def demand(self) -> np.ndarray:
+        """(L, Y, X) demand grid, equal to evaluate_route's."""
+        counts = np.zeros(int(np.prod(self.shape)), dtype=np.int64)
+        counts[self.cell_keys] = np.diff(self.cell_ptr)
+        return counts.reshape(self.shape)
+
+    # ------------------------------------------------------------------
+    # Persistence
+    # ------------------------------------------------------------------
+
+    def save(self, path) -> None:
+        np.savez(
+            path, shape=np.array(self.shape), names=np.array(self.names, dtype=str),
+            cell_keys=self.cell_keys, cell_ptr=self.cell_ptr, cell_nets=self.cell_nets,
+            net_ptr=self.net_ptr, net_cells=self.net_cells,
+        )
+
+    @classmethod
+    def load(cls, path) -> "GCellIndex":
+        with np.load(path) as data:
+            return cls(
+                tuple(data['shape']), data['names'].tolist(), data['cell_keys'], data['cell_ptr'],
+                data['cell_nets'], data['net_ptr'], data['net_cells'],
+            )
+
+
+def build_index(cap_data, route_data) -> Tuple[GCellIndex, dict]:
+    """Evaluate ``route_data`` and index it; returns (index, evaluate_route result)."""
+    result = pa3_evaluator.evaluate_route(cap_data, route_data, keep_net_gcells=True)
+    index = GCellIndex.build(cap_data, result.pop('net_gcells'), [net['name'] for net in route_data])
+    return index, result
+
+
+def check_gcell(shape, layer: int, y: int, x: int) -> None:
+    """Raise ValueError unless (layer, y, x) lies inside a grid of ``shape``."""
+    for value, size, axis in zip((layer, y, x), shape, ("layer", "y", "x")):
+        if not 0 <= value < size:
+            raise ValueError(f"GCell (layer {layer}, y {y}, x {x}) is outside the grid: "
+                             f"{axis} must be in 0..{size - 1}")
+
+
+def parse_ints(text: str, count: int, flag: str) -> List[int]:
+    parts = text.split(',')
+    if len(parts) != count:
+        raise ValueError(f"{flag} expects {count} comma-separated integers, got '{text}'")
+    return [int(p) for p in parts]
+
+
+def print_queries(index: GCellIndex, cap_data, gcells=(), windows=(), nets=(), limit=20) -> None:
+    """Print the answers to -gcell L,Y,X / -window X0,Y0,X1,Y1 / -net NAME queries."""
+    def show(ids):
+        names = index.net_names(ids[:limit])
+        more = f" ... (+{len(ids) - limit} more)" if len(ids) > limit else ""
+        return ", ".join(names) + more
+
+    for layer, y, x in gcells:
+        ids = index.nets_on(layer, y, x)
+        cap = cap_data['layers'][layer]['capacities'][y][x]
+        print(f"  GCell (layer {layer}, y {y}, x {x}): demand {len(ids)}, capacity {cap}")
+        if len(ids):
+            print(f"    nets: {show(ids)}")
+    for x0, y0, x1, y1 in windows:
+        ids = index.nets_in_window(x0, y0, x1, y1)
+        print(f"  Window x {x0}..{x1}, y {y0}..{y1}: {len(ids)} net(s)")
+        if len(ids):
+            print(f"    nets: {show(ids)}")
+    for name in nets:
+        cells = index.gcells_of(name)
+        print(f"  Net {name}: {len(cells)} GCell(s)")
+        for layer, y, x in cells[:limit].tolist():
+            print(f"    (layer {layer}, y {y}, x {x})")
+        if len(cells) > limit:
+            print(f"    ... (+{len(cells) - limit} more)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Query which nets use which GCells.")
+    parser.add_argument("cap_file", type=Path)
+    parser.add_argument("route_file", type=Path)
+    parser.add_argument("-gcell", action="append", default=[], metavar="L,Y,X", help="Nets on a GCell.")
+    parser.add_argument("-window", action="append", default=[], metavar="X0,Y0,X1,Y1",
+                        help="Nets crossing an inclusive window (all layers).")
+    parser.add_argument("-net", action="append", default=[], metavar="NAME", help="GCells of a net.")
+    parser.add_argument("-limit", type=int, default=20, help="Maximum names/GCells printed per query.")
+    parser.add_argument("-save", type=Path, default=None, help="Save the index as .npz.")
+    args = parser.parse_args()
+
+    for path in (args.cap_file, args.route_file):
+        if not path.exists():
+            parser.error(f"file not found: {path}")
+    try:
+        gcells = [parse_ints(g, 3, "-gcell") for g in args.gcell]
+        windows = [parse_ints(w, 4, "-window") for w in args.window]
+    except ValueError as exc:
+        parser.error(str(exc))
+
+    cap_data = pa3_evaluator.parse_cap_file(str(args.cap_file))
+    try:
+        for gcell in gcells:
+            check_gcell((cap_data['nLayers'], cap_data['ySize'], cap_data['xSize']), *gcell)
+    except ValueError as exc:
+        parser.error(str(exc))
+    route_data = pa3_evaluator.parse_route_file(str(args.route_file))
+    index, result = build_index(cap_data, route_data)
+    print(f"Indexed {len(index.names)} nets, {len(index.cell_keys)} occupied GCells, "
+          f"{len(index.cell_nets)} (net, GCell) pairs; overflow {result['overflow']}")
+    print_queries(index, cap_data, gcells, windows, args.net, args.limit)
+    if args.save:
+        index.save(args.save)
+        print(f"Saved {args.save}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,183 @@
+#!/usr/bin/env python3
+"""
+Per-net and design cost lower bounds from a .net file.
+
+For every net, in one vectorized pass over all pins:
+
+    wirelength  the pins' bounding box, weighted like evaluate_route: a wire
+                over GCells [x0, x1) costs the sum of those horizontal edge
+                lengths (prefix sums), and likewise vertically
+    vias        every distinct pin layer needs a via to join the others, and a
+                net whose bounding box needs a direction (H or V) that none of
+                its pin layers has needs one more layer; on a single pin
+                layer that detour costs two vias (up and back down)
+
+cost_lb = wirelength_lb + vias_lb * unit_via_cost, and the design bound is the
+sum (overflow assumed zero).  With --route, each net's actual cost from
+evaluate_net is set against its bound.
+
+Usage:
+    python3 lower_bound.py <cap_file> <net_file>
+    python3 lower_bound.py case.cap case.net --route case.route --csv gaps.csv --top 20
+"""
+
+from __future__ import annotations
+
+import argparse
+import csv
+import sys
+from itertools import chain
+from pathlib import Path
+from typing import Dict, Optional
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+import pa3_evaluator  # noqa: E402
+
+GAP_COLUMNS = [
+    "name", "pins", "wirelength_lb", "vias_lb", "cost_lb",
+    "wirelength", "vias", "cost", "gap", "gap_ratio",
+]
+
+
+def net_lower_bounds(cap_data, net_data) -> Dict[str, np.ndarray]:
+    """
+    Lower bounds of every net
+
+    Args:
+        cap_data: capacity data from parse_cap_file
+        net_data: nets from parse_net_file, pins as (layer, x, y)
+
+    Returns:
+        dict of per-net arrays: pins, wirelength_lb, vias_lb, cost_lb
+    """
+    n = len(net_data)
+    counts = np.fromiter((len(net['pins']) for net in net_data), dtype=np.int64, count=n)
+    pins = np.fromiter(chain.from_iterable(chain.from_iterable(net['pins'] for net in net_data)),
+                       dtype=np.int64, count=3 * int(counts.sum())).reshape(-1, 3)
+    layer, x, y = pins.T
+
+    wirelength = np.zeros(n, dtype=np.int64)
+    vias = np.zeros(n, dtype=np.int64)
+    routed = counts > 0
+    if routed.any():
+        starts = (np.cumsum(counts) - counts)[routed]
+        x0, x1 = np.minimum.reduceat(x, starts), np.maximum.reduceat(x, starts)
+        y0, y1 = np.minimum.reduceat(y, starts), np.maximum.reduceat(y, starts)
+        horizontal_prefix, vertical_prefix = (np.array(p, dtype=np.int64)
+                                              for p in pa3_evaluator.edge_length_prefix(cap_data))
+        wirelength[routed] = (horizontal_prefix[x1] - horizontal_prefix[x0]
+                              + vertical_prefix[y1] - vertical_prefix[y0])
+
+        # Distinct pin layers per net: sort pins by (net, layer) and count changes
+        net_of_pin = np.repeat(np.arange(n), counts)
+        order = np.lexsort((layer, net_of_pin))
+        sorted_net, sorted_layer = net_of_pin[order], layer[order]
+        new = np.ones(len(order), dtype=bool)
+        new[1:] = (sorted_net[1:] != sorted_net[:-1]) | (sorted_layer[1:] != sorted_layer[:-1])
+        layers_used = np.bincount(sorted_net[new], minlength=n)[routed]
+
+        is_h = np.array([l['direction'] == 'H' for l in cap_data['layers']], dtype=np.int64)[layer]
+        has_h = np.maximum.reduceat(is_h, starts) > 0
+        has_v = np.minimum.reduceat(is_h, starts) == 0
+        extra = ((x1 > x0) & ~has_h) | ((y1 > y0) & ~has_v)
+        vias[routed] = layers_used - 1 + extra + (extra & (layers_used == 1))
+
+    return {
+        'pins': counts,
+        'wirelength_lb': wirelength,
+        'vias_lb': vias,
+        'cost_lb': wirelength + vias * cap_data['unit_via_cost'],
+    }
+
+
+def gap_table(cap_data, net_data, bounds: Dict[str, np.ndarray], route_data=None):
+    """One row per net with its bounds and, if route_data is given, actual cost and gap."""
+    routes = {}
+    for net in route_data or ():
+        routes.setdefault(net['name'], net['segments'])
+    unit_via_cost = cap_data['unit_via_cost']
+    rows = []
+    for i, net in enumerate(net_data):
+        row = {
+            'name': net['name'],
+            'pins': int(bounds['pins'][i]),
+            'wirelength_lb': int(bounds['wirelength_lb'][i]),
+            'vias_lb': int(bounds['vias_lb'][i]),
+            'cost_lb': int(bounds['cost_lb'][i]),
+            'wirelength': None, 'vias': None, 'cost': None, 'gap': None, 'gap_ratio': None,
+        }
+        if net['name'] in routes:
+            _, wirelength, vias = pa3_evaluator.evaluate_net(cap_data, routes[net['name']])
+            cost = wirelength + vias * unit_via_cost
+            row.update(wirelength=wirelength, vias=vias, cost=cost, gap=cost - row['cost_lb'],
+                       gap_ratio=(cost - row['cost_lb']) / row['cost_lb'] if row['cost_lb'] else None)
+        rows.append(row)
+    return rows
+
+
+def print_summary(bounds: Dict[str, np.ndarray], rows, route_result: Optional[Dict], top: int) -> None:
+    print("=== Lower Bound ===")
+    print(f"Nets: {len(bounds['pins'])}")
+    print(f"Wirelength lower bound: {int(bounds['wirelength_lb'].sum())}")
+    print(f"Via lower bound: {int(bounds['vias_lb'].sum())}")
+    cost_lb = int(bounds['cost_lb'].sum())
+    print(f"Cost lower bound: {cost_lb}")
+    if route_result is None:
+        return
+    cost = route_result['total_cost']
+    print(f"Route cost: {cost} (overflow {route_result['overflow']})")
+    if cost_lb:
+        print(f"Gap: {cost - cost_lb} ({(cost - cost_lb) / cost_lb:.2%} above the bound)")
+    routed = [row for row in rows if row['gap'] is not None]
+    missing = len(rows) - len(routed)
+    if missing:
+        print(f"  {missing} net(s) missing from the route")
+    below = [row['name'] for row in routed if row['gap'] < 0]
+    if below:
+        # Only possible when a route leaves the grid or skips pins
+        print(f"  {len(below)} net(s) cost less than their bound (e.g. {below[0]}); check validity")
+    if top and routed:
+        print(f"\nTop {min(top, len(routed))} nets by gap:")
+        print(f"{'net':<28} {'cost_lb':>12} {'cost':>12} {'gap':>12} {'vias':>5} {'lb':>3}")
+        for row in sorted(routed, key=lambda r: -r['gap'])[:top]:
+            print(f"{row['name']:<28} {row['cost_lb']:>12} {row['cost']:>12} {row['gap']:>12} "
+                  f"{row['vias']:>5} {row['vias_lb']:>3}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Per-net and design cost lower bounds.")
+    parser.add_argument("cap_file", type=Path)
+    parser.add_argument("net_file", type=Path)
+    parser.add_argument("--route", type=Path, default=None, help="Compare each net against this route.")
+    parser.add_argument("--csv", type=Path, default=None, help="Write the per-net gap table here.")
+    parser.add_argument("--top", type=int, default=20, help="Nets with the largest gap to print.")
+    args = parser.parse_args()
+
+    for path in (args.cap_file, args.net_file, args.route):
+        if path is not None and not path.exists():
+            parser.error(f"file not found: {path}")
+
+    cap_data = pa3_evaluator.parse_cap_file(str(args.cap_file))
+    net_data = pa3_evaluator.parse_net_file(str(args.net_file))
+    bounds = net_lower_bounds(cap_data, net_data)
+
+    route_data = route_result = None
+    if args.route:
+        route_data = pa3_evaluator.parse_route_file(str(args.route))
+        route_result = pa3_evaluator.evaluate_route(cap_data, route_data)
+    rows = gap_table(cap_data, net_data, bounds, route_data) if args.csv or route_data else []
+    print_summary(bounds, rows, route_result, args.top)
+
+    if args.csv:
+        with args.csv.open("w", newline="") as fout:
+            writer = csv.DictWriter(fout, fieldnames=GAP_COLUMNS)
+            writer.writeheader()
+            writer.writerows(rows)
+        print(f"\nWrote {len(rows)} rows to {args.csv}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
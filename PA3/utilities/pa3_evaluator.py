@@ -3,10 +3,15 @@
 PA3 Evaluator - Global Routing Evaluator and Visualizer
 Usage: python pa3_evaluator.py <cap_file> <net_file> <route_file>
 Usage with plotting: python pa3_evaluator.py -plot <cap_file> <net_file> <route_file>
+Usage with grid export: python pa3_evaluator.py <cap_file> <net_file> <route_file> -dump_grids <dir>
 """
 
 import sys
 import os
+from itertools import accumulate, repeat
+
+# Magic bytes of route_bin.py's binary route format (route_bin.MAGIC)
+ROUTE_BIN_MAGIC = b"PA3RTBIN"
 
 
 # ============================================================================
@@ -128,11 +133,21 @@ def parse_route_file(filepath):
         ...
         )
     
+    Binary route files written by route_bin.py are detected by their magic
+    bytes and memory-mapped instead.
+    
     Returns:
         list of dicts with keys:
             - name: net name
             - segments: list of segments, each segment is (x1, y1, z1, x2, y2, z2)
     """
+    with open(filepath, 'rb') as f:
+        is_binary = f.read(len(ROUTE_BIN_MAGIC)) == ROUTE_BIN_MAGIC
+    if is_binary:
+        # route_bin needs numpy; plain-text routes keep to the standard library
+        import route_bin
+        return route_bin.to_route_data(route_bin.read_route_bin(filepath))
+    
     with open(filepath, 'r') as f:
         lines = [line.strip() for line in f.readlines()]
     
@@ -186,13 +201,100 @@ def parse_route_file(filepath):
 # EVALUATOR FUNCTIONS
 # ============================================================================
 
-def evaluate_route(cap_data, route_data):
+def edge_length_prefix(cap_data):
+    """
+    Prefix sums of the edge lengths, cached in cap_data
+
+    Returns:
+        tuple (horizontal, vertical) where horizontal[x] is the sum of the
+        first x horizontal edge lengths, so a wire over cells [a, b) has
+        length horizontal[b] - horizontal[a]
+    """
+    prefix = cap_data.get('edge_length_prefix')
+    if prefix is None:
+        prefix = (
+            [0] + list(accumulate(cap_data['horizontal_edge_lengths'])),
+            [0] + list(accumulate(cap_data['vertical_edge_lengths'])),
+        )
+        cap_data['edge_length_prefix'] = prefix
+    return prefix
+
+
+def segment_length(prefix, lo, hi):
+    """Length of cells [lo, hi) from an edge_length_prefix table, O(1)"""
+    if hi > len(prefix) - 1:
+        # Same failure as indexing the edge length list past its end
+        raise IndexError("list index out of range")
+    return prefix[hi] - prefix[lo]
+
+
+def evaluate_net(cap_data, segments):
+    """
+    Evaluate the segments of one net
+
+    Args:
+        cap_data: capacity data from parse_cap_file
+        segments: list of (x1, y1, z1, x2, y2, z2) segments of the net
+
+    Returns:
+        tuple (used_gcells, wirelength, num_vias):
+            - used_gcells: set of (layer, row, col) GCells the net adds one demand to
+            - wirelength: physical wirelength of the wire segments
+            - num_vias: number of vias
+    """
+    xSize = cap_data['xSize']
+    ySize = cap_data['ySize']
+    horizontal_prefix, vertical_prefix = edge_length_prefix(cap_data)
+    layers = cap_data['layers']
+    
+    # Use a set to track which GCells this net has already used
+    # to avoid counting overlapping segments in the same net twice
+    # Format: (layer, row, col) for both wires and vias
+    used_gcells = set()
+    num_vias = 0
+    wirelength = 0
+    
+    for x1, y1, z1, x2, y2, z2 in segments:
+        if z1 != z2:
+            # This is a via - add demand to both layers at this position
+            num_vias += 1
+            used_gcells.add((z1, y1, x1))
+            used_gcells.add((z2, y1, x1))
+        else:
+            # This is a wire segment
+            layer_idx = z1
+            direction = layers[layer_idx]['direction']
+            
+            if direction == 'H':
+                # Horizontal wire: should be y1 == y2; only the cells
+                # inside the grid take demand and count towards wirelength
+                if y1 == y2 and 0 <= y1 < ySize:
+                    x_lo = max(min(x1, x2), 0)
+                    x_hi = min(max(x1, x2), xSize)
+                    if x_lo < x_hi:
+                        wirelength += segment_length(horizontal_prefix, x_lo, x_hi)
+                        used_gcells.update(zip(repeat(layer_idx), repeat(y1), range(x_lo, x_hi)))
+            else:  # 'V'
+                # Vertical wire: should be x1 == x2
+                if x1 == x2 and 0 <= x1 < xSize:
+                    y_lo = max(min(y1, y2), 0)
+                    y_hi = min(max(y1, y2), ySize)
+                    if y_lo < y_hi:
+                        wirelength += segment_length(vertical_prefix, y_lo, y_hi)
+                        used_gcells.update(zip(repeat(layer_idx), range(y_lo, y_hi), repeat(x1)))
+    
+    return used_gcells, wirelength, num_vias
+
+
+def evaluate_route(cap_data, route_data, keep_net_gcells=False, keep_demand=False):
     """
     Evaluate routing result
     
     Args:
         cap_data: capacity data from parse_cap_file
         route_data: route data from parse_route_file
+        keep_net_gcells: also return the GCells of every net (for gcell_index.py)
+        keep_demand: also return the demand grid (for region_stats.py)
     
     Returns:
         dict with keys:
@@ -202,83 +304,35 @@ def evaluate_route(cap_data, route_data):
             - via_cost: cost from vias
             - num_vias: number of vias
             - wirelength: total physical wirelength
+            - net_gcells: (only with keep_net_gcells) list with the set of
+              (layer, row, col) GCells of each net, in route_data order
+            - demand: (only with keep_demand) demand[layer][row][col]
     """
     xSize = cap_data['xSize']
     ySize = cap_data['ySize']
     nLayers = cap_data['nLayers']
     unit_via_cost = cap_data['unit_via_cost']
-    horizontal_edge_lengths = cap_data['horizontal_edge_lengths']
-    vertical_edge_lengths = cap_data['vertical_edge_lengths']
     
     # Initialize demand arrays for each layer
     demand = []
     for layer_idx in range(nLayers):
-        layer = cap_data['layers'][layer_idx]
-        direction = layer['direction']
-        
-        if direction == 'H':
-            layer_demand = [[0 for _ in range(xSize)] for _ in range(ySize)]
-        else:  # 'V'
-            layer_demand = [[0 for _ in range(xSize)] for _ in range(ySize)]
-        
-        demand.append(layer_demand)
+        demand.append([[0 for _ in range(xSize)] for _ in range(ySize)])
     
     # Count wire segments and vias
     num_vias = 0
     total_wirelength = 0
     
-    # Process each segment
+    net_gcells = []
+    
+    # Process each net; a GCell counts once per net
     for net in route_data:
-        # Use a set to track which GCells this net has already used
-        # to avoid counting overlapping segments in the same net twice
-        # Format: (layer, row, col) for both wires and vias
-        used_gcells = set()
-        
-        for x1, y1, z1, x2, y2, z2 in net['segments']:
-            if z1 != z2:
-                # This is a via - add demand to both layers at this position
-                num_vias += 1
-                for layer_idx in [z1, z2]:
-                    gcell = (layer_idx, y1, x1)
-                    if gcell not in used_gcells:
-                        demand[layer_idx][y1][x1] += 1
-                        used_gcells.add(gcell)
-            else:
-                # This is a wire segment
-                layer_idx = z1
-                layer = cap_data['layers'][layer_idx]
-                direction = layer['direction']
-                
-                if direction == 'H':
-                    # Horizontal wire: should be y1 == y2
-                    if y1 == y2:
-                        # Increment demand for this horizontal edge
-                        y = y1
-                        x_min = min(x1, x2)
-                        x_max = max(x1, x2)
-                        for x in range(x_min, x_max):
-                            if 0 <= y < ySize and 0 <= x < xSize:
-                                gcell = (layer_idx, y, x)
-                                if gcell not in used_gcells:
-                                    demand[layer_idx][y][x] += 1
-                                    used_gcells.add(gcell)
-                                # Add wirelength using horizontal edge length (always count)
-                                total_wirelength += horizontal_edge_lengths[x]
-                else:  # 'V'
-                    # Vertical wire: should be x1 == x2
-                    if x1 == x2:
-                        # Increment demand for this vertical edge
-                        x = x1
-                        y_min = min(y1, y2)
-                        y_max = max(y1, y2)
-                        for y in range(y_min, y_max):
-                            if 0 <= y < ySize and 0 <= x < xSize:
-                                gcell = (layer_idx, y, x)
-                                if gcell not in used_gcells:
-                                    demand[layer_idx][y][x] += 1
-                                    used_gcells.add(gcell)
-                                # Add wirelength using vertical edge length (always count)
-                                total_wirelength += vertical_edge_lengths[y]
+        used_gcells, wirelength, net_vias = evaluate_net(cap_data, net['segments'])
+        for layer_idx, y, x in used_gcells:
+            demand[layer_idx][y][x] += 1
+        total_wirelength += wirelength
+        num_vias += net_vias
+        if keep_net_gcells:
+            net_gcells.append(used_gcells)
     
     # Calculate overflow
     total_overflow = 0
@@ -298,7 +352,7 @@ def evaluate_route(cap_data, route_data):
     via_cost_total = num_vias * unit_via_cost
     total_cost = wirelength_cost + via_cost_total
     
-    return {
+    result = {
         'overflow': total_overflow,
         'total_cost': total_cost,
         'wirelength_cost': wirelength_cost,
@@ -306,6 +360,11 @@ def evaluate_route(cap_data, route_data):
         'num_vias': num_vias,
         'wirelength': total_wirelength
     }
+    if keep_net_gcells:
+        result['net_gcells'] = net_gcells
+    if keep_demand:
+        result['demand'] = demand
+    return result
 
 
 def print_evaluation(result):
@@ -317,6 +376,63 @@ def print_evaluation(result):
     print(f"  - Via Cost: {result['via_cost']} ({result['num_vias']} vias)")
 
 
+GRID_FILES = ('demand', 'capacity', 'overflow')
+
+
+def export_grids(cap_data, result, out_dir):
+    """
+    Write the demand, capacity and overflow grids as .npy files plus manifest.json
+
+    The grids are int32 arrays of shape (nLayers, ySize, xSize) that other
+    processes can open zero-copy with np.load(path, mmap_mode='r');
+    capacity.npy is accepted by whatif.py --cap.  The manifest is written
+    last, so its presence marks a complete export.
+
+    Args:
+        cap_data: capacity data from parse_cap_file
+        result: evaluate_route result computed with keep_demand=True
+        out_dir: output directory (created if needed)
+
+    Returns:
+        path of the manifest
+    """
+    import json
+    import numpy as np
+
+    os.makedirs(out_dir, exist_ok=True)
+    shape = (cap_data['nLayers'], cap_data['ySize'], cap_data['xSize'])
+    grids = {
+        name: np.lib.format.open_memmap(os.path.join(out_dir, f"{name}.npy"), mode='w+',
+                                        dtype=np.int32, shape=shape)
+        for name in GRID_FILES
+    }
+    overflow_gcells = 0
+    for layer_idx, layer in enumerate(cap_data['layers']):
+        grids['demand'][layer_idx] = result['demand'][layer_idx]
+        grids['capacity'][layer_idx] = layer['capacities']
+        np.subtract(grids['demand'][layer_idx], grids['capacity'][layer_idx], out=grids['overflow'][layer_idx])
+        np.maximum(grids['overflow'][layer_idx], 0, out=grids['overflow'][layer_idx])
+        overflow_gcells += int(np.count_nonzero(grids['overflow'][layer_idx]))
+    for grid in grids.values():
+        grid.flush()
+    del grids
+
+    manifest = {
+        'shape': list(shape),
+        'axes': ['layer', 'y', 'x'],
+        'dtype': 'int32',
+        'files': {name: f"{name}.npy" for name in GRID_FILES},
+        'layers': [{'name': layer['name'], 'direction': layer['direction']} for layer in cap_data['layers']],
+        'unit_via_cost': cap_data['unit_via_cost'],
+        'totals': dict({key: value for key, value in result.items() if isinstance(value, int)},
+                       overflow_gcells=overflow_gcells),
+    }
+    manifest_path = os.path.join(out_dir, 'manifest.json')
+    with open(manifest_path, 'w') as f:
+        json.dump(manifest, f, indent=2)
+    return manifest_path
+
+
 def check_route_validity(cap_data, route_data):
     """Check if route data is valid"""
     xSize = cap_data['xSize']
@@ -814,16 +930,40 @@ def draw_route_3d(fig, ax, cap_data, net_data, route_data, randomize_position=Fa
 # ============================================================================
 
 def main():
-    # Separate -plot flag from file arguments
+    # Separate -plot and the GCell query flags from file arguments
     args = sys.argv[1:]
     plot_flag = '-plot' in args
     
-    # Remove -plot from arguments if present
-    file_args = [arg for arg in args if arg != '-plot']
+    # -gcell L,Y,X and -window X0,Y0,X1,Y1 take a value and may repeat
+    gcell_queries = []
+    window_queries = []
+    grid_dir = None
+    file_args = []
+    i = 0
+    while i < len(args):
+        if args[i] == '-dump_grids' and i + 1 < len(args):
+            grid_dir = args[i + 1]
+            i += 2
+            continue
+        if args[i] in ('-gcell', '-window') and i + 1 < len(args):
+            values = args[i + 1].split(',')
+            expected = 3 if args[i] == '-gcell' else 4
+            if len(values) != expected or not all(v.lstrip('-').isdigit() for v in values):
+                print(f"Error: {args[i]} expects {expected} comma-separated integers, got '{args[i + 1]}'")
+                sys.exit(1)
+            (gcell_queries if args[i] == '-gcell' else window_queries).append([int(v) for v in values])
+            i += 2
+            continue
+        if args[i] != '-plot':
+            file_args.append(args[i])
+        i += 1
     
     if len(file_args) != 3:
-        print("Usage: python pa3_evaluator.py <cap_file> <net_file> <route_file> [-plot]")
+        print("Usage: python pa3_evaluator.py <cap_file> <net_file> <route_file> [-plot] "
+              "[-gcell L,Y,X] [-window X0,Y0,X1,Y1] [-dump_grids DIR]")
         print("  -plot can be placed at any position")
+        print("  -gcell / -window list the nets on a GCell / crossing a window (repeatable)")
+        print("  -dump_grids writes demand/capacity/overflow .npy grids and manifest.json to DIR")
         sys.exit(1)
     
     cap_file = file_args[0]
@@ -846,6 +986,11 @@ def main():
     net_data = parse_net_file(net_file)
     route_data = parse_route_file(route_file)
     print(f"  Grid: {cap_data['xSize']} x {cap_data['ySize']}, Layers: {cap_data['nLayers']}")
+    for layer, y, x in gcell_queries:
+        if not (0 <= layer < cap_data['nLayers'] and 0 <= y < cap_data['ySize'] and 0 <= x < cap_data['xSize']):
+            print(f"Error: -gcell {layer},{y},{x} is outside the {cap_data['nLayers']} x "
+                  f"{cap_data['ySize']} x {cap_data['xSize']} (layers x rows x columns) grid")
+            sys.exit(1)
     print(f"  Nets: {len(net_data)}")
     print(f"  Total segments: {sum(len(net['segments']) for net in route_data)}")
     
@@ -861,8 +1006,22 @@ def main():
     
     # Evaluate routing
     print("\n[4/5] Evaluating routing quality...")
-    eval_result = evaluate_route(cap_data, route_data)
+    query_flag = bool(gcell_queries or window_queries)
+    eval_result = evaluate_route(cap_data, route_data, keep_net_gcells=query_flag,
+                                 keep_demand=grid_dir is not None)
     print_evaluation(eval_result)
+
+    if grid_dir is not None:
+        manifest_path = export_grids(cap_data, eval_result, grid_dir)
+        eval_result.pop('demand')
+        print(f"  Grids written: {manifest_path}")
+    
+    if query_flag:
+        import gcell_index
+        print("\nGCell queries:")
+        index = gcell_index.GCellIndex.build(
+            cap_data, eval_result.pop('net_gcells'), [net['name'] for net in route_data])
+        gcell_index.print_queries(index, cap_data, gcell_queries, window_queries)
     
     # Generate plots (only if -plot flag is provided)
     if plot_flag:
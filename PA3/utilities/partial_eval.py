@@ -0,0 +1,310 @@
+#!/usr/bin/env python3
+"""
+Split route evaluation into shards and merge the partial results.
+
+Each shard evaluates a subset of the nets with evaluate_net and writes a
+partial .npz: its demand (sparse GCell keys and counts, or a dense grid when
+that is smaller), wirelength, via count and which nets it covered.  Demand is
+additive across nets and the per-net dedup happens inside a shard, so the
+merge only has to add the partials up and score the sum against capacity to
+get exactly what evaluate_route reports.  Partials record CRCs of the cap
+file and of the route, and the merge rejects partials that disagree.
+
+Nets are assigned either by CRC32 of the net name (stable under reordering)
+or by contiguous index range.
+
+Usage:
+    python3 partial_eval.py shard <cap_file> <route_file> part0.npz --shards 4 --index 0
+    python3 partial_eval.py shard <cap_file> <route_file> part0.npz --shards 4 --index 0 --by range
+    python3 partial_eval.py shard <cap_file> <route_file> head.npz --range 0:100000
+    python3 partial_eval.py merge <cap_file> part*.npz [--check route_file]
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import sys
+import zlib
+from pathlib import Path
+from typing import Dict, List, Sequence
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+import pa3_evaluator  # noqa: E402
+import route_bin  # noqa: E402
+
+FORMAT_VERSION = 2
+
+
+def file_crc(path: Path) -> int:
+    crc = 0
+    with open(path, "rb") as fin:
+        for block in iter(lambda: fin.read(1 << 20), b""):
+            crc = zlib.crc32(block, crc)
+    return crc
+
+
+def route_crc(route: route_bin.BinaryRoute) -> int:
+    """CRC32 of the net names and segments, equal for the text and binary forms of a route."""
+    crc = zlib.crc32("\n".join(route.names).encode())
+    crc = zlib.crc32(np.ascontiguousarray(route.seg_index, dtype="<i8").tobytes(), crc)
+    return zlib.crc32(np.ascontiguousarray(route.segments, dtype="<i4").tobytes(), crc)
+
+
+def name_shard(name: str, shards: int) -> int:
+    return zlib.crc32(name.encode()) % shards
+
+
+def select_nets(names: Sequence[str], by: str, shards: int, index: int, span=None) -> np.ndarray:
+    """Indices of the nets of one shard."""
+    n = len(names)
+    if span is not None:
+        start, stop = span
+        return np.arange(max(start, 0), min(stop, n))
+    if by == "hash":
+        return np.array([i for i, name in enumerate(names) if name_shard(name, shards) == index], dtype=np.int64)
+    bounds = np.linspace(0, n, shards + 1).astype(np.int64)
+    return np.arange(bounds[index], bounds[index + 1])
+
+
+# ============================================================================
+# Shard
+# ============================================================================
+
+def evaluate_shard(cap_data, route: route_bin.BinaryRoute, nets: np.ndarray) -> Dict:
+    """
+    Evaluate the nets ``nets`` of ``route``
+
+    Returns:
+        dict with keys (sorted linear GCell keys), counts (demand per key),
+        wirelength and num_vias
+    """
+    shape = (cap_data['nLayers'], cap_data['ySize'], cap_data['xSize'])
+    demand: Dict[int, int] = {}
+    wirelength = 0
+    num_vias = 0
+    for i in nets.tolist():
+        segments = [(x1, y1, z1, x2, y2, z2) for z1, x1, y1, z2, x2, y2 in route.net(i).tolist()]
+        used_gcells, net_wirelength, net_vias = pa3_evaluator.evaluate_net(cap_data, segments)
+        for cell in used_gcells:
+            # Index like evaluate_route's nested lists: negatives wrap, too large raises
+            for value, size in zip(cell, shape):
+                if not -size <= value < size:
+                    raise IndexError("list index out of range")
+            layer, y, x = cell
+            key = ((layer % shape[0]) * shape[1] + y % shape[1]) * shape[2] + x % shape[2]
+            demand[key] = demand.get(key, 0) + 1
+        wirelength += net_wirelength
+        num_vias += net_vias
+    keys = np.array(sorted(demand), dtype=np.int64)
+    counts = np.array([demand[k] for k in keys.tolist()], dtype=np.int64)
+    return {'keys': keys, 'counts': counts, 'wirelength': wirelength, 'num_vias': num_vias}
+
+
+def write_partial(path: Path, shape, shard: Dict, meta: Dict, dense=None) -> str:
+    """Write a partial; dense storage is used when it is smaller than the sparse form."""
+    cells = int(np.prod(shape))
+    if dense is None:
+        dense = 8 * cells < 16 * len(shard['keys'])
+    arrays = {}
+    if dense:
+        grid = np.zeros(cells, dtype=np.int64)
+        grid[shard['keys']] = shard['counts']
+        arrays['demand'] = grid.reshape(shape)
+    else:
+        arrays['keys'] = shard['keys']
+        arrays['counts'] = shard['counts']
+    meta = dict(meta, version=FORMAT_VERSION, shape=list(shape), storage='dense' if dense else 'sparse',
+                wirelength=shard['wirelength'], num_vias=shard['num_vias'])
+    # Counters go through JSON so they stay exact Python integers
+    np.savez_compressed(path, meta=np.array(json.dumps(meta)), **arrays)
+    return meta['storage']
+
+
+def read_partial(path: Path):
+    """(meta dict, flat demand keys, counts) of a partial file."""
+    with np.load(path) as data:
+        meta = json.loads(str(data['meta']))
+        if meta.get('version') != FORMAT_VERSION:
+            raise ValueError(f"{path}: unsupported partial version {meta.get('version')}")
+        if meta['storage'] == 'dense':
+            grid = data['demand'].ravel()
+            keys = np.flatnonzero(grid)
+            return meta, keys, grid[keys]
+        return meta, data['keys'], data['counts']
+
+
+# ============================================================================
+# Merge
+# ============================================================================
+
+def check_coverage(metas: List[Dict]) -> List[str]:
+    """Problems that keep the partials from covering every net exactly once."""
+    problems = []
+    totals = {m['total_nets'] for m in metas}
+    if len(totals) != 1:
+        return [f"partials come from routes with different net counts: {sorted(totals)}"]
+    total = totals.pop()
+    if all(m['by'] == 'hash' for m in metas):
+        shard_counts = {m['shards'] for m in metas}
+        if len(shard_counts) != 1:
+            return [f"hash partials use different shard counts: {sorted(shard_counts)}"]
+        n = shard_counts.pop()
+        seen = sorted(m['index'] for m in metas)
+        if seen != list(range(n)):
+            problems.append(f"hash shards present {seen}, expected 0..{n - 1} once each")
+    else:
+        spans = sorted(tuple(m['range']) for m in metas if m['by'] != 'hash')
+        if len(spans) != len(metas):
+            return ["cannot mix hash and range partials"]
+        pos = 0
+        for start, stop in spans:
+            if start == stop:
+                # An empty range covers nothing and overlaps nothing
+                continue
+            if start != pos:
+                problems.append(f"nets {min(pos, start)}..{max(pos, start) - 1} "
+                                f"{'missing' if start > pos else 'covered twice'}")
+            pos = max(pos, stop)
+        if pos != total:
+            problems.append(f"nets {pos}..{total - 1} missing")
+    return problems
+
+
+def merge_partials(cap_data, paths: Sequence[Path], cap_crc=None, allow_partial: bool = False) -> Dict:
+    """
+    Reduce partial files against the capacity grid
+
+    Returns:
+        dict with evaluate_route's keys and values (for the nets covered)
+    """
+    shape = (cap_data['nLayers'], cap_data['ySize'], cap_data['xSize'])
+    capacity = np.array([layer['capacities'] for layer in cap_data['layers']], dtype=np.int64).ravel()
+    demand = np.zeros(capacity.size, dtype=np.int64)
+    wirelength = 0
+    num_vias = 0
+    metas = []
+    for path in paths:
+        meta, keys, counts = read_partial(path)
+        if tuple(meta['shape']) != shape:
+            raise ValueError(f"{path}: grid {meta['shape']} does not match the cap file {list(shape)}")
+        if cap_crc is not None and meta['cap_crc'] != cap_crc:
+            raise ValueError(f"{path}: computed against a different cap file")
+        if metas and meta['route_crc'] != metas[0]['route_crc']:
+            raise ValueError(f"{path}: computed from a different route than {paths[0]}")
+        np.add.at(demand, keys, counts)
+        wirelength += meta['wirelength']
+        num_vias += meta['num_vias']
+        metas.append(meta)
+    problems = check_coverage(metas) if metas else ["no partial files"]
+    if problems and not allow_partial:
+        raise ValueError("; ".join(problems))
+
+    via_cost = num_vias * cap_data['unit_via_cost']
+    return {
+        'overflow': int(np.maximum(demand - capacity, 0).sum()),
+        'total_cost': wirelength + via_cost,
+        'wirelength_cost': wirelength,
+        'via_cost': via_cost,
+        'num_vias': num_vias,
+        'wirelength': wirelength,
+    }
+
+
+def parse_span(text: str):
+    start, sep, stop = text.partition(":")
+    if not sep:
+        raise ValueError(f"--range expects START:STOP, got '{text}'")
+    start, stop = int(start), int(stop)
+    if stop < start:
+        raise ValueError(f"--range STOP must not be below START, got '{text}'")
+    return start, stop
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Sharded route evaluation with mergeable partials.")
+    sub = parser.add_subparsers(dest="cmd", required=True)
+
+    shard = sub.add_parser("shard", help="Evaluate one shard of nets into a partial .npz.")
+    shard.add_argument("cap_file", type=Path)
+    shard.add_argument("route_file", type=Path)
+    shard.add_argument("output", type=Path)
+    shard.add_argument("--shards", type=int, default=1, help="Number of shards.")
+    shard.add_argument("--index", type=int, default=0, help="Shard to evaluate (0-based).")
+    shard.add_argument("--by", choices=("hash", "range"), default="hash",
+                       help="Assign nets by CRC32 of the name or by contiguous index range.")
+    shard.add_argument("--range", dest="span", default=None, metavar="START:STOP",
+                       help="Evaluate nets START..STOP-1 instead of a numbered shard.")
+    storage = shard.add_mutually_exclusive_group()
+    storage.add_argument("--dense", dest="dense", action="store_true", default=None)
+    storage.add_argument("--sparse", dest="dense", action="store_false")
+
+    merge = sub.add_parser("merge", help="Reduce partials to the final overflow and cost.")
+    merge.add_argument("cap_file", type=Path)
+    merge.add_argument("partials", type=Path, nargs="+")
+    merge.add_argument("--allow-partial", action="store_true",
+                       help="Score even if the partials do not cover every net exactly once.")
+    merge.add_argument("--check", type=Path, default=None, metavar="ROUTE",
+                       help="Compare with evaluate_route on the full route.")
+    args = parser.parse_args()
+
+    if args.cmd == "shard":
+        for path in (args.cap_file, args.route_file):
+            if not path.exists():
+                parser.error(f"file not found: {path}")
+        if args.shards < 1 or not 0 <= args.index < args.shards:
+            parser.error("--index must be in 0..--shards-1")
+        try:
+            span = parse_span(args.span) if args.span else None
+        except ValueError as exc:
+            parser.error(str(exc))
+
+        cap_data = pa3_evaluator.parse_cap_file(str(args.cap_file))
+        route = route_bin.read_route(args.route_file)
+        nets = select_nets(route.names, args.by, args.shards, args.index, span)
+        result = evaluate_shard(cap_data, route, nets)
+        meta = {
+            'by': 'range' if span else args.by,
+            'shards': 1 if span else args.shards,
+            'index': 0 if span else args.index,
+            'range': None,
+            'nets': len(nets),
+            'total_nets': len(route),
+            'cap_crc': file_crc(args.cap_file),
+            'route_crc': route_crc(route),
+        }
+        if span:
+            meta['range'] = [max(span[0], 0), max(min(span[1], len(route)), max(span[0], 0))]
+        elif args.by == 'range':
+            bounds = np.linspace(0, len(route), args.shards + 1).astype(np.int64)
+            meta['range'] = [int(bounds[args.index]), int(bounds[args.index + 1])]
+        stored = write_partial(args.output, (cap_data['nLayers'], cap_data['ySize'], cap_data['xSize']),
+                               result, meta, args.dense)
+        print(f"Shard {meta['index']}/{meta['shards']} ({meta['by']}): {len(nets)} of {len(route)} nets, "
+              f"{len(result['keys'])} GCells with demand, {stored} -> {args.output}")
+        return 0
+
+    for path in [args.cap_file] + args.partials:
+        if not path.exists():
+            parser.error(f"file not found: {path}")
+    cap_data = pa3_evaluator.parse_cap_file(str(args.cap_file))
+    try:
+        result = merge_partials(cap_data, args.partials, file_crc(args.cap_file), args.allow_partial)
+    except ValueError as exc:
+        print(f"Error: {exc}")
+        return 1
+    print(f"Merged {len(args.partials)} partial(s)")
+    pa3_evaluator.print_evaluation(result)
+    if args.check:
+        reference = pa3_evaluator.evaluate_route(cap_data, pa3_evaluator.parse_route_file(str(args.check)))
+        if reference != result:
+            print(f"Mismatch with evaluate_route: {reference} != {result}")
+            return 1
+        print("Matches evaluate_route.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,425 @@
+#!/usr/bin/env python3
+"""
+Vectorized L/Z pattern router for PA3 inputs.
+
+Routes every two-pin net of a .net file with NumPy: each net picks one of a
+few monotone patterns (the two L shapes and Z shapes through interior
+columns/rows), wires run on the lowest H and lowest V layer of the .cap file
+and vias connect the pins and bends.  A few rounds of negotiation move nets
+that cross overflowed GCells to cheaper patterns.  The result is a valid
+.route file and a baseline overflow / cost to compare routers against.
+
+Usage:
+    python3 pattern_route.py <cap_file> <net_file> <route_file>
+    python3 pattern_route.py --iters 0 --z 0 case.cap case.net case.route   # plain L shapes
+    python3 pattern_route.py --verify case.cap case.net case.route          # re-score with pa3_evaluator
+
+Demand and cost follow pa3_evaluator.evaluate_route: a wire on layer z from
+x_a to x_b uses GCells [min, max) of its row, a via uses its GCell on both
+layers, and each net counts a GCell once.
+"""
+
+from __future__ import annotations
+
+import argparse
+import sys
+import time
+from pathlib import Path
+from typing import Dict, List, Sequence, Tuple
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+import pa3_evaluator  # noqa: E402
+
+HVH, VHV = 0, 1
+# Most points a path can have: pin, (via, wire end) for each of 3 wires, via to pin.
+NUM_POINTS = 8
+CHUNK_NETS = 1 << 17
+
+
+def routing_layers(cap_data) -> Tuple[int, int]:
+    """Lowest-index H layer and lowest-index V layer."""
+    dirs = [layer['direction'].upper() for layer in cap_data['layers']]
+    if 'H' not in dirs or 'V' not in dirs:
+        raise ValueError("pattern routing needs at least one H and one V layer")
+    return dirs.index('H'), dirs.index('V')
+
+
+def capacity_array(cap_data) -> np.ndarray:
+    """Capacities as an int64 (layer, y, x) array."""
+    return np.array([layer['capacities'] for layer in cap_data['layers']], dtype=np.int64).reshape(
+        cap_data['nLayers'], cap_data['ySize'], cap_data['xSize'])
+
+
+def net_arrays(net_data) -> Tuple[List[str], np.ndarray, np.ndarray]:
+    """Names, (N, 2, 3) pins as (layer, x, y), and the mask of two-pin nets."""
+    names = [net['name'] for net in net_data]
+    routable = np.array([len(net['pins']) == 2 for net in net_data], dtype=bool)
+    pins = np.zeros((len(net_data), 2, 3), dtype=np.int64)
+    pins[routable] = [net['pins'] for net, ok in zip(net_data, routable) if ok]
+    return names, pins, routable
+
+
+# ============================================================================
+# PATTERN CANDIDATES
+# ============================================================================
+
+def candidate_mids(pins: np.ndarray, z: int) -> Tuple[np.ndarray, np.ndarray]:
+    """Pattern families and bend coordinates, shapes (C,) and (C, N).
+
+    HVH at x2 / x1 are the two L shapes; the others are Z shapes whose middle
+    wire sits at evenly spaced interior columns (HVH) or rows (VHV).
+    """
+    x1, y1, x2, y2 = pins[:, 0, 1], pins[:, 0, 2], pins[:, 1, 1], pins[:, 1, 2]
+    fams, mids = [HVH, HVH], [x2, x1]
+    for k in range(1, z + 1):
+        fams.append(HVH)
+        mids.append(x1 + (x2 - x1) * k // (z + 1))
+        fams.append(VHV)
+        mids.append(y1 + (y2 - y1) * k // (z + 1))
+    return np.array(fams), np.stack(mids)
+
+
+def pattern_wires(pins: np.ndarray, fam, mid: np.ndarray, h: int, v: int):
+    """The three wires of each net's pattern as (layer, fixed, a, b, horizontal).
+
+    ``fixed`` is the row of a horizontal wire or the column of a vertical
+    one, and the wire runs from ``a`` to ``b`` along its direction (a == b
+    means no wire).  ``fam`` is a family per net or one for all nets.
+    """
+    x1, y1, x2, y2 = pins[:, 0, 1], pins[:, 0, 2], pins[:, 1, 1], pins[:, 1, 2]
+    hvh = np.broadcast_to(np.asarray(fam) == HVH, mid.shape)
+    outer = np.where(hvh, h, v)
+    return [
+        (outer, np.where(hvh, y1, x1), np.where(hvh, x1, y1), mid, hvh),
+        (np.where(hvh, v, h), mid, np.where(hvh, y1, x1), np.where(hvh, y2, x2), ~hvh),
+        (outer, np.where(hvh, y2, x2), mid, np.where(hvh, x2, y2), hvh),
+    ]
+
+
+def pattern_vias(pins: np.ndarray, wires) -> np.ndarray:
+    """Number of layer changes along pin -> wires -> pin, skipping empty wires."""
+    last = pins[:, 0, 0]
+    vias = np.zeros(len(pins), dtype=np.int64)
+    for layer, _, a, b, _ in wires:
+        present = a != b
+        vias += present & (last != layer)
+        last = np.where(present, layer, last)
+    return vias + (last != pins[:, 1, 0])
+
+
+def _line_index(shape: Tuple[int, int, int], layer, fixed, pos, horizontal) -> np.ndarray:
+    """Flat index into the concatenated (L, Y, X+1) row and (L, X, Y+1) column tables."""
+    n_layers, y_size, x_size = shape
+    offset = n_layers * y_size * (x_size + 1)
+    return np.where(
+        horizontal,
+        (layer * y_size + fixed) * (x_size + 1) + pos,
+        offset + (layer * x_size + fixed) * (y_size + 1) + pos,
+    )
+
+
+def wire_demand(shape: Tuple[int, int, int], wires) -> np.ndarray:
+    """Demand of (layer, fixed, a, b, horizontal) wires on an (L, Y, X) grid.
+
+    A wire adds one to GCells [min(a, b), max(a, b)); the ranges are summed
+    with difference arrays along rows and columns.
+    """
+    n_layers, y_size, x_size = shape
+    size = n_layers * y_size * (x_size + 1) + n_layers * x_size * (y_size + 1)
+    diff = np.zeros(size, dtype=np.int64)
+    for layer, fixed, a, b, horizontal in wires:
+        lo, hi = np.minimum(a, b), np.maximum(a, b)
+        keep = hi > lo
+        layer, fixed, horizontal = (
+            np.broadcast_to(arr, keep.shape)[keep] for arr in (layer, fixed, horizontal)
+        )
+        diff += np.bincount(_line_index(shape, layer, fixed, lo[keep], horizontal), minlength=size)
+        diff -= np.bincount(_line_index(shape, layer, fixed, hi[keep], horizontal), minlength=size)
+    rows, cols = np.split(diff, [n_layers * y_size * (x_size + 1)])
+    dem = np.cumsum(rows.reshape(n_layers, y_size, x_size + 1), axis=2)[:, :, :-1]
+    dem += np.cumsum(cols.reshape(n_layers, x_size, y_size + 1), axis=2)[:, :, :-1].transpose(0, 2, 1)
+    return dem
+
+
+def wire_cost(table: np.ndarray, shape: Tuple[int, int, int], wires) -> np.ndarray:
+    """Sum of per-GCell penalties along the wires from a prefix-sum table.
+
+    ``table`` is laid out like wire_demand's difference array, holding
+    running sums along each row and column.
+    """
+    cost = 0
+    for layer, fixed, a, b, horizontal in wires:
+        lo, hi = np.minimum(a, b), np.maximum(a, b)
+        cost = cost + table[_line_index(shape, layer, fixed, hi, horizontal)] \
+            - table[_line_index(shape, layer, fixed, lo, horizontal)]
+    return cost
+
+
+def penalty_table(penalty: np.ndarray) -> np.ndarray:
+    """Row and column prefix sums of an (L, Y, X) penalty grid, for wire_cost."""
+    n_layers, y_size, x_size = penalty.shape
+    rows = np.zeros((n_layers, y_size, x_size + 1))
+    rows[:, :, 1:] = np.cumsum(penalty, axis=2)
+    cols = np.zeros((n_layers, x_size, y_size + 1))
+    cols[:, :, 1:] = np.cumsum(penalty.transpose(0, 2, 1), axis=2)
+    return np.concatenate([rows.ravel(), cols.ravel()])
+
+
+def choose_patterns(cap_data, pins: np.ndarray, routable: np.ndarray, iters: int, z: int,
+                    weight: float, seed: int) -> Tuple[np.ndarray, np.ndarray]:
+    """Pick a pattern per net; returns (family, mid) arrays of length N.
+
+    Start from the cheapest pattern by via count, then for ``iters`` rounds
+    let a random half of the nets crossing overflow switch to the pattern
+    with the lowest via cost plus ``weight`` per unit of overflow it would
+    add.  Only moved nets update the demand grid.  The assignment with the
+    lowest overflow is kept.
+    """
+    h, v = routing_layers(cap_data)
+    cap = capacity_array(cap_data)
+    fams, mids = candidate_mids(pins, z)
+    via_cost = np.stack([
+        pattern_vias(pins, pattern_wires(pins, fam, mid, h, v)) for fam, mid in zip(fams, mids)
+    ]) * cap_data['unit_via_cost']
+    rng = np.random.default_rng(seed)
+
+    def wires_of(sel, pick):
+        return pattern_wires(pins[sel], fams[pick], mids[pick, sel], h, v)
+
+    nets = np.flatnonzero(routable)
+    choice = np.argmin(via_cost, axis=0)
+    demand = wire_demand(cap.shape, wires_of(nets, choice[nets]))
+    best, best_overflow = choice.copy(), int(np.maximum(demand - cap, 0).sum())
+    for _ in range(iters):
+        if best_overflow == 0:
+            break
+        table = penalty_table(np.maximum(demand - cap + 1, 0) * weight)
+        current = wire_cost(table, cap.shape, wires_of(nets, choice[nets]))
+        sel = nets[(current > 0) & (rng.random(len(nets)) < 0.5)]
+        if not len(sel):
+            break
+        costs = np.stack([
+            via_cost[c, sel] + wire_cost(table, cap.shape, wires_of(sel, np.full(len(sel), c)))
+            for c in range(len(fams))
+        ])
+        new = np.argmin(costs, axis=0)
+        changed = new != choice[sel]
+        moved, new = sel[changed], new[changed]
+        demand += wire_demand(cap.shape, wires_of(moved, new))
+        demand -= wire_demand(cap.shape, wires_of(moved, choice[moved]))
+        choice[moved] = new
+        overflow = int(np.maximum(demand - cap, 0).sum())
+        if overflow < best_overflow:
+            best, best_overflow = choice.copy(), overflow
+    idx = np.arange(len(pins))
+    return fams[best], mids[best, idx]
+
+
+# ============================================================================
+# PATH GEOMETRY
+# ============================================================================
+
+def build_paths(pins: np.ndarray, fam: np.ndarray, mid: np.ndarray, h: int,
+                v: int) -> Tuple[np.ndarray, np.ndarray]:
+    """Points (layer, x, y) from pin1 to pin2 for each net's pattern.
+
+    Returns an (N, NUM_POINTS, 3) array and the point count per net.  Empty
+    wires are skipped, a layer change is a single via to the next wire's
+    layer, and two wires on the same layer with nothing between them are
+    merged, so no segment has zero length.
+    """
+    n = len(pins)
+    idx = np.arange(n)
+    pts = np.zeros((n, NUM_POINTS, 3), dtype=np.int64)
+    pts[:, 0] = pins[:, 0]
+    pos = np.ones(n, dtype=np.int64)
+    cur = pins[:, 0, 0].copy()
+    last_wire = np.full(n, -1)
+
+    def put(mask, layer, x, y, at):
+        pts[idx[mask], at[mask]] = np.stack([layer, x, y], axis=-1)[mask]
+
+    for layer, fixed, a, b, horizontal in pattern_wires(pins, fam, mid, h, v):
+        present = a != b
+        ax, ay = np.where(horizontal, a, fixed), np.where(horizontal, fixed, a)
+        bx, by = np.where(horizontal, b, fixed), np.where(horizontal, fixed, b)
+        via = present & (cur != layer)
+        put(via, layer, ax, ay, pos)
+        pos += via
+        merge = present & (last_wire == layer)
+        put(present, layer, bx, by, pos - merge)
+        pos += present & ~merge
+        cur = np.where(present, layer, cur)
+        last_wire = np.where(present, layer, last_wire)
+    via = cur != pins[:, 1, 0]
+    put(via, pins[:, 1, 0], pins[:, 1, 1], pins[:, 1, 2], pos)
+    pos += via
+    return pts, pos
+
+
+def route_patterns(cap_data, net_data, iters: int = 4, z: int = 3, weight: float = 1000.0,
+                   seed: int = 0):
+    """Route all two-pin nets; returns (names, points, counts).
+
+    Net i's path is points[i, :counts[i]]; nets without exactly two pins get
+    counts 0 (an empty route).
+    """
+    names, pins, routable = net_arrays(net_data)
+    h, v = routing_layers(cap_data)
+    fam, mid = choose_patterns(cap_data, pins, routable, iters, z, weight, seed)
+    pts, count = build_paths(pins, fam, mid, h, v)
+    count[~routable] = 0
+    return names, pts, count
+
+
+# ============================================================================
+# METRICS AND OUTPUT
+# ============================================================================
+
+def evaluate_paths(cap_data, pts: np.ndarray, count: np.ndarray) -> Dict:
+    """evaluate_route's metrics for point paths, plus the (L, Y, X) demand."""
+    cap = capacity_array(cap_data)
+    n_layers, y_size, x_size = cap.shape
+    dirs = np.array([layer['direction'].upper() == 'H' for layer in cap_data['layers']])
+    prefix_h = np.concatenate([[0], np.cumsum(cap_data['horizontal_edge_lengths'], dtype=np.int64)])
+    prefix_v = np.concatenate([[0], np.cumsum(cap_data['vertical_edge_lengths'], dtype=np.int64)])
+
+    demand = np.zeros(cap.size, dtype=np.int64)
+    num_vias = wirelength = 0
+    for start in range(0, len(pts), CHUNK_NETS):
+        p = pts[start:start + CHUNK_NETS]
+        valid = np.arange(p.shape[1] - 1) < (count[start:start + CHUNK_NETS] - 1)[:, None]
+        a, b = p[:, :-1], p[:, 1:]
+        via = valid & (a[..., 0] != b[..., 0])
+        wire = valid & ~via
+        num_vias += int(via.sum())
+
+        # Wires: on an H layer the row is fixed and x spans [lo, hi).
+        on_h = dirs[a[..., 0]]
+        fixed = np.where(on_h, a[..., 2], a[..., 1])
+        lo = np.where(on_h, np.minimum(a[..., 1], b[..., 1]), np.minimum(a[..., 2], b[..., 2]))
+        hi = np.where(on_h, np.maximum(a[..., 1], b[..., 1]), np.maximum(a[..., 2], b[..., 2]))
+        sel_h, sel_v = wire & on_h, wire & ~on_h
+        wirelength += int((prefix_h[hi[sel_h]] - prefix_h[lo[sel_h]]).sum())
+        wirelength += int((prefix_v[hi[sel_v]] - prefix_v[lo[sel_v]]).sum())
+        demand += wire_demand(
+            cap.shape, [(a[..., 0][wire], fixed[wire], lo[wire], hi[wire], on_h[wire])]
+        ).ravel()
+
+        # Via GCells, minus those already used by a wire or an earlier via of the net.
+        ends = np.concatenate([a, b], axis=1)
+        ends_ok = np.concatenate([via, via], axis=1)
+        el, ex, ey = ends[..., 0][:, :, None], ends[..., 1][:, :, None], ends[..., 2][:, :, None]
+        wl, wf, wlo, whi = (arr[:, None, :] for arr in (a[..., 0], fixed, lo, hi))
+        along = np.where(dirs[el], ex, ey)
+        across = np.where(dirs[el], ey, ex)
+        covered = (
+            wire[:, None, :] & (wl == el) & (wf == across) & (wlo <= along) & (along < whi)
+        ).any(axis=2)
+        cell = (ends[..., 0] * y_size + ends[..., 2]) * x_size + ends[..., 1]
+        cell = np.where(ends_ok, cell, -1)
+        m = cell.shape[1]
+        earlier = np.tril(np.ones((m, m), dtype=bool), -1)
+        repeated = ((cell[:, :, None] == cell[:, None, :]) & earlier).any(axis=2)
+        use = ends_ok & ~covered & ~repeated
+        demand += np.bincount(cell[use], minlength=cap.size)
+
+    demand = demand.reshape(cap.shape)
+    overflow = int(np.maximum(demand - cap, 0).sum())
+    via_cost = num_vias * cap_data['unit_via_cost']
+    return {
+        'overflow': overflow,
+        'total_cost': wirelength + via_cost,
+        'wirelength_cost': wirelength,
+        'via_cost': via_cost,
+        'num_vias': num_vias,
+        'wirelength': wirelength,
+        'demand': demand,
+    }
+
+
+def to_route_data(names: Sequence[str], pts: np.ndarray, count: np.ndarray):
+    """Paths in parse_route_file's format (segments as (x1, y1, z1, x2, y2, z2))."""
+    route_data = []
+    for name, p, n in zip(names, pts.tolist(), count.tolist()):
+        route_data.append({
+            'name': name,
+            'segments': [(a[1], a[2], a[0], b[1], b[2], b[0]) for a, b in zip(p[:n - 1], p[1:n])],
+        })
+    return route_data
+
+
+def write_route(path: Path, names: Sequence[str], pts: np.ndarray, count: np.ndarray) -> int:
+    """Write a .route file ("z1 x1 y1 z2 x2 y2" lines); returns the segment count."""
+    total = 0
+    with open(path, 'w') as fout:
+        for start in range(0, len(names), CHUNK_NETS):
+            p = pts[start:start + CHUNK_NETS]
+            nseg = np.maximum(count[start:start + CHUNK_NETS] - 1, 0)
+            valid = np.arange(p.shape[1] - 1) < nseg[:, None]
+            segs = np.concatenate([p[:, :-1], p[:, 1:]], axis=2)[valid]
+            lines = (("%d %d %d %d %d %d\n" * len(segs)) % tuple(segs.ravel().tolist())).splitlines(True)
+            ends = np.cumsum(nseg).tolist()
+            out, first = [], 0
+            for name, last in zip(names[start:start + CHUNK_NETS], ends):
+                out.append(f"{name}\n(\n")
+                out.extend(lines[first:last])
+                out.append(")\n")
+                first = last
+            fout.write("".join(out))
+            total += len(segs)
+    return total
+
+
+def main():
+    parser = argparse.ArgumentParser(description="L/Z pattern router producing a baseline .route file.")
+    parser.add_argument("cap_file", type=Path)
+    parser.add_argument("net_file", type=Path)
+    parser.add_argument("route_file", type=Path)
+    parser.add_argument("--iters", type=int, default=4, help="Negotiation rounds (0 = no rip-up).")
+    parser.add_argument("--z", type=int, default=3, help="Z-shape bend positions per direction (0 = L only).")
+    parser.add_argument("--weight", type=float, default=1000.0, help="Cost per unit of added overflow.")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--verify", action="store_true",
+                        help="Re-read the route and score it with pa3_evaluator.")
+    args = parser.parse_args()
+
+    for path in (args.cap_file, args.net_file):
+        if not path.exists():
+            parser.error(f"file not found: {path}")
+
+    t0 = time.perf_counter()
+    cap_data = pa3_evaluator.parse_cap_file(str(args.cap_file))
+    net_data = pa3_evaluator.parse_net_file(str(args.net_file))
+    t1 = time.perf_counter()
+    names, pts, count = route_patterns(cap_data, net_data, args.iters, args.z, args.weight, args.seed)
+    t2 = time.perf_counter()
+    result = evaluate_paths(cap_data, pts, count)
+    segments = write_route(args.route_file, names, pts, count)
+    t3 = time.perf_counter()
+
+    skipped = int((count == 0).sum())
+    print(f"Routed {len(names) - skipped} nets ({segments} segments) -> {args.route_file}")
+    if skipped:
+        print(f"  {skipped} net(s) without exactly two pins left unrouted")
+    print(f"  parse {t1 - t0:.2f}s, route {t2 - t1:.2f}s, score+write {t3 - t2:.2f}s")
+    pa3_evaluator.print_evaluation(result)
+
+    if args.verify:
+        route_data = pa3_evaluator.parse_route_file(str(args.route_file))
+        validity = pa3_evaluator.check_route_validity(cap_data, route_data)
+        connectivity = pa3_evaluator.check_connectivity(net_data, route_data)
+        reference = pa3_evaluator.evaluate_route(cap_data, route_data)
+        mismatched = [k for k in reference if reference[k] != result[k]]
+        print(f"Evaluator: valid={validity['all_valid']} connected={connectivity['all_connected']} "
+              f"overflow={reference['overflow']} cost={reference['total_cost']}")
+        if mismatched or not validity['all_valid'] or not connectivity['all_connected']:
+            print(f"Mismatch with pa3_evaluator: {', '.join(mismatched) or 'validity/connectivity'}")
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,214 @@
+#!/usr/bin/env python3
+"""
+Region statistics over a routed design in O(1) per query.
+
+Summed-area tables are built once per layer over capacity, demand and
+overflow (max(demand - capacity, 0) per GCell, as in evaluate_route), so the
+total of any rectangle is four lookups.  Physical segment lengths come from
+the evaluator's edge-length prefix sums.
+
+Usage:
+    python3 region_stats.py <cap_file> <route_file>
+    python3 region_stats.py case.cap case.route --region 10,10,40,40 --region 0,0,5,5
+    python3 region_stats.py case.cap case.route -k 16 --top 10 --layer 0
+
+Python:
+    stats = RegionStats.from_route(cap_data, route_data)
+    stats.region(10, 10, 40, 40)            # all layers
+    stats.region(10, 10, 40, 40, layers=[1])
+    stats.worst_windows(16, top=5)
+"""
+
+from __future__ import annotations
+
+import argparse
+import sys
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+import pa3_evaluator  # noqa: E402
+
+METRICS = ("capacity", "demand", "overflow")
+
+
+def summed_area(grid: np.ndarray) -> np.ndarray:
+    """(L, Y+1, X+1) table with sat[l, y, x] = grid[l, :y, :x].sum()."""
+    sat = np.zeros((grid.shape[0], grid.shape[1] + 1, grid.shape[2] + 1), dtype=np.int64)
+    np.cumsum(np.cumsum(grid, axis=1, dtype=np.int64), axis=2, out=sat[:, 1:, 1:])
+    return sat
+
+
+class RegionStats:
+    """Summed-area tables of capacity, demand and overflow for every layer."""
+
+    def __init__(self, cap_data, demand):
+        self.cap_data = cap_data
+        self.shape = (cap_data['nLayers'], cap_data['ySize'], cap_data['xSize'])
+        capacity = np.array([layer['capacities'] for layer in cap_data['layers']], dtype=np.int64)
+        demand = np.asarray(demand, dtype=np.int64).reshape(self.shape)
+        capacity = capacity.reshape(self.shape)
+        self.sat = {
+            'capacity': summed_area(capacity),
+            'demand': summed_area(demand),
+            'overflow': summed_area(np.maximum(demand - capacity, 0)),
+        }
+
+    @classmethod
+    def from_route(cls, cap_data, route_data) -> "RegionStats":
+        result = pa3_evaluator.evaluate_route(cap_data, route_data, keep_demand=True)
+        return cls(cap_data, result['demand'])
+
+    # ------------------------------------------------------------------
+    # Queries
+    # ------------------------------------------------------------------
+
+    def _clip(self, x0: int, y0: int, x1: int, y1: int):
+        _, y_size, x_size = self.shape
+        x0, x1 = max(min(x0, x1), 0), min(max(x0, x1), x_size - 1)
+        y0, y1 = max(min(y0, y1), 0), min(max(y0, y1), y_size - 1)
+        return x0, y0, x1, y1
+
+    def total(self, metric: str, x0: int, y0: int, x1: int, y1: int,
+              layers: Optional[Iterable[int]] = None) -> int:
+        """Sum of ``metric`` over the inclusive rectangle, all layers by default."""
+        x0, y0, x1, y1 = self._clip(x0, y0, x1, y1)
+        if x0 > x1 or y0 > y1:
+            return 0
+        sat = self.sat[metric]
+        if layers is not None:
+            sat = sat[list(layers)]
+        value = sat[:, y1 + 1, x1 + 1] - sat[:, y0, x1 + 1] - sat[:, y1 + 1, x0] + sat[:, y0, x0]
+        return int(value.sum())
+
+    def region(self, x0: int, y0: int, x1: int, y1: int,
+               layers: Optional[Iterable[int]] = None) -> Dict[str, float]:
+        """Capacity, demand, overflow and utilization of an inclusive rectangle."""
+        layers = None if layers is None else list(layers)
+        stats = {metric: self.total(metric, x0, y0, x1, y1, layers) for metric in METRICS}
+        if stats['capacity']:
+            stats['utilization'] = stats['demand'] / stats['capacity']
+        else:
+            stats['utilization'] = float('inf') if stats['demand'] else 0.0
+        return stats
+
+    def segment_length(self, x1: int, y1: int, z1: int, x2: int, y2: int, z2: int) -> int:
+        """Physical wirelength of one wire segment (0 for vias), as evaluate_route counts it."""
+        _, y_size, x_size = self.shape
+        if z1 != z2:
+            return 0
+        horizontal, vertical = pa3_evaluator.edge_length_prefix(self.cap_data)
+        if self.cap_data['layers'][z1]['direction'] == 'H':
+            if y1 != y2 or not 0 <= y1 < y_size:
+                return 0
+            lo, hi = max(min(x1, x2), 0), min(max(x1, x2), x_size)
+            return pa3_evaluator.segment_length(horizontal, lo, hi) if lo < hi else 0
+        if x1 != x2 or not 0 <= x1 < x_size:
+            return 0
+        lo, hi = max(min(y1, y2), 0), min(max(y1, y2), y_size)
+        return pa3_evaluator.segment_length(vertical, lo, hi) if lo < hi else 0
+
+    def window_size(self, k: int) -> int:
+        """Window edge actually used for k: clamped to the grid size; k must be at least 1."""
+        if k < 1:
+            raise ValueError(f"window size must be at least 1, got {k}")
+        _, y_size, x_size = self.shape
+        return min(k, x_size, y_size)
+
+    def window_totals(self, metric: str, k: int, layers: Optional[Iterable[int]] = None) -> np.ndarray:
+        """
+        (Y-k+1, X-k+1) totals of every k x k window; entry [y, x] has its corner at (x, y)
+
+        k is clamped to the grid size (see window_size).
+        """
+        k = self.window_size(k)
+        sat = self.sat[metric]
+        if layers is not None:
+            sat = sat[list(layers)]
+        sat = sat.sum(axis=0)
+        return sat[k:, k:] - sat[:-k, k:] - sat[k:, :-k] + sat[:-k, :-k]
+
+    def worst_windows(self, k: int, top: int = 1,
+                      layers: Optional[Iterable[int]] = None) -> List[Dict[str, float]]:
+        """
+        The ``top`` k x k windows with the most overflow
+
+        Ties are broken by demand.  Windows may overlap.  k is clamped to the
+        grid size.
+
+        Returns:
+            list of dicts with x0, y0, x1, y1 and the region() statistics
+        """
+        k = self.window_size(k)
+        layers = None if layers is None else list(layers)
+        overflow = self.window_totals('overflow', k, layers)
+        demand = self.window_totals('demand', k, layers)
+        flat = np.lexsort((-demand.ravel(), -overflow.ravel()))[:top]
+        windows = []
+        for y0, x0 in zip(*np.unravel_index(flat, overflow.shape)):
+            x0, y0 = int(x0), int(y0)
+            window = {'x0': x0, 'y0': y0, 'x1': x0 + k - 1, 'y1': y0 + k - 1}
+            window.update(self.region(x0, y0, x0 + k - 1, y0 + k - 1, layers))
+            windows.append(window)
+        return windows
+
+
+def print_region(label: str, stats: Dict[str, float]) -> None:
+    print(f"  {label:<28} capacity {stats['capacity']:>9}  demand {stats['demand']:>9}  "
+          f"overflow {stats['overflow']:>7}  utilization {stats['utilization']:.3f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Region and window congestion statistics.")
+    parser.add_argument("cap_file", type=Path)
+    parser.add_argument("route_file", type=Path)
+    parser.add_argument("--region", action="append", default=[], metavar="X0,Y0,X1,Y1",
+                        help="Report an inclusive rectangle (repeatable).")
+    parser.add_argument("-k", type=int, default=8, help="Window size for the worst-window search.")
+    parser.add_argument("--top", type=int, default=5, help="Worst windows to print (0 = none).")
+    parser.add_argument("--layer", type=int, action="append", default=None,
+                        help="Restrict to a layer (repeatable; default all layers).")
+    args = parser.parse_args()
+
+    for path in (args.cap_file, args.route_file):
+        if not path.exists():
+            parser.error(f"file not found: {path}")
+    if args.k < 1:
+        parser.error("-k must be at least 1")
+    regions = []
+    for text in args.region:
+        parts = text.split(',')
+        if len(parts) != 4:
+            parser.error(f"--region expects X0,Y0,X1,Y1, got '{text}'")
+        try:
+            regions.append([int(p) for p in parts])
+        except ValueError:
+            parser.error(f"--region expects integers, got '{text}'")
+
+    cap_data = pa3_evaluator.parse_cap_file(str(args.cap_file))
+    for layer in args.layer or ():
+        if not 0 <= layer < cap_data['nLayers']:
+            parser.error(f"--layer must be in 0..{cap_data['nLayers'] - 1}, got {layer}")
+    route_data = pa3_evaluator.parse_route_file(str(args.route_file))
+    stats = RegionStats.from_route(cap_data, route_data)
+
+    x_size, y_size = cap_data['xSize'], cap_data['ySize']
+    layers = args.layer
+    print("=== Region Statistics ===")
+    print_region(f"design ({x_size} x {y_size})", stats.region(0, 0, x_size - 1, y_size - 1, layers))
+    for x0, y0, x1, y1 in regions:
+        print_region(f"x {x0}..{x1}, y {y0}..{y1}", stats.region(x0, y0, x1, y1, layers))
+
+    if args.top:
+        windows = stats.worst_windows(args.k, args.top, layers)
+        k = stats.window_size(args.k)
+        print(f"\nWorst {len(windows)} window(s) of {k} x {k} by overflow:")
+        for w in windows:
+            print_region(f"x {w['x0']}..{w['x1']}, y {w['y0']}..{w['y1']}", w)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
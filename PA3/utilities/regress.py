@@ -0,0 +1,357 @@
+#!/usr/bin/env python3
+"""
+Regression runner for the PA3 global router.
+
+Builds the router, runs it on every inputs/case*.cap/.net pair with bounded
+parallelism and a per-case timeout, evaluates each .route in-process with
+pa3_evaluator, appends the run to a leaderboard JSON and compares it with a
+stored baseline.
+
+Usage:
+    python3 utilities/regress.py                      # build, run all cases, compare
+    python3 utilities/regress.py --jobs 3 --timeout 600 --cases case1 case4
+    python3 utilities/regress.py --update-baseline    # accept this run as the baseline
+    python3 utilities/regress.py --no-build --bin /path/to/router
+
+Exit status is 1 when any case fails, produces an invalid/disconnected route,
+or regresses against the baseline (overflow or total cost increase, runtime or
+peak memory beyond the tolerances).
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import shlex
+import socket
+import subprocess
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from dataclasses import asdict, dataclass, field
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Dict, List, Optional
+
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+import pa3_evaluator  # noqa: E402
+
+PA3_ROOT = Path(__file__).resolve().parent.parent
+DEFAULT_BIN = "bin/cb"
+FALLBACK_BUILD = "mkdir -p bin && g++ -std=c++17 -O2 -o {bin} src/*.cpp"
+
+# Metrics where any increase is a regression.
+QUALITY_METRICS = ["overflow", "total_cost"]
+
+
+@dataclass
+class CaseResult:
+    case: str
+    status: str = "ok"  # ok | failed | timeout | no_route | invalid | eval_error
+    returncode: Optional[int] = None
+    runtime_s: Optional[float] = None
+    cpu_s: Optional[float] = None
+    peak_rss_kb: Optional[int] = None
+    overflow: Optional[int] = None
+    total_cost: Optional[int] = None
+    wirelength: Optional[int] = None
+    num_vias: Optional[int] = None
+    invalid_nets: int = 0
+    disconnected_nets: int = 0
+    notes: List[str] = field(default_factory=list)
+
+
+def discover_cases(inputs: Path, names: Optional[List[str]]) -> List[str]:
+    cases = sorted(
+        (p.stem for p in inputs.glob("*.cap") if (inputs / f"{p.stem}.net").exists()),
+        key=lambda name: (len(name), name),
+    )
+    if names:
+        missing = sorted(set(names) - set(cases))
+        if missing:
+            raise SystemExit(f"unknown case(s): {', '.join(missing)}")
+        cases = [c for c in cases if c in names]
+    return cases
+
+
+def current_commit(cwd: Path) -> Optional[str]:
+    try:
+        out = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=cwd, capture_output=True, text=True, check=True,
+        )
+    except (OSError, subprocess.CalledProcessError):
+        return None
+    return out.stdout.strip() or None
+
+
+def build(root: Path, binary: Path, build_cmd: Optional[str]) -> None:
+    """Build the router: --build-cmd, else `make` if the makefile has rules, else g++."""
+    if build_cmd is None:
+        makefile = root / "makefile"
+        if makefile.exists() and makefile.read_text().strip():
+            build_cmd = "make"
+        else:
+            build_cmd = FALLBACK_BUILD.format(bin=shlex.quote(str(binary)))
+    print(f"Building: {build_cmd}", file=sys.stderr)
+    subprocess.run(build_cmd, shell=True, cwd=root, check=True)
+    if not binary.exists():
+        raise SystemExit(f"build finished but {binary} does not exist")
+
+
+# Started with `python3 -S -c EXEC_HELPER <fd> <cmd...>`: forks and execs the
+# router, waits for it and writes its rusage to <fd>, then exits with its
+# status.  A child's ru_maxrss includes the memory image it was forked from,
+# so the router must be forked from this small interpreter, not from the
+# regress.py process (which grows as routes are parsed).
+EXEC_HELPER = """
+import os, signal, sys
+fd = int(sys.argv[1])
+pid = os.fork()
+if pid == 0:
+    os.close(fd)
+    try:
+        os.execvp(sys.argv[2], sys.argv[2:])
+    except OSError as exc:
+        os.write(2, f"exec failed: {exc}\\n".encode())
+    os._exit(127)
+_, status, usage = os.wait4(pid, 0)
+os.write(fd, f"{usage.ru_maxrss} {usage.ru_utime + usage.ru_stime}".encode())
+os.close(fd)
+if os.WIFSIGNALED(status):
+    signal.signal(os.WTERMSIG(status), signal.SIG_DFL)
+    os.kill(os.getpid(), os.WTERMSIG(status))
+os._exit(os.waitstatus_to_exitcode(status))
+"""
+
+
+def run_router(binary: Path, inputs: Path, work: Path, case: str, timeout: float) -> CaseResult:
+    """Run one case; peak RSS and CPU time are the router's rusage, reported by EXEC_HELPER."""
+    result = CaseResult(case)
+    route = work / f"{case}.route"
+    route.unlink(missing_ok=True)
+    cmd = [
+        str(binary),
+        "--cap", str(inputs / f"{case}.cap"),
+        "--net", str(inputs / f"{case}.net"),
+        "--out", str(route),
+    ]
+    timed_out = threading.Event()
+    read_fd, write_fd = os.pipe()
+    with open(work / f"{case}.log", "wb") as log:
+        start = time.perf_counter()
+        try:
+            proc = subprocess.Popen(
+                [sys.executable, "-S", "-c", EXEC_HELPER, str(write_fd)] + cmd,
+                stdout=log, stderr=subprocess.STDOUT, pass_fds=(write_fd,), start_new_session=True,
+            )
+        except OSError:
+            os.close(read_fd)
+            raise
+        finally:
+            os.close(write_fd)
+
+        def kill():
+            timed_out.set()
+            # The helper and the router share a new session; kill both
+            try:
+                os.killpg(proc.pid, 9)
+            except ProcessLookupError:
+                pass
+
+        timer = threading.Timer(timeout, kill)
+        timer.start()
+        try:
+            with os.fdopen(read_fd, "rb") as report:
+                usage = report.read().split()
+            result.returncode = proc.wait()
+        finally:
+            timer.cancel()
+        result.runtime_s = time.perf_counter() - start
+    if len(usage) == 2:
+        result.peak_rss_kb = int(usage[0])
+        result.cpu_s = float(usage[1])
+    if timed_out.is_set():
+        result.status = "timeout"
+    elif result.returncode != 0:
+        result.status = "failed"
+    elif not route.exists():
+        result.status = "no_route"
+    return result
+
+
+def evaluate(result: CaseResult, inputs: Path, work: Path) -> CaseResult:
+    """Score a finished case with the evaluator, in this process."""
+    if result.status != "ok":
+        return result
+    case = result.case
+    try:
+        cap_data = pa3_evaluator.parse_cap_file(str(inputs / f"{case}.cap"))
+        net_data = pa3_evaluator.parse_net_file(str(inputs / f"{case}.net"))
+        route_data = pa3_evaluator.parse_route_file(str(work / f"{case}.route"))
+        validity = pa3_evaluator.check_route_validity(cap_data, route_data)
+        connectivity = pa3_evaluator.check_connectivity(net_data, route_data)
+        metrics = pa3_evaluator.evaluate_route(cap_data, route_data)
+    except Exception as exc:  # a malformed .route must not abort the other cases
+        result.status = "eval_error"
+        result.notes.append(f"{type(exc).__name__}: {exc}")
+        return result
+    result.invalid_nets = len(validity["invalid_nets"])
+    result.disconnected_nets = len(connectivity["disconnected_nets"])
+    for key in ("overflow", "total_cost", "wirelength", "num_vias"):
+        setattr(result, key, metrics[key])
+    if result.invalid_nets or result.disconnected_nets:
+        result.status = "invalid"
+    return result
+
+
+def run_all(args, binary: Path, cases: List[str]) -> Dict[str, CaseResult]:
+    """Route with up to --jobs concurrent routers; evaluate each case as it finishes."""
+    results = {}
+    with ThreadPoolExecutor(max_workers=max(1, args.jobs)) as pool:
+        futures = [
+            pool.submit(run_router, binary, args.inputs, args.work_dir, case, args.timeout)
+            for case in cases
+        ]
+        for future in as_completed(futures):
+            result = evaluate(future.result(), args.inputs, args.work_dir)
+            results[result.case] = result
+            print(
+                f"  {result.case:<8} {result.status:<10} {result.runtime_s:8.2f}s "
+                f"{(result.peak_rss_kb or 0) / 1024:8.1f} MB  overflow={result.overflow} "
+                f"cost={result.total_cost}",
+                file=sys.stderr,
+            )
+    return {case: results[case] for case in cases}
+
+
+def compare(results: Dict[str, CaseResult], baseline: Dict, time_tol: float, mem_tol: float,
+            min_time: float) -> List[str]:
+    """Regressions of this run against a baseline leaderboard entry."""
+    problems = []
+    for case, res in results.items():
+        if res.status != "ok":
+            problems.append(f"{case}: {res.status} {'; '.join(res.notes)}".rstrip())
+            continue
+        base = baseline.get("cases", {}).get(case)
+        if base is None or base.get("status") != "ok":
+            continue
+        for key in QUALITY_METRICS:
+            if getattr(res, key) > base[key]:
+                problems.append(f"{case}: {key} {base[key]} -> {getattr(res, key)}")
+        if res.runtime_s > base["runtime_s"] * (1 + time_tol) + min_time:
+            problems.append(f"{case}: runtime {base['runtime_s']:.2f}s -> {res.runtime_s:.2f}s")
+        if res.peak_rss_kb > base["peak_rss_kb"] * (1 + mem_tol):
+            problems.append(f"{case}: peak memory {base['peak_rss_kb']} KB -> {res.peak_rss_kb} KB")
+    return problems
+
+
+def make_entry(results: Dict[str, CaseResult], commit: Optional[str], label: Optional[str]) -> Dict:
+    ok = [r for r in results.values() if r.status == "ok"]
+    return {
+        "label": label or commit,
+        "commit": commit,
+        "host": socket.gethostname(),
+        "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "failed": len(results) - len(ok),
+        "overflow": sum(r.overflow for r in ok),
+        "total_cost": sum(r.total_cost for r in ok),
+        "runtime_s": sum(r.runtime_s for r in ok),
+        "cases": {case: asdict(r) for case, r in results.items()},
+    }
+
+
+def rank_key(entry: Dict):
+    return (entry["failed"], entry["overflow"], entry["total_cost"], entry["runtime_s"])
+
+
+def update_leaderboard(path: Path, entry: Dict) -> int:
+    """Append ``entry``, keep the board ranked, and return its 1-based rank."""
+    board = json.loads(path.read_text()) if path.exists() else []
+    board.append(entry)
+    board.sort(key=rank_key)
+    path.write_text(json.dumps(board, indent=2) + "\n")
+    return next(i for i, e in enumerate(board, 1) if e is entry)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run and score the PA3 router on every case.")
+    parser.add_argument("--root", type=Path, default=PA3_ROOT, help="PA3 directory (with src/, inputs/).")
+    parser.add_argument("--bin", type=Path, default=None, help=f"Router binary (default <root>/{DEFAULT_BIN}).")
+    parser.add_argument("--build-cmd", default=None,
+                        help="Shell command run in --root to build (default: make, or g++ if the makefile is empty).")
+    parser.add_argument("--no-build", action="store_true", help="Use the existing binary.")
+    parser.add_argument("--inputs", type=Path, default=None, help="Case directory (default <root>/inputs).")
+    parser.add_argument("--cases", nargs="+", default=None, help="Subset of cases, e.g. case1 case4.")
+    parser.add_argument("--jobs", type=int, default=os.cpu_count() or 1, help="Concurrent router runs.")
+    parser.add_argument("--timeout", type=float, default=3600.0, help="Per-case timeout in seconds.")
+    parser.add_argument("--work-dir", type=Path, default=None,
+                        help="Routes, logs and leaderboard (default <root>/regress).")
+    parser.add_argument("--baseline", type=Path, default=None,
+                        help="Baseline JSON (default <work-dir>/baseline.json).")
+    parser.add_argument("--update-baseline", action="store_true", help="Store this run as the baseline.")
+    parser.add_argument("--label", default=None, help="Leaderboard label (default: git commit).")
+    parser.add_argument("--time-tol", type=float, default=0.25, help="Allowed relative runtime increase.")
+    parser.add_argument("--min-time", type=float, default=0.5,
+                        help="Runtime slack in seconds before the relative tolerance applies.")
+    parser.add_argument("--mem-tol", type=float, default=0.10, help="Allowed relative peak memory increase.")
+    args = parser.parse_args()
+
+    root = args.root.resolve()
+    binary = (args.bin or root / DEFAULT_BIN).resolve()
+    args.inputs = (args.inputs or root / "inputs").resolve()
+    args.work_dir = (args.work_dir or root / "regress").resolve()
+    args.work_dir.mkdir(parents=True, exist_ok=True)
+    baseline_path = args.baseline or args.work_dir / "baseline.json"
+
+    cases = discover_cases(args.inputs, args.cases)
+    if not cases:
+        parser.error(f"no case*.cap/.net pairs in {args.inputs}")
+    if not args.no_build:
+        build(root, binary, args.build_cmd)
+    elif not binary.exists():
+        parser.error(f"binary not found: {binary}")
+
+    print(f"Running {len(cases)} case(s) with {args.jobs} job(s)", file=sys.stderr)
+    results = run_all(args, binary, cases)
+    entry = make_entry(results, current_commit(root), args.label)
+    rank = update_leaderboard(args.work_dir / "leaderboard.json", entry)
+
+    print(f"\n{'case':<8} {'status':<10} {'time(s)':>8} {'mem(MB)':>8} {'overflow':>10} {'cost':>12}")
+    for r in results.values():
+        print(
+            f"{r.case:<8} {r.status:<10} {r.runtime_s:8.2f} {(r.peak_rss_kb or 0) / 1024:8.1f} "
+            f"{r.overflow if r.overflow is not None else '-':>10} "
+            f"{r.total_cost if r.total_cost is not None else '-':>12}"
+        )
+    print(f"Passing cases: total overflow {entry['overflow']}, total cost {entry['total_cost']}; "
+          f"{entry['failed']} failed, leaderboard rank {rank}")
+
+    problems = []
+    if baseline_path.exists():
+        problems = compare(results, json.loads(baseline_path.read_text()),
+                           args.time_tol, args.mem_tol, args.min_time)
+    else:
+        problems = [f"{r.case}: {r.status}" for r in results.values() if r.status != "ok"]
+        print(f"No baseline at {baseline_path}; run with --update-baseline to create one.")
+
+    if args.update_baseline:
+        if entry["failed"]:
+            print("Not updating the baseline: some cases did not pass.")
+        else:
+            baseline_path.write_text(json.dumps(entry, indent=2) + "\n")
+            print(f"Baseline written to {baseline_path}")
+            return 0
+    if problems:
+        print("\nREGRESSION:")
+        for problem in problems:
+            print(f"  {problem}")
+        return 1
+    print("No regressions.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
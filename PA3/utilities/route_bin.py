@@ -0,0 +1,344 @@
+#!/usr/bin/env python3
+"""
+Compact binary .route format.
+
+Layout (little-endian):
+
+    header      magic "PA3RTBIN", version, encoding, index width (4 or 8 bytes),
+                net count, segment count, name-table bytes, segment-data bytes
+    seg_index   uint[nets + 1]  first segment of each net (cumulative)
+    data_index  uint[nets + 1]  byte offset of each net in the segment data
+    names       UTF-8 names in net order, each followed by "\\n"
+    (zero padding to a multiple of 8)
+    data        segments, one of:
+                  int32   6 x int32 per segment: z1 x1 y1 z2 x2 y2 (mmap-able as is)
+                  varint  zigzag LEB128 deltas: the first endpoint relative to the
+                          previous segment's second endpoint (the origin for a
+                          net's first segment), the second relative to the first
+
+Usage:
+    python3 route_bin.py encode case.route case.rbin [--varint]
+    python3 route_bin.py decode case.rbin case.route
+    python3 route_bin.py info case.rbin
+
+pa3_evaluator.parse_route_file and export_plotly read binary files directly,
+detected by the magic bytes.
+"""
+
+from __future__ import annotations
+
+import argparse
+import gc
+import mmap
+import struct
+import sys
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Iterator, List, Sequence, Tuple
+
+import numpy as np
+
+MAGIC = b"PA3RTBIN"
+VERSION = 1
+ENCODINGS = {"int32": 0, "varint": 1}
+HEADER = struct.Struct("<8sHHIQQQQ")
+CHUNK_NETS = 1 << 16
+
+
+@dataclass
+class BinaryRoute:
+    """Nets of a route file: net i owns segments[seg_index[i]:seg_index[i + 1]].
+
+    ``segments`` is an (S, 6) int32 array in file column order
+    (z1, x1, y1, z2, x2, y2); for the int32 encoding it is a view of the
+    memory-mapped file.
+    """
+
+    names: List[str]
+    seg_index: np.ndarray
+    segments: np.ndarray
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+    def net(self, i: int) -> np.ndarray:
+        return self.segments[self.seg_index[i]:self.seg_index[i + 1]]
+
+
+def is_route_bin(path) -> bool:
+    with open(path, "rb") as fin:
+        return fin.read(len(MAGIC)) == MAGIC
+
+
+# ============================================================================
+# TEXT FORMAT
+# ============================================================================
+
+def read_route_text(path) -> BinaryRoute:
+    """Parse a text .route with the same block rules as parse_route_file."""
+    names: List[str] = []
+    counts: List[int] = []
+    seg_lines: List[bytes] = []
+    state = "outside"
+    with open(path, "rb") as fin, paused_gc():
+        for raw in fin:
+            line = raw.strip()
+            if state == "open":
+                if line == b"(":
+                    state = "inside"
+                    continue
+                state = "outside"
+            if state == "inside":
+                if line == b")":
+                    state = "outside"
+                elif line and len(line.split()) == 6:
+                    seg_lines.append(line)
+                    counts[-1] += 1
+            elif line and not line.startswith(b"(") and line != b")":
+                names.append(line.decode())
+                counts.append(0)
+                state = "open"
+    values = np.zeros(0, dtype=np.int64)
+    if seg_lines:
+        try:
+            values = np.fromstring(b" ".join(seg_lines), dtype=np.int64, sep=" ")
+        except ValueError:
+            # NumPy 2 raises on a bad token; older versions stop short (below)
+            raise ValueError(f"{path}: non-integer segment coordinates") from None
+    if values.size != 6 * len(seg_lines):
+        raise ValueError(f"{path}: non-integer segment coordinates")
+    seg_index = np.zeros(len(names) + 1, dtype=np.int64)
+    np.cumsum(counts, out=seg_index[1:])
+    return BinaryRoute(names, seg_index, to_int32(values.reshape(-1, 6)))
+
+
+def write_route_text(path, route: BinaryRoute) -> None:
+    with open(path, "w") as fout:
+        for start in range(0, len(route), CHUNK_NETS):
+            stop = min(start + CHUNK_NETS, len(route))
+            first, last = int(route.seg_index[start]), int(route.seg_index[stop])
+            segs = route.segments[first:last]
+            lines = (("%d %d %d %d %d %d\n" * len(segs)) % tuple(segs.ravel().tolist())).splitlines(True)
+            bounds = (route.seg_index[start:stop + 1] - first).tolist()
+            out = []
+            for k, name in enumerate(route.names[start:stop]):
+                out.append(f"{name}\n(\n")
+                out.extend(lines[bounds[k]:bounds[k + 1]])
+                out.append(")\n")
+            fout.write("".join(out))
+
+
+def to_int32(segments: np.ndarray) -> np.ndarray:
+    info = np.iinfo(np.int32)
+    if segments.size and (segments.min() < info.min or segments.max() > info.max):
+        raise ValueError("segment coordinates do not fit in int32")
+    return np.ascontiguousarray(segments, dtype=np.int32)
+
+
+# ============================================================================
+# VARINT DELTA CODING
+# ============================================================================
+
+def delta_encode(seg_index: np.ndarray, segments: np.ndarray) -> np.ndarray:
+    """(S, 6) deltas: first endpoint vs previous second endpoint, second vs first."""
+    p1 = segments[:, :3].astype(np.int64)
+    p2 = segments[:, 3:].astype(np.int64)
+    prev = np.zeros_like(p2)
+    prev[1:] = p2[:-1]
+    starts = seg_index[:-1][np.diff(seg_index) > 0]
+    prev[starts] = 0
+    return np.concatenate([p1 - prev, p2 - p1], axis=1)
+
+
+def delta_decode(seg_index: np.ndarray, deltas: np.ndarray) -> np.ndarray:
+    d1, d2 = deltas[:, :3], deltas[:, 3:]
+    # p2[k] = p2[k - 1] + d1[k] + d2[k], restarting from the origin at each net
+    running = np.zeros((len(deltas) + 1, 3), dtype=np.int64)
+    np.cumsum(d1 + d2, axis=0, out=running[1:])
+    counts = np.diff(seg_index)
+    p2 = running[1:] - np.repeat(running[seg_index[:-1]], counts, axis=0)
+    return np.concatenate([p2 - d2, p2], axis=1)
+
+
+def varint_encode(values: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Zigzag LEB128 bytes of int64 ``values`` and the byte length of each."""
+    zz = ((values << 1) ^ (values >> 63)).astype(np.uint64)
+    nbytes = np.ones(len(zz), dtype=np.int64)
+    rest = zz >> np.uint64(7)
+    while rest.any():
+        nbytes += rest > 0
+        rest >>= np.uint64(7)
+    out = np.empty(int(nbytes.sum()), dtype=np.uint8)
+    pos = np.cumsum(nbytes) - nbytes
+    for k in range(int(nbytes.max(initial=0))):
+        sel = nbytes > k
+        byte = (zz[sel] >> np.uint64(7 * k)) & np.uint64(0x7F)
+        byte |= np.where(nbytes[sel] > k + 1, np.uint64(0x80), np.uint64(0))
+        out[pos[sel] + k] = byte
+    return out, nbytes
+
+
+def varint_decode(data: np.ndarray, count: int) -> np.ndarray:
+    ends = np.flatnonzero(data < 0x80)
+    if len(ends) != count:
+        raise ValueError(f"varint stream holds {len(ends)} values, expected {count}")
+    if not count:
+        return np.zeros(0, dtype=np.int64)
+    starts = np.concatenate([[0], ends[:-1] + 1])
+    shift = (np.arange(len(data)) - np.repeat(starts, ends - starts + 1)) * 7
+    zz = np.add.reduceat((data & 0x7F).astype(np.uint64) << shift.astype(np.uint64), starts)
+    return ((zz >> np.uint64(1)).astype(np.int64)) ^ -((zz & np.uint64(1)).astype(np.int64))
+
+
+# ============================================================================
+# BINARY FORMAT
+# ============================================================================
+
+def write_route_bin(path, route: BinaryRoute, encoding: str = "int32") -> int:
+    """Write ``route`` in the binary format; returns the file size."""
+    n = len(route)
+    seg_index = np.asarray(route.seg_index, dtype=np.uint64)
+    blob = "".join(name + "\n" for name in route.names).encode()
+
+    if encoding == "int32":
+        data = to_int32(route.segments).tobytes()
+        data_index = seg_index * np.uint64(24)
+    elif encoding == "varint":
+        encoded, nbytes = varint_encode(delta_encode(route.seg_index, route.segments).ravel())
+        data = encoded.tobytes()
+        value_bytes = np.zeros(len(nbytes) + 1, dtype=np.uint64)
+        np.cumsum(nbytes, out=value_bytes[1:])
+        data_index = value_bytes[seg_index * np.uint64(6)]
+    else:
+        raise ValueError(f"unknown encoding '{encoding}'")
+
+    width = 4 if int(data_index[-1]) < 1 << 32 else 8
+    header = HEADER.pack(
+        MAGIC, VERSION, ENCODINGS[encoding], width, n, len(route.segments), len(blob), len(data)
+    )
+    with open(path, "wb") as fout:
+        fout.write(header)
+        for index in (seg_index, data_index):
+            fout.write(index.astype(f"<u{width}").tobytes())
+        fout.write(blob)
+        fout.write(b"\0" * (-fout.tell() % 8))
+        fout.write(data)
+        return fout.tell()
+
+
+def read_route_bin(path) -> BinaryRoute:
+    """Memory-map a binary route file (int32 segments are not copied)."""
+    with open(path, "rb") as fin:
+        mm = mmap.mmap(fin.fileno(), 0, access=mmap.ACCESS_READ)
+    magic, version, encoding, width, n, num_segments, name_size, data_size = HEADER.unpack_from(mm, 0)
+    if magic != MAGIC:
+        raise ValueError(f"{path}: not a binary route file")
+    if version != VERSION:
+        raise ValueError(f"{path}: unsupported binary route version {version}")
+    pos = HEADER.size
+    seg_index = np.frombuffer(mm, dtype=f"<u{width}", count=n + 1, offset=pos).astype(np.int64)
+    pos += 2 * width * (n + 1)
+    names = mm[pos:pos + name_size].decode().split("\n")[:-1]
+    pos += name_size
+    pos += -pos % 8
+    if encoding == ENCODINGS["int32"]:
+        segments = np.frombuffer(mm, dtype="<i4", count=6 * num_segments, offset=pos).reshape(-1, 6)
+    elif encoding == ENCODINGS["varint"]:
+        data = np.frombuffer(mm, dtype=np.uint8, count=data_size, offset=pos)
+        deltas = varint_decode(data, 6 * num_segments).reshape(-1, 6)
+        segments = to_int32(delta_decode(seg_index, deltas))
+    else:
+        raise ValueError(f"{path}: unknown segment encoding {encoding}")
+    if len(names) != n or seg_index[-1] != num_segments:
+        raise ValueError(f"{path}: corrupt binary route file")
+    return BinaryRoute(names, seg_index, segments)
+
+
+def read_route(path) -> BinaryRoute:
+    """Read a route file in either format."""
+    return read_route_bin(path) if is_route_bin(path) else read_route_text(path)
+
+
+# ============================================================================
+# ADAPTERS
+# ============================================================================
+
+@contextmanager
+def paused_gc():
+    """Pause the cyclic GC while building millions of small containers.
+
+    Otherwise every few thousand allocations trigger a collection that
+    rescans everything built so far.
+    """
+    was_enabled = gc.isenabled()
+    gc.disable()
+    try:
+        yield
+    finally:
+        if was_enabled:
+            gc.enable()
+
+
+def to_route_data(route: BinaryRoute):
+    """parse_route_file's format: segments as (x1, y1, z1, x2, y2, z2)."""
+    with paused_gc():
+        segs = list(map(tuple, route.segments[:, [1, 2, 0, 4, 5, 3]].tolist()))
+        bounds = route.seg_index.tolist()
+        return [
+            {'name': name, 'segments': segs[bounds[i]:bounds[i + 1]]}
+            for i, name in enumerate(route.names)
+        ]
+
+
+def iter_plotly_nets(route: BinaryRoute) -> Iterator[dict]:
+    """export_plotly's format: segments as ((z, x, y), (z, x, y))."""
+    bounds = route.seg_index.tolist()
+    for start in range(0, len(route), CHUNK_NETS):
+        stop = min(start + CHUNK_NETS, len(route))
+        base = bounds[start]
+        with paused_gc():
+            segs = [((s[0], s[1], s[2]), (s[3], s[4], s[5]))
+                    for s in route.segments[base:bounds[stop]].tolist()]
+            batch = [
+                {"name": route.names[i], "segments": segs[bounds[i] - base:bounds[i + 1] - base]}
+                for i in range(start, stop)
+            ]
+        yield from batch
+
+
+def main(argv: Sequence[str] | None = None):
+    parser = argparse.ArgumentParser(description="Convert .route files to and from the binary format.")
+    sub = parser.add_subparsers(dest="cmd", required=True)
+    enc = sub.add_parser("encode", help="Text (or binary) route -> binary.")
+    enc.add_argument("src", type=Path)
+    enc.add_argument("dst", type=Path)
+    enc.add_argument("--varint", action="store_true", help="Delta/varint segments (smaller, not mmap-able).")
+    dec = sub.add_parser("decode", help="Binary (or text) route -> text.")
+    dec.add_argument("src", type=Path)
+    dec.add_argument("dst", type=Path)
+    info = sub.add_parser("info", help="Print the header of a route file.")
+    info.add_argument("src", type=Path)
+    args = parser.parse_args(argv)
+
+    if not args.src.exists():
+        parser.error(f"file not found: {args.src}")
+    start = time.perf_counter()
+    route = read_route(args.src)
+    loaded = time.perf_counter()
+    if args.cmd == "encode":
+        size = write_route_bin(args.dst, route, "varint" if args.varint else "int32")
+        print(f"{args.src} ({args.src.stat().st_size} bytes) -> {args.dst} ({size} bytes)")
+    elif args.cmd == "decode":
+        write_route_text(args.dst, route)
+        print(f"{args.src} -> {args.dst} ({args.dst.stat().st_size} bytes)")
+    else:
+        kind = "binary" if is_route_bin(args.src) else "text"
+        print(f"{args.src}: {kind}, {len(route)} nets, {len(route.segments)} segments")
+    print(f"  read {loaded - start:.2f}s, total {time.perf_counter() - start:.2f}s")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,256 @@
+#!/usr/bin/env python3
+"""
+Per-net diff of two PA3 .route files.
+
+Nets are aligned by name (the k-th net of a name in one file matches the k-th
+of that name in the other) and compared by a hash of their segments.
+Unchanged nets are evaluated once and form a shared baseline demand grid;
+only changed, added and removed nets are evaluated on top of it.
+
+Usage:
+    python3 route_diff.py <cap_file> <old_route> <new_route>
+    python3 route_diff.py case.cap old.route new.route --csv diff.csv --top 50
+    python3 route_diff.py case.cap old.route new.route --check   # compare with evaluate_route
+
+Overflow impact is attributed sequentially: starting from the old routing,
+each differing net is swapped to its new version in turn (changed nets in
+new-file order, then added, then removed) and is charged the overflow change
+of that swap.  The per-net overflow deltas therefore add up exactly to the
+difference of the evaluate_route totals; an individual net's share depends
+on that order when several differing nets share a congested GCell.
+"""
+
+from __future__ import annotations
+
+import argparse
+import csv
+import hashlib
+import sys
+from array import array
+from itertools import chain
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+import pa3_evaluator  # noqa: E402
+
+DIFF_COLUMNS = [
+    "name", "status", "wirelength_old", "wirelength_new", "d_wirelength",
+    "vias_old", "vias_new", "d_vias", "d_overflow", "d_cost",
+]
+
+
+def net_keys(route_data):
+    """(name, occurrence) per net, so repeated names still align one-to-one."""
+    seen = {}
+    keys = []
+    for net in route_data:
+        k = seen.get(net['name'], 0)
+        seen[net['name']] = k + 1
+        keys.append((net['name'], k))
+    return keys
+
+
+def net_hash(segments):
+    """Content hash of a net's segments (order-sensitive, like the evaluator)."""
+    return hashlib.blake2b(array('q', chain.from_iterable(segments)).tobytes(), digest_size=16).digest()
+
+
+def overflow_of(demand, capacity):
+    return demand - capacity if demand > capacity else 0
+
+
+def apply_net(demand, capacities, remove, add):
+    """Swap one net's GCells in ``demand``; returns the resulting overflow change."""
+    delta = 0
+    for layer, y, x in remove - add:
+        cap = capacities[layer][y][x]
+        before = demand[layer][y][x]
+        demand[layer][y][x] = before - 1
+        delta += overflow_of(before - 1, cap) - overflow_of(before, cap)
+    for layer, y, x in add - remove:
+        cap = capacities[layer][y][x]
+        before = demand[layer][y][x]
+        demand[layer][y][x] = before + 1
+        delta += overflow_of(before + 1, cap) - overflow_of(before, cap)
+    return delta
+
+
+def evaluate_entry(cap_data, route_data, index):
+    """evaluate_net for route_data[index]; an absent net uses nothing."""
+    if index is None:
+        return set(), 0, 0
+    return pa3_evaluator.evaluate_net(cap_data, route_data[index]['segments'])
+
+
+def diff_routes(cap_data, old_route, new_route):
+    """
+    Diff two routings of the same design
+
+    Args:
+        cap_data: capacity data from parse_cap_file
+        old_route, new_route: route data from parse_route_file
+
+    Returns:
+        dict with keys:
+            - rows: one dict per differing net (keys DIFF_COLUMNS)
+            - old, new: evaluate_route-style totals of both routings
+            - delta: new minus old for overflow, total_cost, wirelength, num_vias
+            - counts: number of unchanged/changed/added/removed nets
+    """
+    xSize = cap_data['xSize']
+    ySize = cap_data['ySize']
+    unit_via_cost = cap_data['unit_via_cost']
+    capacities = [layer['capacities'] for layer in cap_data['layers']]
+
+    old_keys = net_keys(old_route)
+    new_keys = net_keys(new_route)
+    old_index = {key: i for i, key in enumerate(old_keys)}
+    new_index = {key: i for i, key in enumerate(new_keys)}
+
+    # Shared baseline: every net whose segments are identical in both files
+    demand = [[[0] * xSize for _ in range(ySize)] for _ in range(cap_data['nLayers'])]
+    base_wirelength = 0
+    base_vias = 0
+    changed = []
+    added = []
+    for j, key in enumerate(new_keys):
+        i = old_index.get(key)
+        segments = new_route[j]['segments']
+        if i is None:
+            added.append((key, None, j))
+        elif net_hash(old_route[i]['segments']) == net_hash(segments):
+            gcells, wirelength, vias = pa3_evaluator.evaluate_net(cap_data, segments)
+            for layer, y, x in gcells:
+                demand[layer][y][x] += 1
+            base_wirelength += wirelength
+            base_vias += vias
+        else:
+            changed.append((key, i, j))
+    removed = [(key, i, None) for i, key in enumerate(old_keys) if key not in new_index]
+
+    # Old routing = baseline + old versions of the differing nets
+    entries = []
+    old_wirelength = base_wirelength
+    old_vias = base_vias
+    for status, group in (("changed", changed), ("added", added), ("removed", removed)):
+        for key, i, j in group:
+            old_eval = evaluate_entry(cap_data, old_route, i)
+            new_eval = evaluate_entry(cap_data, new_route, j)
+            for layer, y, x in old_eval[0]:
+                demand[layer][y][x] += 1
+            old_wirelength += old_eval[1]
+            old_vias += old_eval[2]
+            entries.append((key, status, old_eval, new_eval))
+
+    old_overflow = 0
+    for layer in range(cap_data['nLayers']):
+        for y in range(ySize):
+            for x in range(xSize):
+                old_overflow += overflow_of(demand[layer][y][x], capacities[layer][y][x])
+
+    # Swap the differing nets one at a time and charge each its overflow change
+    rows = []
+    for (name, k), status, (gcells_a, wl_a, vias_a), (gcells_b, wl_b, vias_b) in entries:
+        d_overflow = apply_net(demand, capacities, gcells_a, gcells_b)
+        d_wirelength = wl_b - wl_a
+        d_vias = vias_b - vias_a
+        rows.append({
+            'name': name if k == 0 else f"{name}#{k}",
+            'status': status,
+            'wirelength_old': wl_a,
+            'wirelength_new': wl_b,
+            'd_wirelength': d_wirelength,
+            'vias_old': vias_a,
+            'vias_new': vias_b,
+            'd_vias': d_vias,
+            'd_overflow': d_overflow,
+            'd_cost': d_wirelength + d_vias * unit_via_cost,
+        })
+
+    def totals(overflow, wirelength, vias):
+        return {
+            'overflow': overflow,
+            'total_cost': wirelength + vias * unit_via_cost,
+            'wirelength_cost': wirelength,
+            'via_cost': vias * unit_via_cost,
+            'num_vias': vias,
+            'wirelength': wirelength,
+        }
+
+    new_overflow = old_overflow + sum(row['d_overflow'] for row in rows)
+    new_wirelength = old_wirelength + sum(row['d_wirelength'] for row in rows)
+    new_vias = old_vias + sum(row['d_vias'] for row in rows)
+    old = totals(old_overflow, old_wirelength, old_vias)
+    new = totals(new_overflow, new_wirelength, new_vias)
+    return {
+        'rows': rows,
+        'old': old,
+        'new': new,
+        'delta': {key: new[key] - old[key] for key in ('overflow', 'total_cost', 'wirelength', 'num_vias')},
+        'counts': {
+            'unchanged': len(new_keys) - len(changed) - len(added),
+            'changed': len(changed),
+            'added': len(added),
+            'removed': len(removed),
+        },
+    }
+
+
+def print_diff(result, top):
+    counts = result['counts']
+    print("=== Route Diff ===")
+    print(f"Nets: {counts['unchanged']} unchanged, {counts['changed']} changed, "
+          f"{counts['added']} added, {counts['removed']} removed")
+    print(f"{'':<12} {'old':>14} {'new':>14} {'delta':>14}")
+    for key in ('overflow', 'total_cost', 'wirelength', 'num_vias'):
+        print(f"{key:<12} {result['old'][key]:>14} {result['new'][key]:>14} {result['delta'][key]:>+14}")
+
+    rows = sorted(result['rows'], key=lambda r: (-abs(r['d_overflow']), -abs(r['d_cost']), r['name']))
+    if rows and top:
+        print(f"\nTop {min(top, len(rows))} nets by overflow, then cost impact:")
+        print(f"{'net':<28} {'status':<8} {'d_overflow':>10} {'d_cost':>12} {'d_wl':>10} {'d_vias':>7}")
+        for row in rows[:top]:
+            print(f"{row['name']:<28} {row['status']:<8} {row['d_overflow']:>+10} {row['d_cost']:>+12} "
+                  f"{row['d_wirelength']:>+10} {row['d_vias']:>+7}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Per-net diff of two .route files.")
+    parser.add_argument("cap_file", type=Path)
+    parser.add_argument("old_route", type=Path)
+    parser.add_argument("new_route", type=Path)
+    parser.add_argument("--csv", type=Path, default=None, help="Write the per-net delta table here.")
+    parser.add_argument("--top", type=int, default=20, help="Nets to print (0 = none).")
+    parser.add_argument("--check", action="store_true",
+                        help="Also run evaluate_route on both files and compare the totals.")
+    args = parser.parse_args()
+
+    for path in (args.cap_file, args.old_route, args.new_route):
+        if not path.exists():
+            parser.error(f"file not found: {path}")
+
+    cap_data = pa3_evaluator.parse_cap_file(str(args.cap_file))
+    old_route = pa3_evaluator.parse_route_file(str(args.old_route))
+    new_route = pa3_evaluator.parse_route_file(str(args.new_route))
+    result = diff_routes(cap_data, old_route, new_route)
+    print_diff(result, args.top)
+
+    if args.csv:
+        with args.csv.open("w", newline="") as fout:
+            writer = csv.DictWriter(fout, fieldnames=DIFF_COLUMNS)
+            writer.writeheader()
+            writer.writerows(result['rows'])
+        print(f"\nWrote {len(result['rows'])} rows to {args.csv}")
+
+    if args.check:
+        for side, route in (('old', old_route), ('new', new_route)):
+            reference = pa3_evaluator.evaluate_route(cap_data, route)
+            if reference != result[side]:
+                print(f"Mismatch with evaluate_route ({side}): {reference} != {result[side]}")
+                return 1
+        print("\nTotals match evaluate_route.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,444 @@
+#!/usr/bin/env python3
+"""
+Out-of-core route evaluation over square tiles of the GCell grid.
+
+evaluate_route keeps the whole demand grid and capacity grid in Python lists.
+This tool reaches the same numbers while holding only one tile of the grid
+(and one chunk of nets) in memory at a time:
+
+    1. the .cap file is streamed into a capacity .npy in the work directory,
+       read back through a memory map one tile at a time;
+    2. the route is streamed in chunks of nets; wirelength and vias are summed
+       on the fly, and every wire is clipped at tile borders and spilled to a
+       per-tile record file as (net, layer, y, x, length, horizontal);
+    3. each tile's runs of one net on one line are merged, which is the
+       evaluator's per-net dedup (a GCell lies in exactly one tile), counted
+       into a demand block and scored against that tile's capacity.
+
+Peak memory is about one chunk of nets plus the spill buffer plus the records
+of the busiest tile.  Out-of-grid wires, negative via coordinates and
+out-of-range indices behave as in evaluate_route.
+
+Usage:
+    python3 tiled_eval.py <cap_file> <route_file> [--tile 256] [--work-dir DIR]
+    python3 tiled_eval.py case.cap case.route --check     # compare with evaluate_route
+"""
+
+from __future__ import annotations
+
+import argparse
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Dict, Iterator, Tuple
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+import pa3_evaluator  # noqa: E402
+import route_bin  # noqa: E402
+
+DEFAULT_TILE = 256
+CHUNK_NETS = 1 << 16
+SPILL_BYTES = 64 << 20
+RECORD_FIELDS = 6  # net, layer, y, x, length, horizontal
+
+
+# ============================================================================
+# Streaming readers
+# ============================================================================
+
+def _cap_lines(fin) -> Iterator[str]:
+    for line in fin:
+        line = line.strip()
+        if line:
+            yield line
+
+
+def stream_capacity(cap_file: Path, npy_path: Path) -> Dict:
+    """
+    Copy the capacity grids of a .cap file into an (nLayers, ySize, xSize) .npy
+
+    Returns:
+        the parse_cap_file header fields (everything but the layer grids),
+        with 'directions' holding the layer directions
+    """
+    with open(cap_file) as fin:
+        lines = _cap_lines(fin)
+        n_layers, x_size, y_size = map(int, next(lines).split())
+        header = {
+            'nLayers': n_layers,
+            'xSize': x_size,
+            'ySize': y_size,
+            'unit_length_wire_cost': 1,
+            'unit_via_cost': int(next(lines)),
+            'horizontal_edge_lengths': list(map(int, next(lines).split())),
+            'vertical_edge_lengths': list(map(int, next(lines).split())),
+            'directions': [],
+        }
+        capacity = np.lib.format.open_memmap(npy_path, mode='w+', dtype=np.int64,
+                                             shape=(n_layers, y_size, x_size))
+        for layer in range(n_layers):
+            header['directions'].append(next(lines).split()[1])
+            for y in range(y_size):
+                row = np.array(next(lines).split(), dtype=np.int64)
+                if len(row) != x_size:
+                    raise ValueError(f"{cap_file}: layer {layer} row {y} has {len(row)} values, expected {x_size}")
+                capacity[layer, y] = row
+        capacity.flush()
+        del capacity
+    return header
+
+
+def iter_route_chunks(route_file: Path, chunk_nets: int = CHUNK_NETS) -> Iterator[Tuple[np.ndarray, np.ndarray]]:
+    """
+    Yield (segment count per net, (S, 6) int64 segments as z1 x1 y1 z2 x2 y2)
+    for consecutive chunks of nets, with parse_route_file's block rules
+    """
+    if route_bin.is_route_bin(route_file):
+        route = route_bin.read_route_bin(route_file)
+        for start in range(0, len(route), chunk_nets):
+            stop = min(start + chunk_nets, len(route))
+            bounds = route.seg_index[start:stop + 1]
+            yield np.diff(bounds), route.segments[bounds[0]:bounds[-1]].astype(np.int64)
+        return
+
+    def flush(counts, seg_lines):
+        values = np.zeros(0, dtype=np.int64)
+        if seg_lines:
+            values = np.array(b" ".join(seg_lines).split(), dtype=np.int64)
+        return np.array(counts, dtype=np.int64), values.reshape(-1, 6)
+
+    counts = []
+    seg_lines = []
+    state = "outside"
+    with open(route_file, "rb") as fin:
+        for raw in fin:
+            line = raw.strip()
+            if state == "open":
+                if line == b"(":
+                    state = "inside"
+                    continue
+                state = "outside"
+            if state == "inside":
+                if line == b")":
+                    state = "outside"
+                elif line and len(line.split()) == 6:
+                    seg_lines.append(line)
+                    counts[-1] += 1
+            elif line and not line.startswith(b"(") and line != b")":
+                if len(counts) == chunk_nets:
+                    yield flush(counts, seg_lines)
+                    counts, seg_lines = [], []
+                counts.append(0)
+                state = "open"
+    if counts:
+        yield flush(counts, seg_lines)
+
+
+# ============================================================================
+# Pass 1: segments -> per-tile records
+# ============================================================================
+
+def wrap_index(values: np.ndarray, size: int) -> np.ndarray:
+    """Python list indexing: -size <= i < size, negatives count from the end."""
+    if len(values) and ((values < -size) | (values >= size)).any():
+        raise IndexError("list index out of range")
+    return values % size
+
+
+def chunk_records(header: Dict, prefixes, first_net: int, counts: np.ndarray, segs: np.ndarray):
+    """
+    Wirelength, via count and GCell records of one chunk of nets
+
+    Records are (net, layer, y, x, length, horizontal) runs of GCells.  Layer,
+    y and x keep the route's raw (possibly negative) via coordinates so that
+    the per-net dedup sees the same tuples evaluate_net does.
+    """
+    n_layers, y_size, x_size = header['nLayers'], header['ySize'], header['xSize']
+    horizontal_prefix, vertical_prefix = prefixes
+    net = np.repeat(np.arange(first_net, first_net + len(counts), dtype=np.int64), counts)
+    z1, x1, y1, z2, x2, y2 = segs.T
+    via = z1 != z2
+
+    # Vias: one GCell on each of the two layers, at (x1, y1)
+    vnet = np.concatenate([net[via], net[via]])
+    vz = np.concatenate([z1[via], z2[via]])
+    vy = np.concatenate([y1[via], y1[via]])
+    vx = np.concatenate([x1[via], x1[via]])
+    wrap_index(vy, y_size)
+    wrap_index(vx, x_size)
+    # A via GCell is a one-GCell run in its layer's direction, so every run
+    # on a layer lies along that layer's lines
+    layer_h = np.array([d == 'H' for d in header['directions']], dtype=bool)
+    ones = np.ones(len(vnet), dtype=np.int64)
+    vflag = layer_h[wrap_index(vz, n_layers)].astype(np.int64)
+    records = [np.stack([vnet, vz, vy, vx, ones, vflag], axis=1)]
+
+    # Wires: clip to the grid like evaluate_net
+    wire = ~via
+    wnet, wz = net[wire], z1[wire]
+    wx1, wx2, wy1, wy2 = x1[wire], x2[wire], y1[wire], y2[wire]
+    horizontal = layer_h[wrap_index(wz, n_layers)]
+    wirelength = 0
+    for is_h, fixed_a, fixed_b, pos_a, pos_b, fixed_size, pos_size, prefix in (
+        (True, wy1, wy2, wx1, wx2, y_size, x_size, horizontal_prefix),
+        (False, wx1, wx2, wy1, wy2, x_size, y_size, vertical_prefix),
+    ):
+        lo = np.maximum(np.minimum(pos_a, pos_b), 0)
+        hi = np.minimum(np.maximum(pos_a, pos_b), pos_size)
+        ok = (horizontal == is_h) & (fixed_a == fixed_b) & (fixed_a >= 0) & (fixed_a < fixed_size) & (lo < hi)
+        lo, hi, fixed = lo[ok], hi[ok], fixed_a[ok]
+        if len(hi) and hi.max() > len(prefix) - 1:
+            # Same failure as indexing the edge length list past its end
+            raise IndexError("list index out of range")
+        wirelength += int((prefix[hi] - prefix[lo]).sum())
+        y, x = (fixed, lo) if is_h else (lo, fixed)
+        flag = np.full(len(lo), int(is_h), dtype=np.int64)
+        records.append(np.stack([wnet[ok], wz[ok], y, x, hi - lo, flag], axis=1))
+    return wirelength, int(via.sum()), np.concatenate(records)
+
+
+def split_by_tile(records: np.ndarray, shape, tile: int) -> Tuple[np.ndarray, np.ndarray]:
+    """Cut runs at tile borders; returns (tile id per piece, pieces)."""
+    _, y_size, x_size = shape
+    tiles_x = -(-x_size // tile)
+    y = records[:, 2] % y_size
+    x = records[:, 3] % x_size
+    length = records[:, 4]
+    horizontal = records[:, 5] == 1
+    start = np.where(horizontal, x, y)
+    first = start // tile
+    pieces = (start + length - 1) // tile - first + 1
+
+    idx = np.repeat(np.arange(len(records)), pieces)
+    k = np.arange(len(idx)) - np.repeat(np.cumsum(pieces) - pieces, pieces)
+    lo = np.maximum(start[idx], (first[idx] + k) * tile)
+    hi = np.minimum(start[idx] + length[idx], (first[idx] + k + 1) * tile)
+    out = records[idx].copy()
+    h = horizontal[idx]
+    split = pieces[idx] > 1
+    # Only wires (never negative) are ever split, so raw == wrapped there
+    out[:, 3] = np.where(split & h, lo, out[:, 3])
+    out[:, 2] = np.where(split & ~h, lo, out[:, 2])
+    out[:, 4] = hi - lo
+    tile_id = (np.where(h, y[idx], lo) // tile) * tiles_x + np.where(h, lo, x[idx]) // tile
+    return tile_id, out
+
+
+class TileSpill:
+    """Buffers records per tile and appends them to <work_dir>/tile_<id>.bin."""
+
+    def __init__(self, work_dir: Path, limit: int = SPILL_BYTES):
+        self.work_dir = work_dir
+        self.limit = limit
+        self.buffers: Dict[int, list] = {}
+        self.buffered = 0
+        self.spilled = 0
+
+    def path(self, tile_id: int) -> Path:
+        return self.work_dir / f"tile_{tile_id}.bin"
+
+    def add(self, tile_ids: np.ndarray, records: np.ndarray) -> None:
+        order = np.argsort(tile_ids, kind='stable')
+        tile_ids, records = tile_ids[order], records[order]
+        ids, starts = np.unique(tile_ids, return_index=True)
+        bounds = np.append(starts, len(tile_ids))
+        for k, tile_id in enumerate(ids.tolist()):
+            self.buffers.setdefault(tile_id, []).append(records[bounds[k]:bounds[k + 1]])
+        self.buffered += records.nbytes
+        if self.buffered >= self.limit:
+            self.flush()
+
+    def flush(self) -> None:
+        for tile_id, chunks in self.buffers.items():
+            with open(self.path(tile_id), "ab") as fout:
+                for chunk in chunks:
+                    fout.write(np.ascontiguousarray(chunk, dtype=np.int64).tobytes())
+        self.spilled += self.buffered
+        self.buffers = {}
+        self.buffered = 0
+
+
+# ============================================================================
+# Pass 2: per-tile demand and overflow
+# ============================================================================
+
+def tile_demand(records: np.ndarray, tile_shape, shape, y0: int, x0: int) -> np.ndarray:
+    """
+    Demand grid of one tile from its records
+
+    Runs of the same net on the same line are merged (interval union), which
+    is the per-net GCell dedup without expanding runs into GCells; demand is
+    then a difference array along each line.
+    """
+    n_layers, y_size, x_size = shape
+    _, th, tw = tile_shape
+    demand = np.zeros(tile_shape, dtype=np.int64)
+    if len(records):
+        net, layer, y, x, length, horizontal = records.T
+        h = horizontal == 1
+        wl = layer % n_layers
+        wy = y % y_size - y0
+        wx = x % x_size - x0
+        line = np.where(h, wy, wx)
+        start = np.where(h, wx, wy)
+        end = start + length
+        # Raw negative coordinates are distinct GCells for the per-net dedup
+        # even though they index the same demand entry.  A layer's runs all
+        # share its direction, so (net, raw, layer, line) identifies a line.
+        raw = (layer < 0) * 4 + (y < 0) * 2 + (x < 0)
+        group = (((net * 8 + raw) * n_layers + wl) * 2 + h) * max(th, tw) + line
+        order = np.lexsort((start, group))
+        group, start, end = group[order], start[order], end[order]
+
+        # Running max of run ends within each group
+        new_group = np.empty(len(group), dtype=bool)
+        new_group[0] = True
+        new_group[1:] = group[1:] != group[:-1]
+        rank = np.cumsum(new_group)
+        span = max(th, tw) + 1
+        reach = np.maximum.accumulate(end + rank * span) - rank * span
+        first = new_group.copy()
+        first[1:] |= start[1:] > reach[:-1]
+        starts = np.flatnonzero(first)
+        last = np.append(starts[1:], len(group)) - 1
+
+        sel = order[starts]
+        lo, hi = start[starts], reach[last]
+        hsel = h[sel]
+        diff_h = np.zeros((n_layers, th, tw + 1), dtype=np.int64)
+        diff_v = np.zeros((n_layers, th + 1, tw), dtype=np.int64)
+        for diff, mask, index in (
+            (diff_h, hsel, lambda pos: (wl[sel] * th + line[sel]) * (tw + 1) + pos),
+            (diff_v, ~hsel, lambda pos: (wl[sel] * (th + 1) + pos) * tw + line[sel]),
+        ):
+            flat = diff.reshape(-1)
+            flat += np.bincount(index(lo)[mask], minlength=flat.size)
+            flat -= np.bincount(index(hi)[mask], minlength=flat.size)
+        demand = np.cumsum(diff_h, axis=2)[:, :, :tw] + np.cumsum(diff_v, axis=1)[:, :th, :]
+    return demand
+
+
+def tile_overflow(records: np.ndarray, capacity: np.ndarray, shape, y0: int, x0: int) -> int:
+    """Overflow of one tile from its records and its capacity block."""
+    demand = tile_demand(records, capacity.shape, shape, y0, x0)
+    return int(np.maximum(demand - capacity, 0).sum())
+
+
+def tiled_evaluate(cap_file: Path, route_file: Path, work_dir: Path, tile: int = DEFAULT_TILE,
+                   chunk_nets: int = CHUNK_NETS, spill_bytes: int = SPILL_BYTES) -> Tuple[Dict, Dict]:
+    """
+    Evaluate a route tile by tile
+
+    Args:
+        cap_file, route_file: input files (text or binary route)
+        work_dir: directory for the capacity .npy and the tile spill files
+        tile: tile edge in GCells
+        chunk_nets: nets parsed per chunk
+        spill_bytes: buffered record bytes before spilling to disk
+
+    Returns:
+        tuple (result, info): result has evaluate_route's keys and values;
+        info has tile count, nets, segments, spilled bytes and pass timings
+    """
+    t0 = time.perf_counter()
+    header = stream_capacity(cap_file, work_dir / "capacity.npy")
+    shape = (header['nLayers'], header['ySize'], header['xSize'])
+    prefixes = tuple(np.array(p, dtype=np.int64) for p in pa3_evaluator.edge_length_prefix(header))
+
+    t1 = time.perf_counter()
+    spill = TileSpill(work_dir, spill_bytes)
+    nets = segments = wirelength = num_vias = 0
+    for counts, segs in iter_route_chunks(route_file, chunk_nets):
+        chunk_wl, chunk_vias, records = chunk_records(header, prefixes, nets, counts, segs)
+        wirelength += chunk_wl
+        num_vias += chunk_vias
+        nets += len(counts)
+        segments += len(segs)
+        if len(records):
+            spill.add(*split_by_tile(records, shape, tile))
+    spill.flush()
+
+    t2 = time.perf_counter()
+    capacity = np.load(work_dir / "capacity.npy", mmap_mode='r')
+    overflow = 0
+    tiles = 0
+    for y0 in range(0, shape[1], tile):
+        for x0 in range(0, shape[2], tile):
+            tile_id = (y0 // tile) * -(-shape[2] // tile) + x0 // tile
+            path = spill.path(tile_id)
+            records = np.zeros((0, RECORD_FIELDS), dtype=np.int64)
+            if path.exists():
+                records = np.fromfile(path, dtype=np.int64).reshape(-1, RECORD_FIELDS)
+                path.unlink()
+            block = np.asarray(capacity[:, y0:y0 + tile, x0:x0 + tile])
+            overflow += tile_overflow(records, block, shape, y0, x0)
+            tiles += 1
+    del capacity
+    t3 = time.perf_counter()
+
+    via_cost = num_vias * header['unit_via_cost']
+    result = {
+        'overflow': overflow,
+        'total_cost': wirelength + via_cost,
+        'wirelength_cost': wirelength,
+        'via_cost': via_cost,
+        'num_vias': num_vias,
+        'wirelength': wirelength,
+    }
+    info = {
+        'tiles': tiles,
+        'nets': nets,
+        'segments': segments,
+        'spilled_bytes': spill.spilled,
+        'capacity_s': t1 - t0,
+        'bucket_s': t2 - t1,
+        'tiles_s': t3 - t2,
+    }
+    return result, info
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Tile-by-tile out-of-core route evaluation.")
+    parser.add_argument("cap_file", type=Path)
+    parser.add_argument("route_file", type=Path)
+    parser.add_argument("--tile", type=int, default=DEFAULT_TILE, help="Tile edge in GCells.")
+    parser.add_argument("--chunk-nets", type=int, default=CHUNK_NETS, help="Nets parsed per chunk.")
+    parser.add_argument("--spill-mb", type=float, default=SPILL_BYTES / (1 << 20),
+                        help="Record buffer size before spilling to disk.")
+    parser.add_argument("--work-dir", type=Path, default=None,
+                        help="Where the capacity .npy and tile files go (default: a temporary directory).")
+    parser.add_argument("--check", action="store_true",
+                        help="Also run the in-memory evaluate_route and compare.")
+    args = parser.parse_args()
+
+    for path in (args.cap_file, args.route_file):
+        if not path.exists():
+            parser.error(f"file not found: {path}")
+    if args.tile < 1 or args.chunk_nets < 1:
+        parser.error("--tile and --chunk-nets must be positive")
+
+    with tempfile.TemporaryDirectory(dir=args.work_dir) as tmp:
+        result, info = tiled_evaluate(args.cap_file, args.route_file, Path(tmp), args.tile,
+                                      args.chunk_nets, int(args.spill_mb * (1 << 20)))
+    print(f"{info['nets']} nets, {info['segments']} segments, {info['tiles']} tiles of {args.tile}, "
+          f"{info['spilled_bytes'] / (1 << 20):.1f} MB spilled")
+    print(f"  capacity {info['capacity_s']:.2f}s, bucketing {info['bucket_s']:.2f}s, "
+          f"tiles {info['tiles_s']:.2f}s")
+    pa3_evaluator.print_evaluation(result)
+
+    if args.check:
+        cap_data = pa3_evaluator.parse_cap_file(str(args.cap_file))
+        route_data = pa3_evaluator.parse_route_file(str(args.route_file))
+        reference = pa3_evaluator.evaluate_route(cap_data, route_data)
+        if reference != result:
+            print(f"Mismatch with evaluate_route: {reference} != {result}")
+            return 1
+        print("Matches evaluate_route.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,267 @@
+#!/usr/bin/env python3
+"""
+What-if rescoring of a fixed route under modified capacities.
+
+The route is evaluated once; its demand grid, base capacity, wirelength, via
+count and per-net GCells (gcell_index.py's CSR arrays) are saved to a state
+.npz.  Every scenario afterwards is one vectorized max(demand - capacity, 0)
+over the grid, so no route or net parsing is repeated.  Wirelength and via
+cost do not depend on capacity and are carried over unchanged.
+
+Scenarios:
+    --cap FILE       an alternative .cap file (or a capacity .npy of the same shape)
+    --delta FILE     a capacity-delta file applied to the base capacity
+    --derate L:F     scale layer L's capacity by F (rounded down)
+    --scenarios DIR  every .cap / .npy / .delta file in DIR
+
+Capacity-delta files hold one edit per line, applied in order:
+
+    # layer  x0 y0 x1 y1  edit       (inclusive rectangle; layer * = all layers)
+    0        10 10 20 20  =0         blockage: set capacity
+    *        0  0  99 99  -2         add or subtract
+    1        0  0  99 99  x0.8       scale, rounded down
+
+Usage:
+    python3 whatif.py save <cap_file> <route_file> state.npz
+    python3 whatif.py score state.npz --derate 0:0.9 --delta block.delta --cap rev2.cap
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import sys
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+import gcell_index  # noqa: E402
+import pa3_evaluator  # noqa: E402
+
+STATE_VERSION = 2
+
+
+# ============================================================================
+# Capacity sources
+# ============================================================================
+
+def read_capacity(path: Path, shape: Tuple[int, int, int]) -> np.ndarray:
+    """Capacity grid from a .cap file (grids only, parsed in bulk) or a .npy."""
+    if path.suffix == ".npy":
+        capacity = np.load(path)
+    else:
+        with open(path) as fin:
+            lines = [line for line in (raw.strip() for raw in fin) if line]
+        n_layers, x_size, y_size = map(int, lines[0].split())
+        # Layer blocks: a "name direction" header, then ySize rows
+        rows = [lines[4 + layer * (y_size + 1) + 1 + y] for layer in range(n_layers) for y in range(y_size)]
+        capacity = np.array(" ".join(rows).split(), dtype=np.int64).reshape(n_layers, y_size, x_size)
+    if capacity.shape != tuple(shape):
+        raise ValueError(f"{path}: capacity grid {capacity.shape} does not match the route's {tuple(shape)}")
+    return capacity.astype(np.int64, copy=False)
+
+
+def apply_delta(capacity: np.ndarray, path: Path) -> np.ndarray:
+    """A copy of ``capacity`` with the edits of a capacity-delta file applied."""
+    capacity = capacity.copy()
+    n_layers, y_size, x_size = capacity.shape
+    with open(path) as fin:
+        for lineno, raw in enumerate(fin, 1):
+            line = raw.split("#", 1)[0].strip()
+            if not line:
+                continue
+            parts = line.split()
+            if len(parts) != 6:
+                raise ValueError(f"{path}:{lineno}: expected 'layer x0 y0 x1 y1 edit', got '{line}'")
+            layer, edit = parts[0], parts[5]
+            x0, y0, x1, y1 = (int(p) for p in parts[1:5])
+            layers = slice(None) if layer == "*" else int(layer)
+            if layer != "*" and not 0 <= layers < n_layers:
+                raise ValueError(f"{path}:{lineno}: layer {layer} out of range")
+            region = (layers, slice(max(min(y0, y1), 0), min(max(y0, y1), y_size - 1) + 1),
+                      slice(max(min(x0, x1), 0), min(max(x0, x1), x_size - 1) + 1))
+            if edit.startswith("="):
+                capacity[region] = int(edit[1:])
+            elif edit.startswith("x"):
+                capacity[region] = np.floor(capacity[region] * float(edit[1:]))
+            elif edit[0] in "+-":
+                capacity[region] += int(edit)
+            else:
+                raise ValueError(f"{path}:{lineno}: edit must be =N, +N, -N or xF, got '{edit}'")
+    return capacity
+
+
+def derate(capacity: np.ndarray, layer: int, factor: float) -> np.ndarray:
+    if not 0 <= layer < len(capacity):
+        raise ValueError(f"derate layer {layer} is outside 0..{len(capacity) - 1}")
+    capacity = capacity.copy()
+    capacity[layer] = np.floor(capacity[layer] * factor)
+    return capacity
+
+
+# ============================================================================
+# State
+# ============================================================================
+
+class WhatIf:
+    """A route's demand, base capacity, cost counters and per-net GCells."""
+
+    def __init__(self, index: gcell_index.GCellIndex, capacity: np.ndarray, totals: Dict):
+        self.index = index
+        self.capacity = capacity
+        self.totals = totals
+        self.demand = index.demand()
+
+    @classmethod
+    def build(cls, cap_data, route_data) -> "WhatIf":
+        index, result = gcell_index.build_index(cap_data, route_data)
+        capacity = np.array([layer['capacities'] for layer in cap_data['layers']], dtype=np.int64)
+        return cls(index, capacity.reshape(index.shape), result)
+
+    def save(self, path) -> None:
+        index = self.index
+        meta = {'version': STATE_VERSION, 'totals': self.totals}
+        np.savez(
+            path, meta=np.array(json.dumps(meta)), capacity=self.capacity,
+            shape=np.array(index.shape), names=np.array(index.names, dtype=str),
+            cell_keys=index.cell_keys, cell_ptr=index.cell_ptr, cell_nets=index.cell_nets,
+            net_ptr=index.net_ptr, net_cells=index.net_cells,
+        )
+
+    @classmethod
+    def load(cls, path) -> "WhatIf":
+        with np.load(path) as data:
+            meta = json.loads(str(data['meta']))
+            if meta.get('version') != STATE_VERSION:
+                raise ValueError(f"{path}: unsupported what-if state version {meta.get('version')}")
+            index = gcell_index.GCellIndex(
+                tuple(data['shape']), data['names'].tolist(), data['cell_keys'], data['cell_ptr'],
+                data['cell_nets'], data['net_ptr'], data['net_cells'],
+            )
+            return cls(index, data['capacity'], meta['totals'])
+
+    def overflow(self, capacity: np.ndarray) -> int:
+        return int(np.maximum(self.demand - capacity, 0).sum())
+
+    def score(self, capacity: np.ndarray) -> Dict:
+        """
+        Score the route against ``capacity``
+
+        Returns:
+            evaluate_route's keys, plus overflow_gcells (GCells over capacity)
+            and affected_nets (nets using at least one of them)
+        """
+        excess = self.demand - capacity
+        over = np.flatnonzero(excess.ravel() > 0)
+        result = dict(self.totals)
+        result['overflow'] = int(np.maximum(excess, 0).sum())
+        result['overflow_gcells'] = len(over)
+        result['affected_nets'] = self.nets_on_cells(over)
+        return result
+
+    def nets_on_cells(self, keys: np.ndarray) -> int:
+        """Number of distinct nets using any of the linear GCell ``keys``."""
+        index = self.index
+        if not len(keys) or not len(index.cell_keys):
+            return 0
+        pos = np.searchsorted(index.cell_keys, keys)
+        pos = pos[(pos < len(index.cell_keys)) & (index.cell_keys[np.minimum(pos, len(index.cell_keys) - 1)] == keys)]
+        if not len(pos):
+            return 0
+        lo, hi = index.cell_ptr[pos], index.cell_ptr[pos + 1]
+        lengths = hi - lo
+        picks = np.arange(int(lengths.sum())) + np.repeat(lo - np.cumsum(lengths) + lengths, lengths)
+        return len(np.unique(index.cell_nets[picks]))
+
+
+def build_scenarios(state: WhatIf, caps: List[Path], deltas: List[Path], derates: List[str],
+                    scenario_dir: Path = None) -> List[Tuple[str, np.ndarray]]:
+    """(label, capacity) of every requested scenario, the base capacity first."""
+    scenarios = [("base", state.capacity)]
+    if scenario_dir is not None:
+        for path in sorted(scenario_dir.iterdir()):
+            if path.suffix in (".cap", ".npy"):
+                caps.append(path)
+            elif path.suffix == ".delta":
+                deltas.append(path)
+    for path in caps:
+        scenarios.append((f"cap {path.name}", read_capacity(path, state.index.shape)))
+    for path in deltas:
+        scenarios.append((f"delta {path.name}", apply_delta(state.capacity, path)))
+    for spec in derates:
+        layer, _, factor = spec.partition(":")
+        scenarios.append((f"derate {layer}:{factor}", derate(state.capacity, int(layer), float(factor))))
+    return scenarios
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Rescore a fixed route under modified capacities.")
+    sub = parser.add_subparsers(dest="cmd", required=True)
+
+    save = sub.add_parser("save", help="Evaluate a route once and save its what-if state.")
+    save.add_argument("cap_file", type=Path)
+    save.add_argument("route_file", type=Path)
+    save.add_argument("state", type=Path)
+
+    score = sub.add_parser("score", help="Score a saved state against capacity scenarios.")
+    score.add_argument("state", type=Path)
+    score.add_argument("--cap", type=Path, action="append", default=[], help="Alternative .cap or .npy.")
+    score.add_argument("--delta", type=Path, action="append", default=[], help="Capacity-delta file.")
+    score.add_argument("--derate", action="append", default=[], metavar="LAYER:FACTOR")
+    score.add_argument("--scenarios", type=Path, default=None, help="Directory of .cap/.npy/.delta files.")
+    score.add_argument("--json", type=Path, default=None, help="Write all scenario results here.")
+    args = parser.parse_args()
+
+    if args.cmd == "save":
+        for path in (args.cap_file, args.route_file):
+            if not path.exists():
+                parser.error(f"file not found: {path}")
+        cap_data = pa3_evaluator.parse_cap_file(str(args.cap_file))
+        route_data = pa3_evaluator.parse_route_file(str(args.route_file))
+        state = WhatIf.build(cap_data, route_data)
+        state.save(args.state)
+        print(f"Saved {args.state}: {len(state.index.names)} nets, overflow {state.totals['overflow']}")
+        return 0
+
+    for path in [args.state] + args.cap + args.delta + ([args.scenarios] if args.scenarios else []):
+        if not path.exists():
+            parser.error(f"file not found: {path}")
+    for spec in args.derate:
+        layer, sep, factor = spec.partition(":")
+        try:
+            if not sep:
+                raise ValueError
+            int(layer), float(factor)
+        except ValueError:
+            parser.error(f"--derate expects LAYER:FACTOR, got '{spec}'")
+
+    state = WhatIf.load(args.state)
+    n_layers = state.index.shape[0]
+    for spec in args.derate:
+        if not 0 <= int(spec.partition(":")[0]) < n_layers:
+            parser.error(f"--derate layer must be in 0..{n_layers - 1}, got '{spec}'")
+    try:
+        scenarios = build_scenarios(state, list(args.cap), list(args.delta), args.derate, args.scenarios)
+    except (ValueError, IndexError) as exc:
+        print(f"Error: {exc}")
+        return 1
+
+    rows = []
+    base = None
+    print(f"{'scenario':<32} {'overflow':>12} {'delta':>12} {'gcells':>9} {'nets':>9}")
+    for label, capacity in scenarios:
+        result = state.score(capacity)
+        base = result['overflow'] if base is None else base
+        rows.append(dict(result, scenario=label))
+        print(f"{label:<32} {result['overflow']:>12} {result['overflow'] - base:>+12} "
+              f"{result['overflow_gcells']:>9} {result['affected_nets']:>9}")
+    if args.json:
+        args.json.write_text(json.dumps(rows, indent=2))
+        print(f"Wrote {args.json}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())